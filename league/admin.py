@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Player, Season, RosterEntry, Fixture, Availability, Lineup, LineupSlot, SlotScore, PlayerMatchPoints, SubPlan, SubResult, SubAvailability, Notification, NotificationReceipt, DeliveryAttempt, NotificationPreference, PhoneVerification
+from .cache import invalidate_bell
+from .models import Player, Season, RosterEntry, Fixture, Availability, Lineup, LineupSlot, SlotScore, PlayerMatchPoints, FixtureResult, PlayerSeasonStats, StandingsSnapshot, StandingsSnapshotRow, SubPlan, SubResult, SubAvailability, Notification, NotificationReceipt, DeliveryAttempt, NotificationPreference, PhoneVerification
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -58,6 +59,27 @@ class RosterEntryAdmin(admin.ModelAdmin):
     search_fields = ("player__first_name", "player__last_name", "player__email", "season__name", "season__year")
     autocomplete_fields = ("season", "player")
 
+class StandingsSnapshotRowInline(admin.TabularInline):
+    model = StandingsSnapshotRow
+    fields = ("position", "team_name", "points", "is_royals")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(StandingsSnapshot)
+class StandingsSnapshotAdmin(admin.ModelAdmin):
+    # Published snapshots are immutable: view only
+    list_display = ("season", "version", "royals_points", "published_at", "published_by")
+    list_filter = ("season",)
+    readonly_fields = ("season", "version", "royals_points", "published_at", "published_by")
+    inlines = [StandingsSnapshotRowInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(SlotScore)
 class SlotScoreAdmin(admin.ModelAdmin):
     list_display = ("fixture", "slot_code", "result", "home_games", "away_games", "updated_at")
@@ -72,6 +94,20 @@ class PlayerMatchPointsAdmin(admin.ModelAdmin):
     search_fields = ("player__first_name", "player__last_name", "fixture__opponent")
     autocomplete_fields = ("fixture", "player")
 
+@admin.register(FixtureResult)
+class FixtureResultAdmin(admin.ModelAdmin):
+    list_display = ("fixture", "outcome", "home_total", "away_total", "sub_points", "scored", "version", "updated_at")
+    list_filter = ("season", "outcome", "scored")
+    search_fields = ("fixture__opponent",)
+    readonly_fields = ("version", "updated_at")
+
+@admin.register(PlayerSeasonStats)
+class PlayerSeasonStatsAdmin(admin.ModelAdmin):
+    list_display = ("season", "player", "lineup_points", "sub_points", "wins", "losses", "ties", "s1", "s2", "s3", "d1", "d2", "d3", "updated_at")
+    list_filter = ("season",)
+    search_fields = ("player__first_name", "player__last_name")
+    autocomplete_fields = ("season", "player")
+
 
 # Admin for SubPlan
 @admin.register(SubPlan)
@@ -110,11 +146,13 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.action(description="Mark selected as read")
 def mark_receipts_read(modeladmin, request, queryset):
+    invalidate_bell(*queryset.values_list("user_id", flat=True).distinct())
     queryset.filter(read_at__isnull=True).update(read_at=timezone.now())
 
 
 @admin.action(description="Mark selected as unread")
 def mark_receipts_unread(modeladmin, request, queryset):
+    invalidate_bell(*queryset.values_list("user_id", flat=True).distinct())
     queryset.update(read_at=None)
 
 
@@ -130,9 +168,10 @@ class NotificationReceiptAdmin(admin.ModelAdmin):
 
 @admin.register(DeliveryAttempt)
 class DeliveryAttemptAdmin(admin.ModelAdmin):
-    list_display = ("id", "notification", "channel", "to", "status", "retry_count", "provider_message_id", "sent_at", "created_at")
-    list_filter = ("channel", "status")
-    readonly_fields = ("error",)
+    list_display = ("id", "notification", "channel", "to", "status", "retry_count", "provider", "provider_message_id", "sent_at", "created_at")
+    list_filter = ("channel", "status", "provider")
+    raw_id_fields = ("notification", "user")
+    readonly_fields = ("error", "subject", "body_text", "body_html")
     search_fields = ("to", "provider_message_id", "notification__title")
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
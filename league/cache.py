@@ -0,0 +1,204 @@
+# league/cache.py
+"""Per-season versioned cache keys.
+
+Each season has a version number in the cache. Cached season data is stored under a
+key that embeds the current version, so bumping the version after a write makes every
+older entry unreachable (they simply expire) without having to know their keys.
+
+Versions are bumped from league.signals (and by the scoring refresh) after the writing
+transaction commits. Everything lives in the default cache, so with a shared backend
+(file or Redis, see settings) a bump in one worker invalidates every other worker too.
+Hit/miss counters are kept in the cache as well (see `cache_stats()`), but only on
+Redis or memcached or with SEASON_CACHE_STATS on: on the file cache every counted hit
+would be a file read-modify-write, and concurrent ones lose counts.
+
+The notification bell (unread count + preview) is cached per user and dropped by
+`invalidate_bell()` whenever that user's receipts are created or marked read/unread.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from league.models import Fixture, FixtureResult
+
+SEASON_CACHE_TIMEOUT = 60 * 60  # 1h; entries are invalidated by version bumps, not by age
+
+_MISSING = object()
+_ATOMIC_CACHES = ("django.core.cache.backends.redis", "django.core.cache.backends.memcached", "django_redis")
+_state = threading.local()
+
+
+def _version_key(season_id):
+    return f"league:season:{season_id}:version"
+
+
+def season_version(season_id):
+    """Current cache version for a season (initialized on first use)."""
+    key = _version_key(season_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses an old number
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def season_cache_key(season_id, name):
+    return f"league:season:{season_id}:v{season_version(season_id)}:{name}"
+
+
+def bump_season_version(*season_ids):
+    """Invalidate everything cached for the given seasons."""
+    for season_id in {s for s in season_ids if s}:
+        key = _version_key(season_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing (never used or evicted): seed a fresh one
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def _flush_pending_bumps():
+    pending = getattr(_state, "pending", None)
+    if not pending:
+        return
+    ids, _state.pending = pending, set()
+    bump_season_version(*ids)
+
+
+def bump_season_version_on_commit(*season_ids):
+    """Bump after the current transaction commits so readers never cache pre-commit data under the new version.
+
+    Ids are collected per thread, so a transaction touching many rows of one season
+    bumps it once.
+    """
+    ids = {s for s in season_ids if s}
+    if not ids:
+        return
+    if not hasattr(_state, "pending"):
+        _state.pending = set()
+    _state.pending.update(ids)
+    # The first callback to run drains the set; on rollback the ids wait for the next commit.
+    transaction.on_commit(_flush_pending_bumps)
+
+
+def atomic_cache():
+    """True when the default cache is one server shared by every process, with atomic incr()/add()."""
+    return type(cache).__module__.startswith(_ATOMIC_CACHES)
+
+
+# --- Hit/miss counters ---
+
+def counting():
+    return bool(getattr(settings, "SEASON_CACHE_STATS", False)) or atomic_cache()
+
+
+def _stat_key(name, outcome):
+    return f"league:cache:stats:{name}:{outcome}"
+
+
+def _count(name, outcome):
+    key = _stat_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def _stat_names():
+    return cache.get("league:cache:stats:names") or []
+
+
+def cache_stats():
+    """Return {name: {"hits", "misses", "hit_rate"}} for every cached season helper."""
+    out = {}
+    for name in sorted(_stat_names()):
+        hits = cache.get(_stat_key(name, "hit")) or 0
+        misses = cache.get(_stat_key(name, "miss")) or 0
+        total = hits + misses
+        out[name] = {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else 0.0}
+    return out
+
+
+def reset_cache_stats():
+    names = _stat_names()
+    cache.delete_many([_stat_key(n, o) for n in names for o in ("hit", "miss")])
+
+
+def cached_for_season(season_id, name, compute, timeout=SEASON_CACHE_TIMEOUT):
+    """Return the cached value for (season, name), computing and storing it on a miss."""
+    key = season_cache_key(season_id, name)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        if counting():
+            _count(name, "hit")
+        return value
+    value = compute()
+    cache.set(key, value, timeout)
+    if counting():
+        _count_miss(name)
+    return value
+
+
+def _count_miss(name):
+    _count(name, "miss")
+    names = _stat_names()
+    if name not in names:
+        cache.set("league:cache:stats:names", names + [name], timeout=None)
+
+
+# --- Season read helpers ---
+
+def cached_season_fixtures(season):
+    """Fixtures of a season ordered by week then date (fresh instances per call)."""
+    if not season:
+        return []
+    season_id = getattr(season, "pk", season)
+    return cached_for_season(
+        season_id, "fixtures",
+        lambda: list(Fixture.objects.filter(season_id=season_id).order_by("week_number", "date")),
+    )
+
+
+def cached_season_results(season):
+    """{fixture_id: FixtureResult} for a season."""
+    if not season:
+        return {}
+    season_id = getattr(season, "pk", season)
+    return cached_for_season(
+        season_id, "results",
+        lambda: {r.fixture_id: r for r in FixtureResult.objects.filter(season_id=season_id)},
+    )
+
+
+# --- Per-user notification bell ---
+
+BELL_CACHE_TIMEOUT = 5 * 60  # short: receipts removed by cascades do not invalidate
+
+
+def _bell_key(user_id):
+    return f"league:user:{user_id}:bell"
+
+
+def cached_bell(user_id, compute):
+    """Return the cached bell payload for a user, computing it on a miss."""
+    key = _bell_key(user_id)
+    value = cache.get(key)
+    if value is not None:
+        _count("bell", "hit")
+        return value
+    value = compute()
+    cache.set(key, value, BELL_CACHE_TIMEOUT)
+    _count_miss("bell")
+    return value
+
+
+def invalidate_bell(*user_ids):
+    """Drop the bell for these users once the current transaction commits."""
+    keys = [_bell_key(u) for u in {u for u in user_ids if u}]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,137 @@
+# league/conditional.py
+"""Conditional GET (ETag / Last-Modified) for the player pages reloaded on match day.
+
+Each page declares the rows it is rendered from. The validator is max(updated_at) and
+row count of each source (counts catch deletes), computed in a single SELECT of scalar
+subqueries that also reads the user's player name and captain flag, plus the full path
+with its query string (?season=...), the user id, the season registry generation, the
+notification bell and the CSRF secret, since all of them shape the rendered page. Django's `condition()`
+decorator then answers 304 without running the view when the client's copy is current.
+
+Requests with pending flash messages are always rendered in full.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.db.models import DateTimeField, F, Func, IntegerField, Q, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from league.context_processors import notifications_context
+from league.models import (
+    Availability, Fixture, FixtureResult, Lineup, LineupSlot, PlayerMatchPoints, RosterEntry, SlotScore, SubAvailability,
+    SubPlan, SubResult,
+)
+from league.seasons import registry_generation
+
+_REQUEST_ATTR = "_league_validators"
+
+
+def _scalar(qs, function, field, output_field):
+    # Func (not an Aggregate) keeps Django from adding a GROUP BY to the subquery
+    return Subquery(
+        qs.order_by().annotate(v=Func(F(field), function=function)).values("v")[:1],
+        output_field=output_field,
+    )
+
+
+def _fingerprint(user, sources):
+    """{name: value} for max(timestamp)/count of each (name, queryset, timestamp field or None)."""
+    exprs = {}
+    for name, qs, ts_field in sources:
+        if ts_field:
+            exprs[f"{name}_ts"] = _scalar(qs, "MAX", ts_field, DateTimeField())
+        exprs[f"{name}_n"] = _scalar(qs, "COUNT", "pk", IntegerField())
+    profile = ("player_profile__first_name", "player_profile__last_name", "player_profile__is_captain")
+    return get_user_model().objects.filter(pk=user.pk).values(*profile, **exprs).first() or {}
+
+
+# Sources filter on the user id through player__user so the 304 path needs no Player lookup.
+
+def schedule_sources(request):
+    uid = request.user.pk
+    return [
+        ("fixtures", Fixture.objects.all(), "updated_at"),
+        ("scores", SlotScore.objects.all(), "updated_at"),
+        # Team totals also move with lineups (a Sub in a slot changes the home share)
+        ("results", FixtureResult.objects.all(), "updated_at"),
+        ("roster", RosterEntry.objects.filter(player__user_id=uid), None),
+        ("availability", Availability.objects.filter(player__user_id=uid), "updated_at"),
+        ("sub_availability", SubAvailability.objects.filter(player__user_id=uid), "created_at"),
+    ]
+
+
+def fixture_sources(request, pk):
+    uid = request.user.pk
+    return [
+        ("fixture", Fixture.objects.filter(pk=pk), "updated_at"),
+        ("lineup", Lineup.objects.filter(fixture_id=pk), "updated_at"),
+        ("slots", LineupSlot.objects.filter(lineup__fixture_id=pk), "updated_at"),
+        ("scores", SlotScore.objects.filter(fixture_id=pk), "updated_at"),
+        ("sub_plans", SubPlan.objects.filter(fixture_id=pk), "updated_at"),
+        ("sub_results", SubResult.objects.filter(fixture_id=pk), "updated_at"),
+        ("roster", RosterEntry.objects.filter(player__user_id=uid, season__fixtures=pk), None),
+        ("availability", Availability.objects.filter(player__user_id=uid, fixture_id=pk), "updated_at"),
+    ]
+
+
+def results_sources(request):
+    uid = request.user.pk
+    return [
+        ("fixtures", Fixture.objects.all(), "updated_at"),
+        ("roster", RosterEntry.objects.filter(player__user_id=uid), None),
+        ("slots", LineupSlot.objects.filter(Q(player1__user_id=uid) | Q(player2__user_id=uid)), "updated_at"),
+        ("scores", SlotScore.objects.all(), "updated_at"),
+        ("results", FixtureResult.objects.all(), "updated_at"),
+        ("sub_results", SubResult.objects.filter(player__user_id=uid), "updated_at"),
+        ("points", PlayerMatchPoints.objects.filter(player__user_id=uid), "updated_at"),
+    ]
+
+
+def page_validators(request, sources_func, *args, **kwargs):
+    """(etag, last_modified) for the page, computed once per request; (None, None) to skip."""
+    memo = getattr(request, _REQUEST_ATTR, None)
+    if memo is not None:
+        return memo
+    validators = (None, None)
+    user = request.user
+    if user.is_authenticated and request.method in ("GET", "HEAD") and not len(messages.get_messages(request)):
+        fp = _fingerprint(user, sources_func(request, *args, **kwargs))
+        stamps = [v for k, v in fp.items() if k.endswith("_ts") and v]
+        bell = notifications_context(request)
+        parts = [
+            request.resolver_match.view_name if request.resolver_match else "", request.path,
+            sorted(request.GET.lists()),
+            user.pk, registry_generation(), request.META.get("CSRF_COOKIE", ""),
+            bell["notif_count"], [r["id"] for r in bell["notifications"]],
+            sorted((k, str(v)) for k, v in fp.items()),
+        ]
+        etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+        last_modified = max(stamps) if stamps else datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+        validators = (etag, last_modified)
+    setattr(request, _REQUEST_ATTR, validators)
+    return validators
+
+
+def conditional_page(sources_func):
+    """Decorator: answer 304 for a view when nothing the page is built from has changed."""
+    def etag(request, *args, **kwargs):
+        return page_validators(request, sources_func, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return page_validators(request, sources_func, *args, **kwargs)[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Per-user page: browsers may keep it but must revalidate every time
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,18 +1,31 @@
+from league.cache import cached_bell
 from league.models import NotificationReceipt
 from django.conf import settings
 
+BELL_PREVIEW_SIZE = 10
+
+
+def _bell(user_id):
+    unread = NotificationReceipt.objects.filter(user_id=user_id, read_at__isnull=True)
+    preview = (
+        unread.order_by("-notification__created_at")
+        .values("id", "notification__title")[:BELL_PREVIEW_SIZE]
+    )
+    # Plain dicts shaped like receipts (r.id, r.notification.title) so they pickle cheaply
+    items = [{"id": r["id"], "notification": {"title": r["notification__title"]}} for r in preview]
+    # A short preview is the whole unread set; only count when it was capped
+    count = len(items) if len(items) < BELL_PREVIEW_SIZE else unread.count()
+    return {"items": items, "count": count}
+
+
 def notifications_context(request):
-    if not request.user.is_authenticated:
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated):
         return {"notifications": [], "notif_count": 0}
-    qs = (
-        NotificationReceipt.objects
-        .filter(user=request.user, read_at__isnull=True)
-        .select_related("notification")
-        .order_by("-notification__created_at")[:10]
-    )
+    bell = cached_bell(user.pk, lambda: _bell(user.pk))
     return {
-        "notifications": qs,
-        "notif_count": qs.count()
+        "notifications": bell["items"],
+        "notif_count": bell["count"],
     }
 
 def sms_flags(request):
@@ -0,0 +1,428 @@
+# league/delivery.py
+"""Delivery of the email/SMS DeliveryAttempts queued by notify().
+
+notify() only writes rows inside the caller's transaction: the Notification, the
+receipts and PENDING attempts with the message already rendered. When that
+transaction commits, hand_off() bumps a wake-up counter in the shared cache and
+`manage.py run_delivery_worker` sends the attempts, so a request never waits on
+SMTP or an SMS provider however many people it notifies.
+
+Workers lease attempts before sending them: a batch is claimed by stamping
+lease_owner/leased_until, with SELECT ... FOR UPDATE SKIP LOCKED where the database
+supports it so concurrent workers never pick the same rows. SQLite has no row locks,
+but it serializes writes, so there the claim is a conditional UPDATE that only matches
+rows nobody else holds. A lease that expires (the worker died) makes the attempt
+claimable again. NOTIFY_DELIVERY_CONCURRENCY caps how many senders work on a channel at
+once across all workers. A sender is one thread with one leased batch; for email it
+sends the whole batch over a single backend connection (one SMTP handshake, or Anymail
+batch sends with merge_data for identical messages).
+
+Attempts with next_attempt_at set wait in a partial index keyed by that time: SMS held
+for the recipient's quiet hours (due at the end of their window) and retries. Each round
+first moves the due ones into the ready queue with one indexed UPDATE, so workers only
+ever scan ready rows.
+
+With NOTIFY_COALESCE_SECONDS set, notify() holds new attempts for that long (joining a
+window already open for the same user and channel), and when they come due everything
+for one recipient and channel goes out as a single digest rendered from the digest
+templates. A results night that posts the lineup and then each sub's result sends one
+message per player instead of several; messages_saved() counts the sends avoided.
+
+Every provider call first takes a token from that provider's rate limit (league.ratelimit,
+shared through the cache). When the next token is further away than a short sleep,
+the rest of the batch is rescheduled for when it arrives rather than sent into the
+provider's 429s.
+
+SMS calls go through the provider's circuit breaker (league.providers); while it is open
+the batch is rescheduled for the end of the cool-down, again without using up a try.
+
+A failed send is retried when the error is transient (timeouts, connection errors,
+HTTP 5xx/408/429, SMTP 4xx): the attempt goes back to PENDING with next_attempt_at set
+by exponential backoff with jitter, until NOTIFY_RETRY_MAX_ATTEMPTS. Permanent errors
+(HTTP 4xx, SMTP 5xx, bad configuration) mark it FAILED right away.
+
+With NOTIFY_DELIVERY_INLINE set, hand_off() also sends the attempts right after the
+commit in the same process, for development without a worker running.
+"""
+import logging
+import os
+import random
+import smtplib
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+import requests
+
+from league import ratelimit
+from league.models import DeliveryAttempt
+from league.providers import ProviderUnavailable, sms_provider
+
+logger = logging.getLogger(__name__)
+
+_WAKE_KEY = "league:delivery:wake"
+
+CHANNELS = (DeliveryAttempt.Channel.EMAIL, DeliveryAttempt.Channel.SMS)
+DEFAULT_CONCURRENCY = {"EMAIL": 4, "SMS": 2}
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_RETRY_BASE_SECONDS = 30
+DEFAULT_RETRY_MAX_SECONDS = 3600
+
+
+class DeliveryError(Exception):
+    """A send the provider did not accept; `transient` ones are retried later."""
+
+    def __init__(self, message, transient=True):
+        super().__init__(message)
+        self.transient = transient
+
+
+def transient_status(code):
+    """HTTP status worth retrying: server errors, timeouts and rate limiting."""
+    return code >= 500 or code in (408, 429)
+
+
+def is_transient(exc):
+    """Classify a send error: True to retry with backoff, False to give up."""
+    if isinstance(exc, DeliveryError):
+        return exc.transient
+    if isinstance(exc, ProviderUnavailable):
+        return True
+    # Anymail API errors carry status_code, Twilio's TwilioRestException carries status
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if isinstance(status, int):
+        return transient_status(status)
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500  # SMTP: 4xx temporary, 5xx permanent
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, smtplib.SMTPServerDisconnected, OSError))
+
+
+def wake_generation():
+    """Counter bumped on every hand-off; workers poll it instead of the database while idle."""
+    return cache.get(_WAKE_KEY, 0)
+
+
+def hand_off(attempt_ids):
+    """on_commit hook for notify(): tell the workers there is something to send."""
+    try:
+        cache.incr(_WAKE_KEY)
+    except ValueError:
+        cache.set(_WAKE_KEY, 1, timeout=None)
+    if getattr(settings, "NOTIFY_DELIVERY_INLINE", False):
+        owner = worker_id()
+        for channel in CHANNELS:
+            deliver(lease_batch(channel, owner, len(attempt_ids), ids=attempt_ids))
+
+
+def worker_id():
+    """Lease owner name: host, pid and a random suffix (pids repeat across containers)."""
+    return f"{socket.gethostname()[:36]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def concurrency(channel):
+    caps = {**DEFAULT_CONCURRENCY, **getattr(settings, "NOTIFY_DELIVERY_CONCURRENCY", {})}
+    return max(1, int(caps.get(channel, 1)))
+
+
+def lease_seconds():
+    return int(getattr(settings, "NOTIFY_DELIVERY_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+
+
+def max_attempts():
+    return int(getattr(settings, "NOTIFY_RETRY_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+
+
+def retry_delay(failures):
+    """Seconds before the next try after `failures` failed ones: doubling, capped, half of it jittered."""
+    base = int(getattr(settings, "NOTIFY_RETRY_BASE_SECONDS", DEFAULT_RETRY_BASE_SECONDS))
+    cap = int(getattr(settings, "NOTIFY_RETRY_MAX_SECONDS", DEFAULT_RETRY_MAX_SECONDS))
+    delay = min(cap, base * 2 ** max(0, failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def record_failure(attempt, exc):
+    """Schedule a retry for a transient error, or mark the attempt FAILED for good."""
+    attempt.retry_count += 1
+    attempt.error = str(exc)[:500]
+    if is_transient(exc) and attempt.retry_count < max_attempts():
+        attempt.status = "PENDING"
+        attempt.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(attempt.retry_count))
+        logger.warning("[delivery] %s attempt %s failed (try %d), retrying at %s: %s", attempt.channel, attempt.pk,
+                       attempt.retry_count, attempt.next_attempt_at, attempt.error)
+    else:
+        attempt.status = "FAILED"
+        attempt.next_attempt_at = None
+        logger.error("[delivery] %s attempt %s failed permanently after %d tries: %s", attempt.channel, attempt.pk,
+                     attempt.retry_count, attempt.error)
+    attempt.save(update_fields=["status", "error", "retry_count", "next_attempt_at", "leased_until", "lease_owner"])
+
+
+def due_retries(now=None):
+    """Deferred or retried attempts whose time has come."""
+    return DeliveryAttempt.objects.filter(status="PENDING", next_attempt_at__lte=now or timezone.now())
+
+
+def coalesce_seconds():
+    return int(getattr(settings, "NOTIFY_COALESCE_SECONDS", 0) or 0)
+
+
+def _coalesce(due):
+    """Merge due first tries to the same user on the same channel into one digest: the oldest
+    attempt carries the digest, the others become COALESCED. Returns how many were merged away."""
+    from league.notifications import _build_digest
+
+    qs = due.filter(retry_count=0, error="", user__isnull=False).select_related("user").order_by("created_at", "id")
+    merged = 0
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True, of=("self",))
+        groups = {}
+        for a in qs:
+            groups.setdefault((a.user_id, a.channel), []).append(a)
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            keep, rest = group[0], group[1:]
+            # Conditional, so rows another worker already merged or released are left alone
+            if not DeliveryAttempt.objects.filter(pk__in=[a.pk for a in rest], next_attempt_at__isnull=False).update(
+                status="COALESCED", next_attempt_at=None, error=f"merged into digest #{keep.pk}",
+            ):
+                continue
+            keep.subject, keep.body_text, keep.body_html = _build_digest(group, keep.user)
+            keep.save(update_fields=["subject", "body_text", "body_html"])
+            merged += len(rest)
+    if merged:
+        logger.info("[delivery] coalesced %d attempts into digests", merged)
+    return merged
+
+
+def messages_saved(since=None):
+    """Provider sends avoided by coalescing: attempts merged into another one's digest."""
+    qs = DeliveryAttempt.objects.filter(status="COALESCED")
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    return qs.count()
+
+
+def release_due(now=None, ids=None):
+    """Move due deferred/retried attempts into the ready queue; a range scan of the due index.
+    With NOTIFY_COALESCE_SECONDS set, what is due for the same user and channel is merged first."""
+    qs = due_retries(now)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    if coalesce_seconds() > 0:
+        _coalesce(qs)
+    return qs.update(next_attempt_at=None)
+
+
+def _unleased(now):
+    return Q(leased_until__isnull=True) | Q(leased_until__lt=now)
+
+
+def in_flight(channel, now=None):
+    """Senders (lease owners) currently working through a batch of this channel."""
+    now = now or timezone.now()
+    return (
+        DeliveryAttempt.objects.filter(channel=channel, status="PENDING", leased_until__gte=now)
+        .values("lease_owner").distinct().count()
+    )
+
+
+def lease_batch(channel, owner, limit, ids=None):
+    """Claim up to `limit` of the oldest unleased PENDING attempts of `channel` for `owner`."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    until = now + timedelta(seconds=lease_seconds())
+    qs = DeliveryAttempt.objects.filter(channel=channel, status="PENDING", next_attempt_at__isnull=True).filter(
+        _unleased(now)
+    )
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    qs = qs.order_by("created_at", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            claimed = list(qs.select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit])
+            DeliveryAttempt.objects.filter(pk__in=claimed).update(lease_owner=owner, leased_until=until)
+    else:
+        # Re-check the lease in the UPDATE itself: a row another worker claimed in between no longer matches
+        claimed = list(qs.values_list("pk", flat=True)[:limit])
+        DeliveryAttempt.objects.filter(pk__in=claimed, status="PENDING").filter(_unleased(now)).update(
+            lease_owner=owner, leased_until=until,
+        )
+    return list(
+        DeliveryAttempt.objects.filter(pk__in=claimed, lease_owner=owner, leased_until=until).order_by("created_at", "id")
+    )
+
+
+def _deliver_one(attempt, connection=None):
+    from league.notifications import _send_email, _send_sms
+
+    # The sender's save() writes these too, releasing the lease together with the outcome
+    attempt.leased_until = None
+    attempt.lease_owner = ""
+    try:
+        if attempt.channel == DeliveryAttempt.Channel.EMAIL:
+            _send_email(attempt, connection=connection)
+        else:
+            _send_sms(attempt)
+    except ProviderUnavailable:
+        raise
+    except Exception as e:
+        if not isinstance(e, DeliveryError):
+            logger.exception("[delivery] %s attempt %s raised", attempt.channel, attempt.pk)
+        record_failure(attempt, e)
+    return attempt.status in ("SENT", "QUEUED")
+
+
+def _open(mail_connection):
+    try:
+        mail_connection.open()
+    except Exception:
+        # Each send retries the connection and records its own failure
+        logger.warning("[delivery] could not open the email connection", exc_info=True)
+
+
+def _deliver_merged(group, mail_connection):
+    """Identical emails to several people as one Anymail batch send (merge_data makes it one message each)."""
+    from league.notifications import _email_message, _email_provider
+
+    first = group[0]
+    msg = _email_message(first, connection=mail_connection)
+    msg.to = [a.to for a in group]
+    msg.merge_data = {a.to: {} for a in group}
+    now = timezone.now()
+    try:
+        msg.send()
+    except Exception as e:
+        for a in group:
+            a.leased_until, a.lease_owner = None, ""
+            record_failure(a, e)
+        return 0
+    recipients = getattr(getattr(msg, "anymail_status", None), "recipients", {}) or {}
+    sent = 0
+    for a in group:
+        a.leased_until, a.lease_owner = None, ""
+        status = recipients.get(a.to)
+        if status is not None and status.status in ("rejected", "invalid", "failed"):
+            record_failure(a, DeliveryError(f"provider {status.status}", transient=status.status == "failed"))
+            continue
+        a.status, a.sent_at, a.error = "SENT", now, ""
+        a.provider = _email_provider(mail_connection)
+        a.provider_message_id = str(getattr(status, "message_id", "") or "")[:255]
+        a.save(update_fields=["status", "sent_at", "error", "provider", "provider_message_id", "leased_until",
+                              "lease_owner"])
+        sent += 1
+    return sent
+
+
+def provider_for(attempt):
+    """Rate-limit bucket an attempt is sent through: "email", or the configured SMS provider."""
+    if attempt.channel == DeliveryAttempt.Channel.EMAIL:
+        return "email"
+    return sms_provider()
+
+
+def defer(attempts, wait, reason):
+    """Put leased attempts back in the queue, due in `wait` seconds. Not a failure: no try is used up."""
+    due = timezone.now() + timedelta(seconds=wait)
+    for a in attempts:
+        a.status, a.next_attempt_at, a.error = "PENDING", due, reason
+        a.leased_until, a.lease_owner = None, ""
+    DeliveryAttempt.objects.bulk_update(attempts, ["status", "next_attempt_at", "error", "leased_until", "lease_owner"])
+    logger.info("[delivery] %s; %d attempts rescheduled in %.1fs", reason, len(attempts), wait)
+
+
+def _throttled(name, remaining):
+    """Wait for a send token; when the wait is too long, reschedule `remaining` and return True."""
+    wait = ratelimit.take(name)
+    if wait:
+        defer(remaining, wait, f"rate limited ({name})")
+    return bool(wait)
+
+
+def _deliver_emails(attempts):
+    from django.core.mail import get_connection
+
+    mail_connection = get_connection()
+    _open(mail_connection)
+    units, sent = [[a] for a in attempts], 0
+    try:
+        if type(mail_connection).__module__.startswith("anymail."):
+            groups = {}
+            for a in attempts:
+                groups.setdefault((a.subject, a.body_text, a.body_html), {}).setdefault(a.to, a)
+            merged = [list(g.values()) for g in groups.values() if len(g) > 1]
+            merged_ids = {a.pk for g in merged for a in g}
+            units = merged + [[a] for a in attempts if a.pk not in merged_ids]
+        for i, unit in enumerate(units):
+            # One token per provider call: a merged batch send is a single API request
+            if _throttled("email", [a for u in units[i:] for a in u]):
+                break
+            if len(unit) > 1:
+                sent += _deliver_merged(unit, mail_connection)
+            elif _deliver_one(unit[0], connection=mail_connection):
+                sent += 1
+            else:
+                # Don't keep sending into a session that may be broken
+                mail_connection.close()
+                _open(mail_connection)
+    finally:
+        mail_connection.close()
+    return sent
+
+
+def _deliver_in_thread(attempts):
+    try:
+        return deliver(attempts)
+    finally:
+        connection.close()  # pool threads each open their own database connection
+
+
+def deliver(attempts):
+    """Send one leased batch in order; email shares a single backend connection. Returns how many were accepted."""
+    attempts = list(attempts)
+    emails = [a for a in attempts if a.channel == DeliveryAttempt.Channel.EMAIL]
+    sent = _deliver_emails(emails) if emails else 0
+    others = [a for a in attempts if a.channel != DeliveryAttempt.Channel.EMAIL]
+    for i, a in enumerate(others):
+        if _throttled(provider_for(a), others[i:]):
+            break
+        try:
+            sent += _deliver_one(a)
+        except ProviderUnavailable as e:
+            # Hold the rest of the batch until the cool-down ends instead of spending their retries
+            defer(others[i:], e.retry_after, str(e))
+            break
+    return sent
+
+
+def deliver_round(owner, batch_size=50, ids=None):
+    """Lease and send batches for each channel, one sender thread per batch within the channel's
+    concurrency cap (only `ids` if given). Returns (picked, sent)."""
+    release_due(ids=ids)
+    picked = sent = 0
+    for channel in CHANNELS:
+        batches = []
+        for slot in range(concurrency(channel) - in_flight(channel)):
+            batch = lease_batch(channel, f"{owner}/{slot}", batch_size, ids=ids)
+            if not batch:
+                break
+            batches.append(batch)
+        picked += sum(len(b) for b in batches)
+        if len(batches) == 1:
+            sent += deliver(batches[0])
+        elif batches:
+            with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix=f"delivery-{channel}") as pool:
+                sent += sum(pool.map(_deliver_in_thread, batches))
+    return picked, sent
@@ -0,0 +1,203 @@
+# league/delivery_status.py
+"""Delivery status callbacks from the providers: Twilio status callbacks, Brevo SMS
+webhooks and, through Anymail's tracking signal, Brevo email webhooks.
+
+A broadcast is followed by a burst of callbacks, several per message. Each one is
+buffered in the cache (a sequence number from incr() and one key per callback) and
+answered right away. The buffer is applied in batches, with one SELECT through the
+(provider, provider_message_id) unique index and one bulk_update. A batch is applied
+when NOTIFY_STATUS_BATCH callbacks are waiting or NOTIFY_STATUS_FLUSH_SECONDS after the
+previous flush (checked by the next callback), and on every delivery worker round.
+
+The buffer needs an atomic incr() shared by every process, so it is only used on Redis
+or memcached. On the file and local-memory caches each callback is applied on its own,
+right away, as one conditional UPDATE through the same index.
+
+Statuses only move forward: QUEUED → SENT → DELIVERED, with FAILED in place of
+DELIVERED. A late or repeated callback never moves an attempt back. A callback for a
+message whose id isn't saved yet (the provider was faster than the sender's save) is
+kept for later flushes for up to UNMATCHED_KEEP_SECONDS.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from league.cache import atomic_cache
+from league.models import DeliveryAttempt
+
+logger = logging.getLogger(__name__)
+
+STATUS_RANK = {"PENDING": 0, "QUEUED": 1, "SENT": 2, "DELIVERED": 3, "FAILED": 3}
+
+TWILIO_STATUSES = {
+    "accepted": "QUEUED", "scheduled": "QUEUED", "queued": "QUEUED", "sending": "QUEUED",
+    "sent": "SENT", "delivered": "DELIVERED", "read": "DELIVERED",
+    "undelivered": "FAILED", "failed": "FAILED", "canceled": "FAILED",
+}
+# Brevo SMS webhook msg_status/event values, lowercased with "_" dropped (soft bounces are retried by Brevo)
+BREVO_SMS_STATUSES = {
+    "accepted": "QUEUED", "sent": "SENT", "delivered": "DELIVERED",
+    "hardbounce": "FAILED", "rejected": "FAILED", "blacklisted": "FAILED", "skip": "FAILED", "error": "FAILED",
+}
+# Anymail's normalized tracking event types
+EMAIL_EVENTS = {
+    "queued": "QUEUED", "sent": "SENT", "delivered": "DELIVERED",
+    "bounced": "FAILED", "rejected": "FAILED", "failed": "FAILED",
+}
+
+DEFAULT_BATCH = 50
+DEFAULT_FLUSH_SECONDS = 5
+FLUSH_LIMIT = 500
+ENTRY_TIMEOUT = 3600
+UNMATCHED_KEEP_SECONDS = 60
+
+_SEQ_KEY = "league:status:seq"
+_DONE_KEY = "league:status:done"
+_GAP_KEY = "league:status:gap"
+_LOCK_KEY = "league:status:flushing"
+_FLUSHED_AT_KEY = "league:status:flushed_at"
+
+
+def _entry_key(n):
+    return f"league:status:entry:{n}"
+
+
+def advances(current, new):
+    """True if an attempt in `current` may move to `new`."""
+    return current in STATUS_RANK and STATUS_RANK[new] > STATUS_RANK[current]
+
+
+def _push(entry):
+    try:
+        n = cache.incr(_SEQ_KEY)
+    except ValueError:
+        # First callback, or the counter was evicted: start over from 1
+        if cache.add(_SEQ_KEY, 1, timeout=None):
+            cache.set(_DONE_KEY, 0, timeout=None)
+            n = 1
+        else:
+            n = cache.incr(_SEQ_KEY)
+    cache.set(_entry_key(n), entry, timeout=ENTRY_TIMEOUT)
+    return n
+
+
+def buffered():
+    """True when the cache can hold the shared buffer: incr()/add() atomic across processes."""
+    return atomic_cache()
+
+
+def record_status(provider, message_id, status, error=""):
+    """Buffer one callback (status already mapped to ours; None to ignore it) and flush when due."""
+    if not message_id or status not in STATUS_RANK:
+        return
+    entry = (provider, str(message_id)[:255], status, (error or "")[:500], time.time())
+    if not buffered():
+        _apply_one(*entry[:4])
+        return
+    n = _push(entry)
+    waiting = n - (cache.get(_DONE_KEY) or 0)
+    batch = int(getattr(settings, "NOTIFY_STATUS_BATCH", DEFAULT_BATCH))
+    interval = float(getattr(settings, "NOTIFY_STATUS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS))
+    if waiting >= batch or time.time() - (cache.get(_FLUSHED_AT_KEY) or 0) >= interval:
+        flush_status_updates()
+
+
+def record_twilio(data):
+    """A Twilio status callback (the POSTed form)."""
+    status = (data.get("MessageStatus") or "").lower()
+    code = data.get("ErrorCode") or ""
+    record_status("twilio", data.get("MessageSid"), TWILIO_STATUSES.get(status),
+                  f"twilio {status} ({code})" if code else f"twilio {status}")
+
+
+def record_brevo_sms(event):
+    """One event of a Brevo transactional SMS webhook (the JSON body)."""
+    message_id = event.get("messageId") or event.get("message-id") or event.get("message_id")
+    status = str(event.get("msg_status") or event.get("event") or "").lower().replace("_", "")
+    record_status("brevo", message_id, BREVO_SMS_STATUSES.get(status), event.get("reason") or f"brevo {status}")
+
+
+def record_email_event(esp_name, event):
+    """An Anymail tracking event (Brevo email webhooks)."""
+    record_status(esp_name.lower(), event.message_id, EMAIL_EVENTS.get(event.event_type),
+                  event.description or event.mta_response or f"{esp_name.lower()} {event.event_type}")
+
+
+def _apply_one(provider, message_id, status, error):
+    # One conditional UPDATE, so concurrent callbacks for a message can't move it backwards
+    earlier = [s for s, rank in STATUS_RANK.items() if rank < STATUS_RANK[status]]
+    fields = {"status": status, "error": error} if status == "FAILED" else {"status": status}
+    if not DeliveryAttempt.objects.filter(provider=provider, provider_message_id=message_id,
+                                          status__in=earlier).update(**fields):
+        logger.info("[delivery_status] %s %s: no attempt to move to %s", provider, message_id, status)
+
+
+def _apply(entries):
+    """Apply callbacks: returns (attempts changed, entries whose attempt wasn't found)."""
+    latest = {}
+    for provider, message_id, status, error, ts in entries:
+        seen = latest.get((provider, message_id))
+        if seen is None or STATUS_RANK[status] > STATUS_RANK[seen[0]]:
+            latest[(provider, message_id)] = (status, error, ts)
+    if not latest:
+        return 0, []
+
+    by_provider = {}
+    for provider, message_id in latest:
+        by_provider.setdefault(provider, []).append(message_id)
+    lookup = Q()
+    for provider, ids in by_provider.items():
+        lookup |= Q(provider=provider, provider_message_id__in=ids)
+
+    changed, found = [], set()
+    for a in DeliveryAttempt.objects.filter(lookup).only("id", "provider", "provider_message_id", "status", "error"):
+        key = (a.provider, a.provider_message_id)
+        found.add(key)
+        status, error, _ = latest[key]
+        if advances(a.status, status):
+            a.status = status
+            if status == "FAILED":
+                a.error = error
+            changed.append(a)
+    DeliveryAttempt.objects.bulk_update(changed, ["status", "error"], batch_size=FLUSH_LIMIT)
+
+    now = time.time()
+    unmatched = [(p, m, *v) for (p, m), v in latest.items()
+                 if (p, m) not in found and now - v[2] < UNMATCHED_KEEP_SECONDS]
+    return len(changed), unmatched
+
+
+def flush_status_updates(limit=FLUSH_LIMIT):
+    """Apply up to `limit` buffered callbacks in one batch; returns how many attempts changed status."""
+    if not buffered() or not cache.add(_LOCK_KEY, 1, timeout=30):
+        return 0  # nothing buffered here, or another process is flushing
+    try:
+        cache.set(_FLUSHED_AT_KEY, time.time(), timeout=None)
+        done = cache.get(_DONE_KEY) or 0
+        head = cache.get(_SEQ_KEY) or 0
+        seqs = range(done + 1, min(head, done + limit) + 1)
+        found = cache.get_many([_entry_key(n) for n in seqs])
+        entries, upto = [], done
+        for n in seqs:
+            entry = found.get(_entry_key(n))
+            if entry is None and cache.get(_GAP_KEY) != n:
+                # Probably still being written by the request that took the number; skip it if still missing next time
+                cache.set(_GAP_KEY, n, timeout=ENTRY_TIMEOUT)
+                break
+            if entry is not None:
+                entries.append(entry)
+            upto = n
+        changed, unmatched = _apply(entries)
+        cache.set(_DONE_KEY, upto, timeout=None)
+        cache.delete_many([_entry_key(n) for n in range(done + 1, upto + 1)])
+        for entry in unmatched:
+            _push(entry)
+    finally:
+        cache.delete(_LOCK_KEY)
+    if entries:
+        logger.info("[delivery_status] applied %d callbacks: %d attempts changed, %d not found yet",
+                    len(entries), changed, len(unmatched))
+    return changed
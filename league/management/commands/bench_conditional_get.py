@@ -0,0 +1,62 @@
+# league/management/commands/bench_conditional_get.py
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from league.models import Fixture
+
+
+class Command(BaseCommand):
+    help = "Benchmark full renders vs. 304 revalidations for schedule_list, fixture_detail and my_results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User to log in as (should have a player profile)")
+        parser.add_argument("--iterations", type=int, default=200, help="Requests per page and mode (default 200)")
+
+    def _run(self, client, url, n, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, secure=True, **headers)
+        queries = len(ctx.captured_queries)
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get(url, secure=True, **headers)
+        elapsed = time.perf_counter() - start
+        return response, queries, elapsed * 1000 / n
+
+    def handle(self, *args, **opts):
+        user = get_user_model().objects.filter(username=opts["username"]).first()
+        if not user:
+            raise CommandError(f"No user named {opts['username']!r}.")
+        fixture = Fixture.objects.order_by("-date").first()
+        if not fixture:
+            raise CommandError("No fixtures to benchmark against.")
+        n = max(1, opts["iterations"])
+
+        pages = [
+            ("schedule_list", reverse("schedule_list")),
+            ("fixture_detail", reverse("fixture_detail", args=[fixture.pk])),
+            ("my_results", reverse("my_results")),
+        ]
+        # Run against the real views without collectstatic/HTTPS in the way
+        storages = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+        with override_settings(ALLOWED_HOSTS=["*"], STORAGES=storages, DEBUG=False):
+            client = Client()
+            client.force_login(user)
+            for name, url in pages:
+                client.get(url, secure=True)  # warm up caches and the CSRF cookie
+                full, full_q, full_ms = self._run(client, url, n)
+                etag = full.get("ETag")
+                if full.status_code != 200 or not etag:
+                    self.stdout.write(self.style.WARNING(f"{name}: status {full.status_code}, no ETag; skipped"))
+                    continue
+                cond, cond_q, cond_ms = self._run(client, url, n, HTTP_IF_NONE_MATCH=etag)
+                self.stdout.write(
+                    f"{name:<15} 200: {full_ms:7.2f} ms/req {full_q:3d} queries {len(full.content):7d} bytes | "
+                    f"{cond.status_code}: {cond_ms:7.2f} ms/req {cond_q:3d} queries | {full_ms / cond_ms:5.1f}x"
+                )
@@ -0,0 +1,76 @@
+# league/management/commands/bench_email_delivery.py
+import socketserver
+import threading
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from league.models import DeliveryAttempt
+from league.notifications import _email_message
+
+
+class _SMTPSink(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail and throw it away, with a delay standing in for the TCP/TLS handshake."""
+
+    def handle(self):
+        time.sleep(self.server.connect_latency)
+        self.wfile.write(b"220 sink ESMTP\r\n")
+        for line in self.rfile:
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                self.wfile.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb == b"DATA":
+                self.wfile.write(b"354 end with .\r\n")
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                self.wfile.write(b"250 queued\r\n")
+            elif verb == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class Command(BaseCommand):
+    help = "Email throughput over a local SMTP stand-in: a connection per message vs. one connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipients", type=int, nargs="+", default=[50, 500, 5000])
+        parser.add_argument("--connect-latency-ms", type=float, default=5.0,
+                            help="Delay before the server greeting on each new connection (default 5)")
+
+    def handle(self, *args, **opts):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPSink)
+        server.daemon_threads = True
+        server.connect_latency = opts["connect_latency_ms"] / 1000
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        backend = {"backend": "django.core.mail.backends.smtp.EmailBackend", "host": host, "port": port,
+                   "use_tls": False, "use_ssl": False, "username": "", "password": ""}
+        try:
+            for n in opts["recipients"]:
+                # Unsaved attempts: the same message building the worker does, without the database
+                attempts = [DeliveryAttempt(channel="EMAIL", to=f"player{i}@example.com", subject="Lineup posted",
+                                            body_text="You're in the lineup.", body_html="<p>You're in the lineup.</p>")
+                            for i in range(n)]
+
+                start = time.perf_counter()
+                for a in attempts:
+                    _email_message(a, connection=get_connection(**backend)).send()
+                per_message = time.perf_counter() - start
+
+                start = time.perf_counter()
+                with get_connection(**backend) as conn:
+                    for a in attempts:
+                        _email_message(a, connection=conn).send()
+                shared = time.perf_counter() - start
+
+                self.stdout.write(
+                    f"{n:>6} recipients | connection per message: {n / per_message:8.1f} msg/s ({per_message:7.2f} s) | "
+                    f"one connection: {n / shared:8.1f} msg/s ({shared:7.2f} s) | {per_message / shared:5.1f}x"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
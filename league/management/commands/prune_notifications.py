@@ -0,0 +1,158 @@
+# league/management/commands/prune_notifications.py
+import gzip
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from league.cache import invalidate_bell
+from league.models import DeliveryAttempt, Notification, NotificationReceipt
+
+# Days to keep; NOTIFY_RETENTION overrides individual entries. Delivery attempts go by status (PENDING ones
+# are never pruned); notifications by event, and with them their receipts and remaining attempts.
+DEFAULT_RETENTION = {
+    "deliveries": {"SUPPRESSED": 14, "COALESCED": 14, "SENT": 90, "DELIVERED": 90, "QUEUED": 90,
+                   "FAILED": 180},
+    "notifications": {"default": 365, "MATCH_REMINDER_24H": 60, "AVAILABILITY_REMINDER_5D": 60},
+}
+
+
+class _Archive:
+    """One gzipped JSONL file per table for this run, written before each batch is deleted."""
+
+    def __init__(self, directory, stamp):
+        self.directory = Path(directory)
+        self.stamp = stamp
+        self.files = {}
+
+    def write(self, model, rows):
+        name = model._meta.db_table
+        f = self.files.get(name)
+        if f is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            f = self.files[name] = gzip.open(self.directory / f"{name}-{self.stamp}.jsonl.gz", "at", encoding="utf-8")
+        for row in rows:
+            f.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+        f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        return sorted(f.name for f in self.files.values())
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete old notifications, receipts and delivery attempts per NOTIFY_RETENTION, in bounded batches "
+        "(each its own short transaction), optionally archiving them to gzipped JSONL under MEDIA_ROOT first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per delete (default 1000)")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches (default 0)")
+        parser.add_argument("--archive", action="store_true",
+                            help="Write the rows to MEDIA_ROOT/archive/notifications/*.jsonl.gz before deleting")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+
+    def handle(self, *args, **opts):
+        overrides = getattr(settings, "NOTIFY_RETENTION", {})
+        retention = {k: {**v, **overrides.get(k, {})} for k, v in DEFAULT_RETENTION.items()}
+        now = timezone.now()
+        self.batch_size = max(1, opts["batch_size"])
+        self.pause = opts["sleep"]
+        self.dry_run = opts["dry_run"]
+        self.archive = None
+        if opts["archive"] and not self.dry_run:
+            directory = Path(settings.MEDIA_ROOT) / "archive" / "notifications"
+            self.archive = _Archive(directory, now.strftime("%Y%m%d-%H%M%S"))
+        self.deleted = {}
+
+        start = time.perf_counter()
+        try:
+            for status, days in retention["deliveries"].items():
+                if status == "PENDING":
+                    continue  # still in the outbox
+                for channel in DeliveryAttempt.Channel.values:
+                    # One channel at a time so the (channel, status, created_at) index finds the batch
+                    self._prune_attempts(DeliveryAttempt.objects.filter(
+                        channel=channel, status=status, created_at__lt=now - timedelta(days=days),
+                    ), f"attempts {status}")
+
+            events = retention["notifications"]
+            default_days = events.get("default")
+            # Events actually stored, not just Notification.Event: send_event() also takes keys outside the enum
+            stored = Notification.objects.order_by("event").values_list("event", flat=True).distinct()
+            for event in list(stored):
+                days = events.get(event, default_days)
+                if days is None:
+                    continue
+                qs = Notification.objects.filter(event=event, created_at__lt=now - timedelta(days=days))
+                self._prune_notifications(qs.exclude(deliveries__status="PENDING"), f"notifications {event}")
+        finally:
+            files = self.archive.close() if self.archive else []
+        elapsed = time.perf_counter() - start
+
+        total = sum(self.deleted.values())
+        verb = "Would delete" if self.dry_run else "Deleted"
+        for label, n in self.deleted.items():
+            if n:
+                self.stdout.write(f"{verb} {n} {label}")
+        for name in files:
+            self.stdout.write(f"Archived to {name}")
+        rate = total / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)."))
+
+    def _batches(self, qs):
+        """Yield lists of up to batch_size pks, walking the primary key so each batch is an index range."""
+        qs = qs.order_by("pk").values_list("pk", flat=True)
+        last = 0
+        while True:
+            ids = list(qs.filter(pk__gt=last)[: self.batch_size])
+            if not ids:
+                return
+            yield ids
+            last = ids[-1]
+            if self.pause and not self.dry_run:
+                time.sleep(self.pause)
+
+    def _count(self, label, n):
+        self.deleted[label] = self.deleted.get(label, 0) + n
+
+    def _prune_attempts(self, qs, label):
+        for ids in self._batches(qs):
+            if not self.dry_run:
+                with transaction.atomic():
+                    batch = DeliveryAttempt.objects.filter(pk__in=ids)
+                    if self.archive:
+                        self.archive.write(DeliveryAttempt, batch.values())
+                    batch.delete()
+            self._count(label, len(ids))
+
+    def _prune_notifications(self, qs, label):
+        for ids in self._batches(qs):
+            receipts = NotificationReceipt.objects.filter(notification_id__in=ids)
+            attempts = DeliveryAttempt.objects.filter(notification_id__in=ids)
+            if self.dry_run:
+                self._count("receipts", receipts.count())
+                self._count("attempts (with their notification)", attempts.count())
+                self._count(label, len(ids))
+                continue
+            with transaction.atomic():
+                if self.archive:
+                    self.archive.write(Notification, Notification.objects.filter(pk__in=ids).values())
+                    self.archive.write(NotificationReceipt, receipts.values())
+                    self.archive.write(DeliveryAttempt, attempts.values())
+                # Unread receipts still count on the bell
+                invalidate_bell(*receipts.filter(read_at__isnull=True).values_list("user_id", flat=True).distinct())
+                n_receipts = receipts.delete()[0]
+                n_attempts = attempts.delete()[0]
+                Notification.objects.filter(pk__in=ids).delete()
+            self._count("receipts", n_receipts)
+            self._count("attempts (with their notification)", n_attempts)
+            self._count(label, len(ids))
@@ -0,0 +1,37 @@
+# league/management/commands/rebuild_player_stats.py
+from django.core.management.base import BaseCommand, CommandError
+
+from league.models import Season
+from league.services.stats import rebuild_season_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or, with --check, verify) the PlayerSeasonStats ledger from lineups, scores and sub results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season-id", type=int, action="append", dest="season_ids",
+                            help="Season ID to rebuild (repeatable). Default: all seasons")
+        parser.add_argument("--check", action="store_true",
+                            help="Report players whose stats are out of date without writing; exits non-zero if any")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
+        if opts.get("season_ids"):
+            seasons = seasons.filter(pk__in=opts["season_ids"])
+            if not seasons.exists():
+                raise CommandError("No matching seasons found.")
+
+        check = opts.get("check", False)
+        drift = 0
+        for season in seasons:
+            changed = rebuild_season_stats(season, dry_run=check)
+            drift += len(changed)
+            if changed:
+                verb = "out of date" if check else "rebuilt"
+                self.stdout.write(self.style.WARNING(f"{season}: {len(changed)} player row(s) {verb} (player ids: {sorted(changed)})"))
+            else:
+                self.stdout.write(f"{season}: ok")
+
+        if check and drift:
+            raise CommandError(f"PlayerSeasonStats out of date for {drift} player row(s). Run without --check to rebuild.")
+        self.stdout.write(self.style.SUCCESS("Stats check passed." if check else "Stats rebuild complete."))
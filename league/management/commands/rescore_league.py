@@ -0,0 +1,111 @@
+# league/management/commands/rescore_league.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from league.models import Fixture, Season
+from league.services.rescore import init_worker, rescore_chunk
+
+
+class Command(BaseCommand):
+    help = "Recompute PlayerMatchPoints and SubResult points for all (or selected) seasons after a scoring rule change."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season-id", type=int, action="append", dest="season_ids",
+                            help="Season ID to rescore (repeatable). Default: all seasons")
+        parser.add_argument("--season-year", type=int, action="append", dest="season_years",
+                            help="Season year to rescore (repeatable)")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Fixtures per batch (default 200)")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (default: CPU count; forced to 1 on SQLite)")
+        parser.add_argument("--dry-run", action="store_true", help="Show what would change (no writes)")
+
+    def handle(self, *args, **opts):
+        seasons = Season.objects.all()
+        if opts.get("season_ids") or opts.get("season_years"):
+            seasons = seasons.filter(pk__in=opts.get("season_ids") or []) | seasons.filter(year__in=opts.get("season_years") or [])
+            if not seasons.exists():
+                raise CommandError("No matching seasons found.")
+
+        chunk_size = opts["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        dry_run = opts.get("dry_run", False)
+
+        workers = opts.get("workers") or os.cpu_count() or 1
+        if workers > 1 and connection.vendor == "sqlite":
+            # SQLite allows a single writer; parallel chunks would just contend for the lock
+            self.stdout.write(self.style.WARNING("SQLite database: running with a single worker."))
+            workers = 1
+
+        fixtures = Fixture.objects.filter(season__in=seasons).order_by("pk")
+        total = fixtures.count()
+        self.stdout.write(self.style.NOTICE(
+            f"{'Dry run:' if dry_run else 'Rescoring'} {total} fixture(s) across {seasons.count()} season(s) "
+            f"in chunks of {chunk_size} with {workers} worker(s)"
+        ))
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Nothing to do."))
+            return
+
+        totals = {"fixtures": 0, "points_created": 0, "points_updated": 0, "points_deleted": 0, "subs_updated": 0}
+        started = time.monotonic()
+
+        def collect(result):
+            for key in totals:
+                totals[key] += result[key]
+            for line in result["diff"]:
+                self.stdout.write(f"  {line}")
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"[{totals['fixtures']}/{total}] {totals['fixtures'] / elapsed:.0f} fixtures/s"
+            )
+
+        chunks = self._chunks(fixtures, chunk_size)
+
+        if workers == 1:
+            for ids in chunks:
+                collect(rescore_chunk(ids, dry_run=dry_run))
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker) as pool:
+                # Keep a bounded number of chunks in flight so ids are streamed, not materialized
+                pending = set()
+                for ids in chunks:
+                    if not pending:
+                        # Workers are started on submit; they must not inherit our DB connection
+                        connections.close_all()
+                    pending.add(pool.submit(rescore_chunk, ids, dry_run))
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            collect(fut.result())
+                for fut in wait(pending).done:
+                    collect(fut.result())
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        summary = (
+            f"{totals['fixtures']} fixture(s) in {elapsed:.2f}s ({totals['fixtures'] / elapsed:.0f}/s): "
+            f"match points +{totals['points_created']} ~{totals['points_updated']} -{totals['points_deleted']}, "
+            f"sub results ~{totals['subs_updated']}"
+        )
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run complete. Would change {summary}. No changes made."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rescore complete. {summary}"))
+
+    @staticmethod
+    def _chunks(fixtures, size):
+        """Yield lists of fixture ids using keyset pagination (no cursor held open between chunks)."""
+        last_pk = 0
+        while True:
+            ids = list(fixtures.filter(pk__gt=last_pk).values_list("pk", flat=True)[:size])
+            if not ids:
+                return
+            yield ids
+            last_pk = ids[-1]
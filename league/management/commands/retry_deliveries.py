@@ -0,0 +1,58 @@
+# league/management/commands/retry_deliveries.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from league.delivery import deliver_round, due_retries, messages_saved, worker_id
+from league.models import DeliveryAttempt
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-drive DeliveryAttempts whose retry backoff or quiet-hours hold has run out, in batches. "
+        "For cron; a running run_delivery_worker picks them up by itself."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Due attempts per round (default 50)")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what is waiting")
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts["batch_size"])
+        owner = worker_id()
+        picked_total = sent_total = 0
+        while not opts["dry_run"]:
+            ids = list(due_retries().order_by("next_attempt_at", "id").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            picked, sent = deliver_round(owner, batch_size, ids=ids)
+            if not picked:
+                break  # everything due is leased by a worker or the channel caps are full
+            picked_total += picked
+            sent_total += sent
+            self.stdout.write(f"Retried {picked}, sent {sent}")
+
+        waiting = DeliveryAttempt.objects.filter(status="PENDING", next_attempt_at__isnull=False)
+        # Quiet-hours holds carry no error; rate-limit and circuit-breaker postponements carry the reason
+        first_try = Q(retry_count=0)
+        summary = waiting.aggregate(
+            next_due=Min("next_attempt_at"),
+            retries=Count("pk", filter=~first_try),
+            held=Count("pk", filter=first_try & Q(error="")),
+            postponed=Count("pk", filter=first_try & ~Q(error="")),
+        )
+        due_now = due_retries().count()
+        self.stdout.write(
+            f"Retried {picked_total}, sent {sent_total}. Waiting: {summary['retries']} retries, "
+            f"{summary['held']} held for quiet hours, {summary['postponed']} postponed by a rate limit or "
+            f"open circuit ({due_now} due now, next at {summary['next_due'] or '-'})."
+        )
+        day_ago = timezone.now() - timedelta(days=1)
+        saved = messages_saved(since=day_ago)
+        if saved:
+            self.stdout.write(f"{saved} messages from the last 24h went out inside a digest instead of on their own.")
+        failed_today = DeliveryAttempt.objects.filter(status="FAILED", retry_count__gt=0, created_at__gte=day_ago).count()
+        if failed_today:
+            self.stdout.write(self.style.WARNING(f"{failed_today} attempts from the last 24h gave up after retrying."))
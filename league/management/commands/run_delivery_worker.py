@@ -0,0 +1,60 @@
+# league/management/commands/run_delivery_worker.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from league.delivery import deliver_round, messages_saved, wake_generation, worker_id
+from league.delivery_status import flush_status_updates
+from league.providers import provider_stats
+from league.ratelimit import throttle_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Send PENDING email/SMS DeliveryAttempts queued by notify(). Runs until interrupted unless --once. "
+        "Start as many as you like: attempts are leased, so no two workers send the same one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is pending, then exit")
+        parser.add_argument("--batch-size", type=int, default=20,
+                            help="Attempts per leased batch (default 20); each batch is sent by one thread over one "
+                                 "connection, NOTIFY_DELIVERY_CONCURRENCY batches per channel at a time")
+        parser.add_argument("--sleep", type=float, default=5.0,
+                            help="Seconds between database polls while idle (default 5); a hand-off wakes the worker early")
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts["batch_size"])
+        owner = worker_id()
+        self.stdout.write(f"Delivery worker {owner} started")
+        seen = wake_generation()
+        total = 0
+        try:
+            while True:
+                flush_status_updates()  # provider callbacks that arrived since the last round
+                picked, sent = deliver_round(owner, batch_size)
+                if picked:
+                    total += sent
+                    self.stdout.write(f"Delivered {sent}/{picked} attempts")
+                    continue
+                if opts["once"]:
+                    break
+                deadline = time.monotonic() + opts["sleep"]
+                while time.monotonic() < deadline:
+                    gen = wake_generation()
+                    if gen != seen:
+                        seen = gen
+                        break
+                    time.sleep(0.25)
+        except KeyboardInterrupt:
+            pass
+        for name, s in provider_stats().items():
+            self.stdout.write(f"{name}: {s['requests']} requests over {s['connections']} connections ({s['reuse']:.0%} reused)")
+        for name, t in throttle_stats().items():
+            if t["throttled"] or t["deferred"]:
+                self.stdout.write(f"{name}: {t['throttled']} sends waited {t['wait_seconds']:.1f}s for the rate limit, "
+                                  f"{t['deferred']} rescheduled")
+        saved = messages_saved(since=timezone.now() - timedelta(days=1))
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} sent, {saved} messages saved by digests in the last 24h."))
@@ -0,0 +1,30 @@
+# league/management/commands/season_cache_stats.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from league.cache import cache_stats, counting, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the per-season read cache (league.cache)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them")
+
+    def handle(self, *args, **opts):
+        backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+        self.stdout.write(f"Backend: {backend}")
+        if not counting():
+            self.stdout.write(self.style.WARNING("Not counting: set SEASON_CACHE_STATS=1 or use Redis/memcached."))
+        elif "locmem" in backend:
+            self.stdout.write(self.style.WARNING("LocMem is per process: counters only cover this process."))
+
+        stats = cache_stats()
+        if not stats:
+            self.stdout.write("No cached season reads recorded yet.")
+        for name, s in stats.items():
+            self.stdout.write(f"{name:<16} hits={s['hits']:<8} misses={s['misses']:<8} hit_rate={s['hit_rate']:.1%}")
+
+        if opts.get("reset"):
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
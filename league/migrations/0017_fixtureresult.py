@@ -0,0 +1,89 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+# Slot points as of this migration: (home, away) per SlotScore result
+BASE_POINTS = {"W": (2.0, 0.0), "WF": (2.0, 0.0), "L": (0.0, 2.0), "LF": (0.0, 2.0), "T": (1.0, 1.0)}
+
+
+def home_share(code, sub1, sub2, home):
+    # Sub (External) rules: singles with a Sub gets 0; doubles with one Sub gets half, with two 0
+    if home <= 0:
+        return 0.0
+    if not code.startswith("D"):
+        return 0.0 if sub1 else home
+    if sub1 and sub2:
+        return 0.0
+    if sub1 or sub2:
+        return home / 2.0
+    return home
+
+
+def backfill_fixture_results(apps, schema_editor):
+    Fixture = apps.get_model("league", "Fixture")
+    FixtureResult = apps.get_model("league", "FixtureResult")
+    SlotScore = apps.get_model("league", "SlotScore")
+    LineupSlot = apps.get_model("league", "LineupSlot")
+    SubResult = apps.get_model("league", "SubResult")
+
+    is_sub = {
+        (fid, code): (bool(s1), bool(s2))
+        for fid, code, s1, s2 in LineupSlot.objects.values_list(
+            "lineup__fixture_id", "slot", "player1__is_substitute", "player2__is_substitute"
+        )
+    }
+    points = defaultdict(lambda: [0.0, 0.0])
+    for fid, code, result in SlotScore.objects.values_list("fixture_id", "slot_code", "result"):
+        home, away = BASE_POINTS.get(result, (0.0, 0.0))
+        points[fid][0] += home_share(str(code), *is_sub.get((fid, code), (False, False)), home)
+        points[fid][1] += away
+    subs = dict(
+        SubResult.objects.values("fixture_id").annotate(total=Sum("points_cached")).values_list("fixture_id", "total")
+    )
+    rows = []
+    for fid, season_id in Fixture.objects.values_list("id", "season_id"):
+        scored = fid in points
+        home, away = points.get(fid, (0, 0))
+        outcome = ("W" if home > away else "L" if home < away else "T") if scored else ""
+        rows.append(FixtureResult(
+            fixture_id=fid, season_id=season_id,
+            home_total=Decimal(str(home)), away_total=Decimal(str(away)),
+            outcome=outcome, scored=scored,
+            sub_points=subs.get(fid) or Decimal("0"), version=1,
+        ))
+    FixtureResult.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0016_leaguestanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FixtureResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('home_total', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('away_total', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('outcome', models.CharField(blank=True, choices=[('W', 'Win'), ('L', 'Loss'), ('T', 'Tie')], default='', max_length=1)),
+                ('scored', models.BooleanField(default=False)),
+                ('sub_points', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fixture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result', to='league.fixture')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fixture_results', to='league.season')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', 'scored'], name='league_fixt_season__02328b_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_fixture_results, migrations.RunPython.noop),
+    ]
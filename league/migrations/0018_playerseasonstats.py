@@ -0,0 +1,86 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:34
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+SLOT_FIELDS = {"S1": "s1", "S2": "s2", "S3": "s3", "D1": "d1", "D2": "d2", "D3": "d3"}
+
+
+def backfill_player_stats(apps, schema_editor):
+    Fixture = apps.get_model("league", "Fixture")
+    SlotScore = apps.get_model("league", "SlotScore")
+    LineupSlot = apps.get_model("league", "LineupSlot")
+    SubResult = apps.get_model("league", "SubResult")
+    PlayerMatchPoints = apps.get_model("league", "PlayerMatchPoints")
+    PlayerSeasonStats = apps.get_model("league", "PlayerSeasonStats")
+
+    season_of = dict(Fixture.objects.values_list("id", "season_id"))
+    results = {(fid, code): r for fid, code, r in SlotScore.objects.values_list("fixture_id", "slot_code", "result")}
+    stats = defaultdict(lambda: defaultdict(int))
+
+    def record(s, result):
+        if result in ("W", "WF"):
+            s["wins"] += 1
+        elif result in ("L", "LF"):
+            s["losses"] += 1
+        elif result == "T":
+            s["ties"] += 1
+
+    for fid, code, p1, p2 in LineupSlot.objects.values_list("lineup__fixture_id", "slot", "player1_id", "player2_id"):
+        for pid in (p1, p2):
+            if not pid:
+                continue
+            s = stats[(season_of[fid], pid)]
+            if code in SLOT_FIELDS:
+                s[SLOT_FIELDS[code]] += 1
+            record(s, results.get((fid, code)))
+    for fid, pid, code, result, pts in SubResult.objects.values_list("fixture_id", "player_id", "slot_code", "result", "points_cached"):
+        s = stats[(season_of[fid], pid)]
+        if code in SLOT_FIELDS:
+            s[SLOT_FIELDS[code]] += 1
+        record(s, result)
+        s["sub_points"] += pts or Decimal("0")
+    for fid, pid, pts in PlayerMatchPoints.objects.values_list("fixture_id", "player_id", "points"):
+        stats[(season_of[fid], pid)]["lineup_points"] += pts or Decimal("0")
+
+    PlayerSeasonStats.objects.bulk_create(
+        [PlayerSeasonStats(season_id=sid, player_id=pid, **values) for (sid, pid), values in stats.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0017_fixtureresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerSeasonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lineup_points', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('sub_points', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('ties', models.PositiveIntegerField(default=0)),
+                ('s1', models.PositiveIntegerField(default=0)),
+                ('s2', models.PositiveIntegerField(default=0)),
+                ('s3', models.PositiveIntegerField(default=0)),
+                ('d1', models.PositiveIntegerField(default=0)),
+                ('d2', models.PositiveIntegerField(default=0)),
+                ('d3', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_stats', to='league.player')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_stats', to='league.season')),
+            ],
+            options={
+                'unique_together': {('season', 'player')},
+            },
+        ),
+        migrations.RunPython(backfill_player_stats, migrations.RunPython.noop),
+    ]
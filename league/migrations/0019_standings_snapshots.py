@@ -0,0 +1,66 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def snapshot_published_standings(apps, schema_editor):
+    """Turn each season's currently published standings into snapshot v1."""
+    LeagueStanding = apps.get_model("league", "LeagueStanding")
+    StandingsSnapshot = apps.get_model("league", "StandingsSnapshot")
+    StandingsSnapshotRow = apps.get_model("league", "StandingsSnapshotRow")
+
+    season_ids = LeagueStanding.objects.filter(published=True).values_list("season_id", flat=True).distinct()
+    for season_id in season_ids:
+        rows = list(LeagueStanding.objects.filter(season_id=season_id).order_by("-points", "team_name"))
+        royals = next((r.points for r in rows if r.is_royals), 0)
+        snapshot = StandingsSnapshot.objects.create(season_id=season_id, version=1, royals_points=royals)
+        StandingsSnapshotRow.objects.bulk_create([
+            StandingsSnapshotRow(snapshot=snapshot, team_name=r.team_name, points=r.points,
+                                 is_royals=r.is_royals, position=i)
+            for i, r in enumerate(rows, start=1)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0018_playerseasonstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('royals_points', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('published_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings_snapshots', to='league.season')),
+            ],
+            options={
+                'ordering': ['-version'],
+                'unique_together': {('season', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StandingsSnapshotRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team_name', models.CharField(max_length=100)),
+                ('points', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('is_royals', models.BooleanField(default=False)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='league.standingssnapshot')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('snapshot', 'team_name')},
+            },
+        ),
+        migrations.RunPython(snapshot_published_standings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0020_updated_at_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='body_html',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='body_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='subject',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='delivery_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='deliveryattempt',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('QUEUED', 'QUEUED'), ('SENT', 'SENT'), ('FAILED', 'FAILED'), ('SUPPRESSED', 'SUPPRESSED')], default='PENDING', max_length=32),
+        ),
+    ]
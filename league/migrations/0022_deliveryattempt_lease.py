@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0021_deliveryattempt_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
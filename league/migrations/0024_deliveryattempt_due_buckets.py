@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0023_deliveryattempt_next_attempt_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='deliveryattempt',
+            name='league_deli_status_88c510_idx',
+        ),
+        migrations.AddIndex(
+            model_name='deliveryattempt',
+            index=models.Index(condition=models.Q(('next_attempt_at__isnull', True), ('status', 'PENDING')), fields=['channel', 'created_at'], name='deliveryattempt_ready_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryattempt',
+            index=models.Index(condition=models.Q(('next_attempt_at__isnull', False), ('status', 'PENDING')), fields=['next_attempt_at'], name='deliveryattempt_due_idx'),
+        ),
+    ]
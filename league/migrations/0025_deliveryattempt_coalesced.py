@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0024_deliveryattempt_due_buckets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deliveryattempt',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('QUEUED', 'QUEUED'), ('SENT', 'SENT'), ('FAILED', 'FAILED'), ('SUPPRESSED', 'SUPPRESSED'), ('COALESCED', 'COALESCED')], default='PENDING', max_length=32),
+        ),
+    ]
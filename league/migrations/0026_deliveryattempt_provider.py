@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_provider(apps, schema_editor):
+    # Twilio message SIDs start with SM/MM; the other ids came from Brevo (SMS ids, Anymail email ids)
+    DeliveryAttempt = apps.get_model("league", "DeliveryAttempt")
+    sent = DeliveryAttempt.objects.exclude(provider_message_id="")
+    twilio = sent.filter(channel="SMS").filter(
+        models.Q(provider_message_id__startswith="SM") | models.Q(provider_message_id__startswith="MM")
+    )
+    twilio.update(provider="twilio")
+    sent.filter(provider="").update(provider="brevo")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0025_deliveryattempt_coalesced'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryattempt',
+            name='provider',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='deliveryattempt',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('QUEUED', 'QUEUED'), ('SENT', 'SENT'), ('DELIVERED', 'DELIVERED'), ('FAILED', 'FAILED'), ('SUPPRESSED', 'SUPPRESSED'), ('COALESCED', 'COALESCED')], default='PENDING', max_length=32),
+        ),
+        migrations.RunPython(backfill_provider, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='deliveryattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('provider_message_id', ''), _negated=True), fields=('provider', 'provider_message_id'), name='deliveryattempt_provider_msg_uniq'),
+        ),
+    ]
@@ -78,6 +78,7 @@ class Fixture(models.Model):
     is_bye = models.BooleanField(default=False)
     week_number = models.PositiveIntegerField(default=1)
     notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["date"]
@@ -144,6 +145,7 @@ class Lineup(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     published = models.BooleanField(default=False)
     notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Lineup for {self.fixture}"
@@ -161,6 +163,7 @@ class LineupSlot(models.Model):
     slot = models.CharField(max_length=2, choices=Slot.choices)
     player1 = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, related_name="slot_player1")
     player2 = models.ForeignKey(Player, on_delete=models.SET_NULL, blank=True, null=True, related_name="slot_player2")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("lineup", "slot")
@@ -212,6 +215,97 @@ class PlayerMatchPoints(models.Model):
     def __str__(self):
         return f"{self.player} — {self.fixture}: {self.points} pt(s)"
 
+
+class FixtureResult(models.Model):
+    """Denormalized per-fixture match summary.
+    Rewritten by league.services.scoring whenever slot scores, lineup slots or sub results change,
+    so list pages can read "Win (7-5)" without recomputing from SlotScore rows.
+    """
+    class Outcome(models.TextChoices):
+        WIN = "W", "Win"
+        LOSS = "L", "Loss"
+        TIE = "T", "Tie"
+
+    fixture = models.OneToOneField(Fixture, on_delete=models.CASCADE, related_name="result")
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="fixture_results")
+    home_total = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    away_total = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    outcome = models.CharField(max_length=1, choices=Outcome.choices, blank=True, default="")
+    scored = models.BooleanField(default=False)
+    sub_points = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["season", "scored"]),
+        ]
+
+    @staticmethod
+    def _num(d):
+        # Return int when whole number; else float for .5 etc.
+        f = float(d)
+        return int(f) if f.is_integer() else f
+
+    @property
+    def home_points(self):
+        return self._num(self.home_total)
+
+    @property
+    def away_points(self):
+        return self._num(self.away_total)
+
+    @property
+    def score_display(self):
+        return f"{self.home_points}-{self.away_points}" if self.scored else ""
+
+    @property
+    def result_text(self):
+        """e.g. "Win (7-5)"; empty when no slot has been scored."""
+        if not self.scored:
+            return ""
+        return f"{self.get_outcome_display()} ({self.score_display})"
+
+    def __str__(self):
+        return f"{self.fixture}: {self.result_text or 'unscored'} (v{self.version})"
+
+
+class PlayerSeasonStats(models.Model):
+    """Per-(season, player) ledger of points, record and slot appearances.
+    Lineup and sub results are combined. Kept current by league.services.stats
+    whenever slot scores, lineups, player points or sub results change;
+    `manage.py rebuild_player_stats` rebuilds or checks it from the source rows.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="player_stats")
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="season_stats")
+    lineup_points = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    sub_points = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    ties = models.PositiveIntegerField(default=0)
+    # Appearances per slot (lineup + sub), scored or not
+    s1 = models.PositiveIntegerField(default=0)
+    s2 = models.PositiveIntegerField(default=0)
+    s3 = models.PositiveIntegerField(default=0)
+    d1 = models.PositiveIntegerField(default=0)
+    d2 = models.PositiveIntegerField(default=0)
+    d3 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("season", "player")
+
+    @property
+    def points(self):
+        return (self.lineup_points or 0) + (self.sub_points or 0)
+
+    @property
+    def total_matches(self):
+        return self.s1 + self.s2 + self.s3 + self.d1 + self.d2 + self.d3
+
+    def __str__(self):
+        return f"{self.player} — {self.season}: {self.wins}-{self.losses}-{self.ties}, {self.points} pt(s)"
+
 class SubPlan(models.Model):
     class Target(models.TextChoices):
         AGAINST_US = "AGAINST_US", "Against Us (opponent in this fixture)"
@@ -392,8 +486,16 @@ class DeliveryAttempt(models.Model):
         EMAIL = "EMAIL", "Email"
         SMS = "SMS", "SMS"
     notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="deliveries")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name="delivery_attempts")
     channel = models.CharField(max_length=8, choices=Channel.choices)
     to = models.CharField(max_length=255)  # email or E.164 phone
+    # Rendered when the attempt is queued so the delivery worker needs no request context
+    subject = models.CharField(max_length=255, blank=True, default="")
+    body_text = models.TextField(blank=True, default="")  # email text part or SMS body
+    body_html = models.TextField(blank=True, default="")
+    # Who sent it ("brevo", "twilio", "smtp") and their id for it, which status callbacks refer to
+    provider = models.CharField(max_length=16, blank=True, default="")
     provider_message_id = models.CharField(max_length=255, blank=True, default="")
     error = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -401,10 +503,17 @@ class DeliveryAttempt(models.Model):
 
     status = models.CharField(
         max_length=32,
-        choices=[("PENDING", "PENDING"), ("SENT", "SENT"), ("FAILED", "FAILED"), ("SUPPRESSED", "SUPPRESSED")],
+        choices=[("PENDING", "PENDING"), ("QUEUED", "QUEUED"), ("SENT", "SENT"), ("DELIVERED", "DELIVERED"),
+                 ("FAILED", "FAILED"), ("SUPPRESSED", "SUPPRESSED"),
+                 ("COALESCED", "COALESCED")],  # COALESCED: sent as part of a digest
         default="PENDING",
     )
     retry_count = models.PositiveSmallIntegerField(default=0)
+    # Earliest time a deferred or retried attempt may be sent (None: right away)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    # Set while a delivery worker owns the attempt; an expired lease makes it claimable again
+    leased_until = models.DateTimeField(null=True, blank=True)
+    lease_owner = models.CharField(max_length=64, blank=True, default="")
 
     def __str__(self):
         return f"DeliveryAttempt({self.channel} → {self.to}, {self.status})"
@@ -413,6 +522,17 @@ class DeliveryAttempt(models.Model):
         indexes = [
             models.Index(fields=["channel", "status", "created_at"]),
             models.Index(fields=["notification", "created_at"]),
+            # Ready to send, in arrival order (what delivery workers lease from)
+            models.Index(fields=["channel", "created_at"], name="deliveryattempt_ready_idx",
+                         condition=models.Q(status="PENDING", next_attempt_at__isnull=True)),
+            # Deferred (quiet hours) and retried attempts, bucketed by when they become due
+            models.Index(fields=["next_attempt_at"], name="deliveryattempt_due_idx",
+                         condition=models.Q(status="PENDING", next_attempt_at__isnull=False)),
+        ]
+        constraints = [
+            # Status callbacks look attempts up by the provider's message id
+            models.UniqueConstraint(fields=["provider", "provider_message_id"], name="deliveryattempt_provider_msg_uniq",
+                                    condition=~models.Q(provider_message_id="")),
         ]
 
 
@@ -550,4 +670,46 @@ class LeagueStanding(models.Model):
         ordering = ["-points", "team_name"]
 
     def __str__(self):
-        return f"{self.season} - {self.team_name} ({self.points})"
\ No newline at end of file
+        return f"{self.season} - {self.team_name} ({self.points})"
+
+class StandingsSnapshot(models.Model):
+    """One published version of a season's league standings.
+    Created by league.services.standings.publish_standings(); never edited afterwards.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="standings_snapshots")
+    version = models.PositiveIntegerField()
+    royals_points = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    published_at = models.DateTimeField(default=timezone.now)
+    published_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        unique_together = [("season", "version")]
+        ordering = ["-version"]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Standings snapshots are immutable; publish a new version instead.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.season} standings v{self.version}"
+
+
+class StandingsSnapshotRow(models.Model):
+    snapshot = models.ForeignKey(StandingsSnapshot, on_delete=models.CASCADE, related_name="rows")
+    team_name = models.CharField(max_length=100)
+    points = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    is_royals = models.BooleanField(default=False)
+    position = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = [("snapshot", "team_name")]
+        ordering = ["position"]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Standings snapshot rows are immutable.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.snapshot}: {self.position}. {self.team_name} ({self.points})"
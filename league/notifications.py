@@ -1,15 +1,17 @@
 # league/notifications.py
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import time
-import json
+from datetime import time, timedelta
+from functools import partial
 import logging
 import os
 from typing import Iterable, Dict, Any, List, Optional
 from urllib.parse import urljoin, urlparse
-import requests
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Max
 from django.template import Template, Context
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -22,6 +24,9 @@ from .models import (
     NotificationPreference,
     Player,
 )
+from .cache import invalidate_bell
+from .delivery import DeliveryError, hand_off, is_transient, transient_status
+from .providers import ProviderUnavailable, brevo_send_sms, sms_provider, twilio_configured, twilio_send_sms
 
 logger = logging.getLogger(__name__)
 
@@ -187,6 +192,17 @@ def _get_prefs(user) -> NotificationPreference:
     return prefs
 
 
+def _load_prefs(users) -> Dict[int, NotificationPreference]:
+    """{user_id: prefs} for all `users` in one query, bulk-creating the missing rows."""
+    ids = {u.pk for u in users}
+    prefs = {p.user_id: p for p in NotificationPreference.objects.filter(user_id__in=ids)}
+    missing = [NotificationPreference(user_id=uid) for uid in ids - prefs.keys()]
+    if missing:
+        NotificationPreference.objects.bulk_create(missing, ignore_conflicts=True)
+        prefs.update((p.user_id, p) for p in missing)
+    return prefs
+
+
 def _quiet_hours_range() -> tuple[int, int]:
     """Return (start_hour, end_hour). Honors either a tuple setting or START/END ints.
     Defaults to (22, 8) if nothing is configured.
@@ -207,36 +223,57 @@ def _quiet_hours_range() -> tuple[int, int]:
         return 22, 8
 
 
-def _in_quiet_hours() -> bool:
+def _user_tz(prefs: Optional[NotificationPreference] = None):
+    """The recipient's zone from NotificationPreference.timezone, else the site's TIME_ZONE."""
+    name = getattr(prefs, "timezone", "") or ""
+    try:
+        return ZoneInfo(name) if name else timezone.get_default_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.get_default_timezone()
+
+
+def _quiet_until(prefs: Optional[NotificationPreference] = None, now=None):
+    """End of the recipient's quiet window (aware, on the hour in their zone) if `now` falls inside it, else None."""
     start_h, end_h = _quiet_hours_range()
     # If start and end are the same, treat quiet hours as disabled
     if start_h == end_h:
-        return False
-    now = timezone.localtime()
-    t = now.time()
+        return None
+    local = timezone.localtime(now or timezone.now(), _user_tz(prefs))
+    t = local.time()
     start = time(hour=start_h)
     end = time(hour=end_h)
     if start_h < end_h:
         # Quiet window is same-day, e.g., 1 -> 6
-        return start <= t < end
-    # Quiet window wraps midnight, e.g., 22 -> 8
-    return not (end <= t < start)
+        quiet = start <= t < end
+    else:
+        # Quiet window wraps midnight, e.g., 22 -> 8
+        quiet = not (end <= t < start)
+    if not quiet:
+        return None
+    until = local.replace(hour=end_h, minute=0, second=0, microsecond=0)
+    if until <= local:
+        until += timedelta(days=1)  # wall-clock arithmetic in the user's zone, so DST keeps it at end_h
+    return until
+
 
+def _in_quiet_hours(prefs: Optional[NotificationPreference] = None) -> bool:
+    return _quiet_until(prefs) is not None
 
-def _has_verified_phone(user) -> bool:
-    prefs = _get_prefs(user)
+
+def _has_verified_phone(user, prefs: Optional[NotificationPreference] = None) -> bool:
+    prefs = prefs or _get_prefs(user)
     phone = getattr(prefs, "phone_e164", None)
     verified = bool(getattr(prefs, "phone_verified_at", None))
     return bool(phone and verified)
 
 
-def _should_send_email(user, event_key: str) -> bool:
+def _should_send_email(user, event_key: str, prefs: Optional[NotificationPreference] = None) -> bool:
     """Per-event email checks + global email_enabled + staff-only restrictions."""
     # Staff-only events cannot go to non-captains/non-staff
     if event_key in STAFF_ONLY_EVENTS and not _is_captain_or_staff(user):
         return False
 
-    prefs = _get_prefs(user)
+    prefs = prefs or _get_prefs(user)
     if not (bool(getattr(prefs, "email_enabled", True)) and bool(user.email)):
         return False
 
@@ -247,12 +284,13 @@ def _should_send_email(user, event_key: str) -> bool:
     return bool(getattr(prefs, field, False))
 
 
-def _should_send_sms(user, event_key: str) -> bool:
-    """Per-event SMS checks + global sms_enabled + verified phone + quiet hours + staff-only restrictions."""
+def _should_send_sms(user, event_key: str, prefs: Optional[NotificationPreference] = None) -> bool:
+    """Per-event SMS checks + global sms_enabled + verified phone + staff-only restrictions.
+    Quiet hours don't block SMS; notify() defers them to the end of the recipient's window."""
     if event_key in STAFF_ONLY_EVENTS and not _is_captain_or_staff(user):
         return False
 
-    prefs = _get_prefs(user)
+    prefs = prefs or _get_prefs(user)
     # Global user-level SMS toggle (or legacy opt_in field)
     if not bool(getattr(prefs, "sms_enabled", False) or getattr(prefs, "sms_opt_in", False)):
         return False
@@ -263,9 +301,7 @@ def _should_send_sms(user, event_key: str) -> bool:
         return False
 
     # Safety gates
-    if not _has_verified_phone(user):
-        return False
-    if _in_quiet_hours():
+    if not _has_verified_phone(user, prefs):
         return False
     return True
 
@@ -303,36 +339,85 @@ def _site_base() -> str:
 # ----------------------------- Channel senders -------------------------------
 
 
-def _send_email(user, event: Event, ctx: Dict[str, Any], attempt: DeliveryAttempt):
-    txt, html = _render_email_parts(event, ctx)
-    subject = ctx.get("_subject_override") or _render_subject(event, ctx)
-    to_list = [attempt.to or user.email]
+def _normalize_phone(phone: str) -> str:
+    """Best-effort E.164: '00' prefix to '+', and a default country code for bare US numbers."""
+    phone = str(phone).strip()
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    if not phone.startswith("+"):
+        digits = "".join(ch for ch in phone if ch.isdigit())
+        if getattr(settings, "SMS_DEFAULT_COUNTRY", "US") == "US" and not digits.startswith("1"):
+            digits = "1" + digits
+        phone = "+" + digits
+    return phone
 
+
+def _sms_destination(user, prefs: Optional[NotificationPreference] = None) -> str:
+    """Phone to text for this user (SMS_TEST_NUMBER overrides it), or "" when there is none."""
+    test_to = os.getenv("SMS_TEST_NUMBER", "").strip()
+    if test_to:
+        return _normalize_phone(test_to)
+    prefs = prefs or _get_prefs(user)
+    phone = getattr(prefs, "phone_e164", None)
+    if not phone or not _has_verified_phone(user, prefs):
+        return ""
+    return _normalize_phone(phone)
+
+
+def _build_digest(attempts: List[DeliveryAttempt], user=None) -> tuple[str, str, str]:
+    """(subject, text, html) merging several queued messages for one recipient and channel."""
+    items = [{"subject": a.subject, "body_text": a.body_text} for a in attempts]
+    ctx = {"items": items, "recipient": user, "user": user, "public_base_url": _site_base(), "now": timezone.now()}
+    if attempts[0].channel == DeliveryAttempt.Channel.SMS:
+        return "", render_to_string("sms/digest.txt", ctx).strip(), ""
+    subject = f"Royals: {len(items)} updates"
+    return subject, render_to_string("emails/digest.txt", ctx).strip(), render_to_string("emails/digest.html", ctx).strip()
+
+
+def _email_message(attempt: DeliveryAttempt, connection=None) -> EmailMultiAlternatives:
     msg = EmailMultiAlternatives(
-        subject=subject,
-        body=txt or "",
-        to=to_list,
+        subject=attempt.subject,
+        body=attempt.body_text or "",
+        to=[attempt.to],
+        connection=connection,
     )
-    if html:
-        msg.attach_alternative(html, "text/html")
+    if attempt.body_html:
+        msg.attach_alternative(attempt.body_html, "text/html")
+    return msg
+
 
-    sent_count = msg.send()  # 1 on success (Django); Anymail may attach status
+def _email_provider(connection) -> str:
+    """Provider name for an email backend: the Anymail ESP ("brevo"), or "smtp" for Django's own backends."""
+    return (getattr(connection, "esp_name", "") or "smtp").lower()
 
-    attempt.status = "SENT" if sent_count else "FAILED"
+
+def _send_email(attempt: DeliveryAttempt, connection=None):
+    """Send a queued EMAIL attempt from its rendered subject/body, over `connection` if given."""
+    msg = _email_message(attempt, connection=connection)
+
+    sent_count = msg.send()  # 1 on success (Django); Anymail may attach status; errors are retried by the caller
+    if not sent_count:
+        raise DeliveryError("email backend accepted no message")
+
+    attempt.status = "SENT"
+    attempt.error = ""
     attempt.sent_at = timezone.now()
-    # If using Anymail, you can capture provider id like:
-    # status = getattr(msg, "anymail_status", None)
-    # if status and status.message_id:
-    #     attempt.provider_message_id = status.message_id
+    attempt.provider = _email_provider(msg.connection)
+    status = getattr(msg, "anymail_status", None)
+    if status and status.message_id:
+        attempt.provider_message_id = str(status.message_id)[:255]
     attempt.save()
 
 
-def _send_sms(user, event: Event, ctx: Dict[str, Any], attempt: DeliveryAttempt):
+def _send_sms(attempt: DeliveryAttempt):
     """
-    Send an SMS via the configured provider.
+    Send a queued SMS attempt via the configured provider.
     Preference order:
       1) Twilio  (SMS_PROVIDER=twilio)
       2) Brevo   (SMS_PROVIDER=brevo)
+    Provider failures raise DeliveryError; the delivery worker decides whether to retry.
+    While the provider's circuit is open ProviderUnavailable is raised instead (unless
+    NOTIFY_SMS_FAILOVER names a provider that is up), and the worker reschedules the batch.
     """
     # Feature flag
     if not bool(getattr(settings, "ENABLE_SMS", False)):
@@ -341,78 +426,36 @@ def _send_sms(user, event: Event, ctx: Dict[str, Any], attempt: DeliveryAttempt)
         attempt.save()
         return
 
-    provider = (getattr(settings, "SMS_PROVIDER", "brevo") or "brevo").lower()
+    provider = sms_provider()
 
-    # Resolve destination phone
-    test_to = os.getenv("SMS_TEST_NUMBER", "").strip()
-    if test_to:
-        phone = test_to
-        # simple normalization for test numbers
-        if phone.startswith("00"):
-            phone = "+" + phone[2:]
-        if not phone.startswith("+"):
-            digits = "".join(ch for ch in phone if ch.isdigit())
-            if getattr(settings, "SMS_DEFAULT_COUNTRY", "US") == "US" and not digits.startswith("1"):
-                digits = "1" + digits
-            phone = "+" + digits
-    else:
-        prefs = _get_prefs(user)
-        phone = getattr(prefs, "phone_e164", None)
-        if not phone or not _has_verified_phone(user):
-            attempt.status = "FAILED"
-            attempt.error = "no verified phone"
-            attempt.save()
-            return
-        phone = str(phone).strip()
-        if phone.startswith("00"):
-            phone = "+" + phone[2:]
-        if not phone.startswith("+"):
-            digits = "".join(ch for ch in phone if ch.isdigit())
-            if getattr(settings, "SMS_DEFAULT_COUNTRY", "US") == "US" and not digits.startswith("1"):
-                digits = "1" + digits
-            phone = "+" + digits
-
-    # Render SMS text (plain)
-    sms_text = render_to_string(event.sms_template, ctx).strip()
+    phone = attempt.to
+    if not phone:
+        attempt.status = "FAILED"
+        attempt.error = "no verified phone"
+        attempt.save()
+        return
+
+    sms_text = attempt.body_text
 
     # --- Provider: Twilio ---
     if provider == "twilio":
+        if not twilio_configured():
+            raise DeliveryError("Twilio misconfigured (missing SID/token/service or from)", transient=False)
         try:
-            from twilio.rest import Client  # imported lazily to avoid hard dependency in non-twilio envs
-            sid = getattr(settings, "TWILIO_ACCOUNT_SID", "")
-            tok = getattr(settings, "TWILIO_AUTH_TOKEN", "")
-            svc = getattr(settings, "TWILIO_MESSAGING_SERVICE_SID", "")
-            from_ = getattr(settings, "TWILIO_FROM_NUMBER", "")
-            status_cb = getattr(settings, "TWILIO_STATUS_CALLBACK_URL", "")
-
-            if not (sid and tok and (svc or from_)):
-                raise RuntimeError("Twilio misconfigured (missing SID/token/service or from)")
-
-            client = Client(sid, tok)
-            msg_kwargs = {"to": phone, "body": sms_text[:1600]}
-            if svc:
-                msg_kwargs["messaging_service_sid"] = svc
-            else:
-                msg_kwargs["from_"] = from_
-            if status_cb:
-                msg_kwargs["status_callback"] = status_cb
-
-            logger.info("Attempting Twilio SMS → to=%s via=%s", phone, ("service:"+svc if svc else "from:"+from_))
-            msg = client.messages.create(**msg_kwargs)
-
-            attempt.provider = "twilio"
-            attempt.provider_message_id = str(getattr(msg, "sid", "") or "")[:255]
-            # Twilio returns 'queued' immediately; mark as QUEUED (webhook can advance it)
-            attempt.status = "QUEUED"
-            attempt.sent_at = timezone.now()
-            attempt.error = ""
-            attempt.save()
-            return
+            msg = twilio_send_sms(to=phone, body=sms_text[:1600])
+        except ProviderUnavailable:
+            raise
         except Exception as e:
-            attempt.status = "FAILED"
-            attempt.error = f"twilio send error: {str(e)[:480]}"
-            attempt.save()
-            return
+            raise DeliveryError(f"twilio send error: {str(e)[:480]}", transient=is_transient(e)) from e
+
+        attempt.provider = "twilio"
+        attempt.provider_message_id = str(getattr(msg, "sid", "") or "")[:255]
+        # Twilio returns 'queued' immediately; mark as QUEUED (webhook can advance it)
+        attempt.status = "QUEUED"
+        attempt.sent_at = timezone.now()
+        attempt.error = ""
+        attempt.save()
+        return
 
     # --- Provider: Brevo (fallback/default) ---
     if provider == "brevo":
@@ -423,42 +466,25 @@ def _send_sms(user, event: Event, ctx: Dict[str, Any], attempt: DeliveryAttempt)
             attempt.save()
             return
 
-        headers = {
-            "api-key": api_key,
-            "accept": "application/json",
-            "content-type": "application/json",
-        }
-        payload = {
-            "sender": getattr(settings, "BREVO_SMS_SENDER", "ROYALS"),
-            "recipient": phone,
-            "content": sms_text[:1600],
-            "type": "transactional",
-        }
-
-        logger.info("Attempting Brevo SMS → to=%s sender=%s len=%d", phone, getattr(settings, "BREVO_SMS_SENDER", "ROYALS"), len(sms_text))
+        sender = getattr(settings, "BREVO_SMS_SENDER", "ROYALS")
+        logger.info("Attempting Brevo SMS → to=%s sender=%s len=%d", phone, sender, len(sms_text))
 
         try:
-            resp = requests.post(
-                "https://api.brevo.com/v3/transactionalSMS/send",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=10,
-            )
-            if resp.status_code in (200, 201, 202):
-                data = resp.json() if resp.text else {}
-                attempt.provider = "brevo"
-                attempt.status = "SENT"
-                attempt.provider_message_id = str(data.get("messageId", ""))[:255]
-                attempt.sent_at = timezone.now()
-                attempt.error = ""
-            else:
-                attempt.status = "FAILED"
-                attempt.error = f"{resp.status_code} {resp.text[:500]}"
+            resp = brevo_send_sms(api_key, sender=sender, recipient=phone, content=sms_text[:1600])
+        except ProviderUnavailable:
+            raise
         except Exception as e:
-            attempt.status = "FAILED"
-            attempt.error = str(e)[:500]
-        finally:
-            attempt.save()
+            raise DeliveryError(str(e)[:500], transient=is_transient(e)) from e
+        if resp.status_code not in (200, 201, 202):
+            raise DeliveryError(f"{resp.status_code} {resp.text[:480]}", transient=transient_status(resp.status_code))
+
+        data = resp.json() if resp.text else {}
+        attempt.provider = "brevo"
+        attempt.status = "SENT"
+        attempt.provider_message_id = str(data.get("messageId", ""))[:255]
+        attempt.sent_at = timezone.now()
+        attempt.error = ""
+        attempt.save()
         return
 
     # Unknown provider
@@ -468,6 +494,24 @@ def _send_sms(user, event: Event, ctx: Dict[str, Any], attempt: DeliveryAttempt)
     return
 
 
+def _hold_for_coalescing(pending: List[DeliveryAttempt]) -> None:
+    """Hold new attempts for NOTIFY_COALESCE_SECONDS, joining a window already open for the same user and channel.
+    Everything due together for one (user, channel) is merged into a digest when released (league.delivery)."""
+    window = int(getattr(settings, "NOTIFY_COALESCE_SECONDS", 0) or 0)
+    if window <= 0 or not pending:
+        return
+    now = timezone.now()
+    open_windows = {
+        (r["user_id"], r["channel"]): r["due"]
+        for r in DeliveryAttempt.objects.filter(
+            status="PENDING", retry_count=0, user_id__in={a.user_id for a in pending}, next_attempt_at__gt=now,
+        ).values("user_id", "channel").annotate(due=Max("next_attempt_at"))
+    }
+    for a in pending:
+        due = open_windows.setdefault((a.user_id, a.channel), now + timedelta(seconds=window))
+        a.next_attempt_at = max(due, a.next_attempt_at) if a.next_attempt_at else due
+
+
 # ----------------------------- Public API ------------------------------------
 
 
@@ -485,8 +529,12 @@ def notify(
     """
     Create a Notification, then for each user:
       - create a NotificationReceipt so the bell shows it
-      - create DeliveryAttempt(s) for channels that pass gates
-      - send channels inline (sequential)
+      - create DeliveryAttempt(s) for channels that pass gates, with the message rendered
+    All rows are inserted with bulk_create in one transaction, so the number of
+    writes does not grow with the number of recipients.
+
+    Nothing is sent here: PENDING attempts are handed to the delivery worker
+    (league.delivery) when the surrounding transaction commits.
 
     Returns (notification, attempts_created)
     """
@@ -502,18 +550,24 @@ def notify(
     # Build notification URL (relative allowed; will be absolutized in template if needed)
     notif_url = url or ""
 
-    notification = Notification.objects.create(
+    # Rows are built in memory and written together below (saved before the bulk inserts)
+    notification = Notification(
         event=event_key,
         title=title or evt.subject,
         body=body or "",
         url=notif_url,
     )
+    receipts: Dict[int, NotificationReceipt] = {}
+    rows: List[DeliveryAttempt] = []
 
-    attempts = 0
+    users = list(users)
+    prefs_by_user = _load_prefs(users)
 
     for user in users:
-        # Receipt first so the bell always updates even if send fails
-        NotificationReceipt.objects.get_or_create(notification=notification, user=user)
+        if user.pk in receipts:
+            continue  # each recipient once
+        # Receipt for every recipient so the bell always updates even if send fails
+        receipts[user.pk] = NotificationReceipt(notification=notification, user=user)
 
         # Build per-recipient context (init, then set fields)
         ctx = dict(context)
@@ -576,28 +630,30 @@ def notify(
         except Exception:
             logger.exception("[notify] failed to merge per-user context for user %s", getattr(user, "id", None))
 
-        # EMAIL
-        if _should_send_email(user, event_key):
-            attempt = DeliveryAttempt.objects.create(
+        # EMAIL: render now, send from the delivery worker after commit
+        prefs_obj = prefs_by_user[user.pk]
+        if _should_send_email(user, event_key, prefs_obj):
+            attempt = DeliveryAttempt(
                 notification=notification,
+                user=user,
                 channel="EMAIL",
                 to=(user.email or ""),
                 status="PENDING",
                 retry_count=0,
             )
             try:
-                _send_email(user, evt, ctx, attempt)
+                txt, html = _render_email_parts(evt, ctx)
+                attempt.body_text, attempt.body_html = txt, html or ""
+                attempt.subject = (ctx.get("_subject_override") or _render_subject(evt, ctx))[:255]
             except Exception as e:
+                logger.exception("[notify] EMAIL render failed for user=%s event=%s", getattr(user, "id", None), event_key)
                 attempt.status = "FAILED"
-                attempt.error = str(e)[:500]
-                attempt.save()
-            finally:
-                attempts += 1
+                attempt.error = f"render error: {str(e)[:480]}"
+            rows.append(attempt)
         else:
             # Create a SUPPRESSED attempt for parity + log concise reason
             reason = "blocked"
             try:
-                prefs_obj = _get_prefs(user)
                 if event_key in STAFF_ONLY_EVENTS and not _is_captain_or_staff(user):
                     reason = "not captain/staff"
                 elif not (bool(getattr(prefs_obj, "email_enabled", True)) and bool(user.email)):
@@ -613,41 +669,38 @@ def notify(
             except Exception:
                 logger.exception("[notify] EMAIL suppressed: reason calc failed for user=%s event=%s", getattr(user, "id", None), event_key)
 
-            attempt = DeliveryAttempt.objects.create(
+            rows.append(DeliveryAttempt(
                 notification=notification,
+                user=user,
                 channel="EMAIL",
                 to=(user.email or ""),
                 status="SUPPRESSED",
                 retry_count=0,
                 error=reason,
-            )
-            attempts += 1
+            ))
 
         # SMS: respect per-event and global gates
-        prefs_obj = _get_prefs(user)
         phone = getattr(prefs_obj, "phone_e164", None) or ""
 
-        if not _should_send_sms(user, event_key):
+        if not _should_send_sms(user, event_key, prefs_obj):
             # Determine a friendly suppression reason for visibility
             reason = "disabled"
             if not (getattr(prefs_obj, "sms_enabled", False) or getattr(prefs_obj, "sms_opt_in", False)):
                 reason = "user disabled"
             elif event_key in STAFF_ONLY_EVENTS and not _is_captain_or_staff(user):
                 reason = "not captain/staff"
-            elif not _has_verified_phone(user) or not phone:
+            elif not _has_verified_phone(user, prefs_obj) or not phone:
                 reason = "no verified phone"
-            elif _in_quiet_hours():
-                reason = "quiet hours"
 
-            attempt = DeliveryAttempt.objects.create(
+            rows.append(DeliveryAttempt(
                 notification=notification,
+                user=user,
                 channel="SMS",
                 to=phone,
                 status="SUPPRESSED",
                 retry_count=0,
                 error=reason,
-            )
-            attempts += 1
+            ))
             try:
                 logger.info(
                     "[notify] SMS suppressed: user=%s event=%s reason=%s",
@@ -656,23 +709,43 @@ def notify(
             except Exception:
                 logger.exception("[notify] SMS suppressed: reason log failed for user=%s event=%s", getattr(user, "id", None), event_key)
         else:
-            attempt = DeliveryAttempt.objects.create(
+            attempt = DeliveryAttempt(
                 notification=notification,
+                user=user,
                 channel="SMS",
-                to=phone,
+                to=_sms_destination(user, prefs_obj),
                 status="PENDING",
                 retry_count=0,
+                # Inside the recipient's quiet hours: hold it until their window ends instead of dropping it
+                next_attempt_at=_quiet_until(prefs_obj),
             )
+            if attempt.next_attempt_at:
+                logger.info("[notify] SMS deferred for quiet hours: user=%s event=%s until=%s",
+                            getattr(user, "id", None), event_key, attempt.next_attempt_at)
             try:
-                _send_sms(user, evt, ctx, attempt)
+                attempt.body_text = render_to_string(evt.sms_template, ctx).strip()
             except Exception as e:
+                logger.exception("[notify] SMS render failed for user=%s event=%s", getattr(user, "id", None), event_key)
                 attempt.status = "FAILED"
-                attempt.error = str(e)[:500]
-                attempt.save()
-            finally:
-                attempts += 1
+                attempt.error = f"render error: {str(e)[:480]}"
+            rows.append(attempt)
+
+    _hold_for_coalescing([a for a in rows if a.status == "PENDING"])
+
+    with transaction.atomic():
+        notification.save()
+        NotificationReceipt.objects.bulk_create(receipts.values())
+        DeliveryAttempt.objects.bulk_create(rows)
+    invalidate_bell(*receipts)
+
+    pending_ids = [a.pk for a in rows if a.status == "PENDING"]
+    if None in pending_ids:  # backend without RETURNING on bulk inserts
+        pending_ids = list(notification.deliveries.filter(status="PENDING").values_list("pk", flat=True))
+    if pending_ids:
+        # Workers only see the attempts once the caller's transaction commits
+        transaction.on_commit(partial(hand_off, pending_ids))
 
-    return notification, attempts
+    return notification, len(rows)
 
 
 def lineup_published(players: Optional[Iterable[Player]], fixture, season=None) -> tuple[int, int]:
@@ -850,7 +923,7 @@ def send_event(event_key: str, *, users: Optional[Iterable] = None, players: Opt
                user_player_map: Optional[Dict[int, Player]] = None, subject: Optional[str] = None) -> tuple[Notification, int]:
     """
     One call to do it all: create Notification, create receipts, and
-    create/send DeliveryAttempts immediately (email/SMS) using `notify()`.
+    queue DeliveryAttempts (email/SMS) for the delivery worker using `notify()`.
 
     Pass either `users` or `players` (we'll resolve users from players).
     You can pass extra context, and optional `_per_user_ctx` / `_user_player_map`.
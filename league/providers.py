@@ -0,0 +1,263 @@
+# league/providers.py
+"""SMS provider clients shared by the whole process.
+
+Brevo is called through one module-level requests.Session whose HTTPAdapter keeps a
+pool of keep-alive connections, and the Twilio client is built once per process (and
+per credentials) on top of the same kind of pooled session. Bulk reminders and OTP
+sends then pay the TCP/TLS handshake once per connection instead of once per message.
+
+Only failures to connect are retried here, since nothing reached the provider yet;
+everything else goes back to the caller (the delivery worker retries with backoff).
+provider_stats() reports requests vs. new connections per provider, and the ratio
+is logged every STATS_LOG_EVERY requests.
+
+Every call is bounded by NOTIFY_PROVIDER_LATENCY_BUDGET: the connect timeout (times
+the connect tries) and the read timeout are cut from it, so a slow provider can't hold
+a gunicorn sync worker for long. Each provider also has a circuit breaker kept in the
+cache, shared by all processes: NOTIFY_BREAKER_FAILURES consecutive failures (errors,
+HTTP 5xx, or calls slower than NOTIFY_BREAKER_SLOW_SECONDS) open it, and for
+NOTIFY_BREAKER_COOLDOWN seconds calls fail at once with ProviderUnavailable. After the
+cool-down one caller gets through as a probe; its outcome closes or re-opens the
+circuit. With NOTIFY_SMS_FAILOVER set (e.g. "twilio"), sms_provider() picks that
+provider while the configured one is open.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+BREVO_SMS_URL = "https://api.brevo.com/v3/transactionalSMS/send"
+CONNECT_RETRIES = 2
+POOL_SIZE = 10
+STATS_LOG_EVERY = 100
+
+_lock = threading.Lock()
+_sessions = {}  # provider name -> requests.Session
+_twilio = {}    # (sid, token) -> twilio Client
+_sent = {"count": 0}
+
+
+DEFAULT_LATENCY_BUDGET = 5.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_SLOW_SECONDS = 3.0
+DEFAULT_BREAKER_COOLDOWN = 60
+
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit is open; try again in `retry_after` seconds."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def latency_budget():
+    return float(getattr(settings, "NOTIFY_PROVIDER_LATENCY_BUDGET", DEFAULT_LATENCY_BUDGET))
+
+
+def timeouts():
+    """(connect, read) timeouts: all connect tries share half the latency budget, the response gets the rest."""
+    budget = latency_budget()
+    return budget / 2 / (CONNECT_RETRIES + 1), budget / 2
+
+
+def _adapter():
+    retry = Retry(total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0, status=0, other=0, backoff_factor=0,
+                  raise_on_status=False)
+    return HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+
+def _register(name, session):
+    session.mount("https://", _adapter())
+    _sessions[name] = session
+    return session
+
+
+def http_session(name="brevo"):
+    """The process-wide pooled session for a provider."""
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name) or _register(name, requests.Session())
+    return session
+
+
+def twilio_client():
+    """Twilio Client for the configured credentials, built once per process."""
+    sid = getattr(settings, "TWILIO_ACCOUNT_SID", "")
+    tok = getattr(settings, "TWILIO_AUTH_TOKEN", "")
+    client = _twilio.get((sid, tok))
+    if client is None:
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client  # imported lazily to avoid hard dependency in non-twilio envs
+
+        with _lock:
+            client = _twilio.get((sid, tok))
+            if client is None:
+                http_client = TwilioHttpClient(pool_connections=True, timeout=latency_budget() / 2)  # connect and read each
+                _register("twilio", http_client.session)
+                client = _twilio[(sid, tok)] = Client(sid, tok, http_client=http_client)
+    return client
+
+
+# --- Circuit breaker ---
+
+def _breaker_key(name, part):
+    return f"league:breaker:{name}:{part}"
+
+
+def _setting(name, default):
+    return type(default)(getattr(settings, name, default))
+
+
+def is_open(name):
+    """True while the provider's circuit is open and its cool-down is still running."""
+    open_until = cache.get(_breaker_key(name, "open_until"))
+    return open_until is not None and time.time() < open_until
+
+
+def _check(name):
+    open_until = cache.get(_breaker_key(name, "open_until"))
+    if open_until is None:
+        return
+    wait = open_until - time.time()
+    if wait > 0:
+        raise ProviderUnavailable(name, wait)
+    # Cool-down over: one caller probes the provider, everyone else keeps waiting for its outcome
+    if not cache.add(_breaker_key(name, "probe"), 1, timeout=int(latency_budget()) + 1):
+        raise ProviderUnavailable(name, latency_budget())
+
+
+def _provider_fault(exc):
+    """Errors that say the provider is unhealthy (not e.g. a bad phone number)."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 408
+    return True
+
+
+def _record(name, ok):
+    failures_key, open_key, probe_key = (_breaker_key(name, p) for p in ("failures", "open_until", "probe"))
+    if ok:
+        if cache.get_many([failures_key, open_key]):
+            cache.delete_many([failures_key, open_key, probe_key])
+            logger.info("[providers] %s circuit closed", name)
+        return
+    try:
+        failures = cache.incr(failures_key)
+    except ValueError:
+        failures = 1 if cache.add(failures_key, 1, timeout=None) else cache.incr(failures_key)
+    probing = cache.get(open_key) is not None
+    if probing or failures >= _setting("NOTIFY_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES):
+        cooldown = _setting("NOTIFY_BREAKER_COOLDOWN", DEFAULT_BREAKER_COOLDOWN)
+        cache.set(open_key, time.time() + cooldown, timeout=None)
+        cache.delete(probe_key)
+        logger.warning("[providers] %s circuit open for %ss after %d failed or slow calls", name, cooldown, failures)
+
+
+@contextmanager
+def guarded(name):
+    """Run one provider call through its circuit breaker. Raises ProviderUnavailable while the
+    circuit is open; set `call.fault = True` inside for a failed response that didn't raise."""
+    _check(name)
+    call = SimpleNamespace(fault=False)
+    start = time.monotonic()
+    try:
+        yield call
+    except Exception as e:
+        _record(name, ok=not _provider_fault(e))
+        raise
+    slow = time.monotonic() - start > _setting("NOTIFY_BREAKER_SLOW_SECONDS", DEFAULT_BREAKER_SLOW_SECONDS)
+    _record(name, ok=not (call.fault or slow))
+
+
+def sms_provider(primary=None):
+    """SMS_PROVIDER (or `primary`), or NOTIFY_SMS_FAILOVER while the primary's circuit is open."""
+    primary = (primary or getattr(settings, "SMS_PROVIDER", "brevo") or "brevo").lower()
+    failover = (getattr(settings, "NOTIFY_SMS_FAILOVER", "") or "").lower()
+    if failover and failover != primary and is_open(primary) and not is_open(failover):
+        if failover != "twilio" or twilio_configured():
+            return failover
+    return primary
+
+
+# --- Sends ---
+
+def brevo_send_sms(api_key, *, sender, recipient, content):
+    """POST one transactional SMS to Brevo over the pooled session; returns the Response."""
+    with guarded("brevo") as call:
+        resp = http_session("brevo").post(
+            BREVO_SMS_URL,
+            headers={"api-key": api_key, "accept": "application/json", "content-type": "application/json"},
+            data=json.dumps({"sender": sender, "recipient": recipient, "content": content, "type": "transactional"}),
+            timeout=timeouts(),
+        )
+        call.fault = resp.status_code >= 500
+    count_request()
+    return resp
+
+
+def twilio_configured():
+    sid = getattr(settings, "TWILIO_ACCOUNT_SID", "")
+    tok = getattr(settings, "TWILIO_AUTH_TOKEN", "")
+    return bool(sid and tok and (getattr(settings, "TWILIO_MESSAGING_SERVICE_SID", "")
+                                 or getattr(settings, "TWILIO_FROM_NUMBER", "")))
+
+
+def twilio_send_sms(*, to, body):
+    """Create a Twilio message from the messaging service (or from number); returns the Message."""
+    svc = getattr(settings, "TWILIO_MESSAGING_SERVICE_SID", "")
+    msg_kwargs = {"to": to, "body": body}
+    if svc:
+        msg_kwargs["messaging_service_sid"] = svc
+    else:
+        msg_kwargs["from_"] = getattr(settings, "TWILIO_FROM_NUMBER", "")
+    status_cb = getattr(settings, "TWILIO_STATUS_CALLBACK_URL", "")
+    if status_cb:
+        msg_kwargs["status_callback"] = status_cb
+    logger.info("Attempting Twilio SMS → to=%s via=%s", to, ("service:" + svc if svc else "from:" + msg_kwargs["from_"]))
+    with guarded("twilio"):
+        msg = twilio_client().messages.create(**msg_kwargs)
+    count_request()
+    return msg
+
+
+def count_request():
+    """Call after each provider request; logs connection reuse every STATS_LOG_EVERY requests."""
+    with _lock:
+        _sent["count"] += 1
+        due = _sent["count"] % STATS_LOG_EVERY == 0
+    if due:
+        log_provider_stats()
+
+
+def provider_stats():
+    """{provider: {"requests", "connections", "reuse"}} from the urllib3 pools of each session."""
+    stats = {}
+    for name, session in list(_sessions.items()):
+        pools = session.get_adapter("https://").poolmanager.pools
+        reqs = conns = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                reqs += pool.num_requests
+                conns += pool.num_connections
+        stats[name] = {"requests": reqs, "connections": conns, "reuse": (1 - conns / reqs) if reqs else 0.0}
+    return stats
+
+
+def log_provider_stats():
+    for name, s in provider_stats().items():
+        logger.info("[providers] %s: %d requests over %d connections (%.0f%% reused)",
+                    name, s["requests"], s["connections"], s["reuse"] * 100)
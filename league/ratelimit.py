@@ -0,0 +1,106 @@
+# league/ratelimit.py
+"""Outbound send rate limits per provider, shared by every process through the cache.
+
+Each provider ("email", "brevo", "twilio") has a bucket of `burst` tokens that refills
+every burst/rate seconds, configured by NOTIFY_RATE_LIMITS as sends per second. The
+bucket for the current refill period is a counter in the default cache, taken with
+add()/incr(). Only with REDIS_URL set (add()/incr() atomic, one cache for every
+service) do gunicorn workers, delivery workers and cron commands all draw from the
+same budget. Without it the limits are per host and best-effort: FileBasedCache's
+incr() is a get then a set, so concurrent senders can over-issue tokens, and a worker
+service on another host has its own /tmp cache, hence its own budget. Provider 429s
+are still retried (see delivery.is_transient).
+
+Delivery senders call take() before each provider call. A short wait (up to
+NOTIFY_RATE_MAX_WAIT seconds) is slept off in the sender thread; a longer one is
+returned to the caller, which puts the attempt back in the queue with next_attempt_at
+set to when the next tokens arrive instead of sending it into a 429. Throttles and the
+time spent waiting are counted per provider in the cache; see `throttle_stats()`.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_RATE_LIMITS = {"email": 14.0, "brevo": 10.0, "twilio": 1.0}
+DEFAULT_MAX_WAIT = 2.0
+
+
+def rate_limit(name):
+    """(rate per second, burst) for a provider, or None when it is not limited."""
+    rates = {**DEFAULT_RATE_LIMITS, **getattr(settings, "NOTIFY_RATE_LIMITS", {})}
+    rate = float(rates.get(name) or 0)
+    if rate <= 0:
+        return None
+    return rate, max(1, int(rate))
+
+
+def _incr(key, delta=1, timeout=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _stat_key(name, stat):
+    return f"league:rate:stats:{name}:{stat}"
+
+
+def acquire(name, now=None):
+    """Take one token from the provider's bucket: 0.0 if granted, else seconds until it refills."""
+    limit = rate_limit(name)
+    if limit is None:
+        return 0.0
+    rate, burst = limit
+    period = burst / rate
+    now = time.time() if now is None else now
+    slot = int(now // period)
+    if _incr(f"league:rate:{name}:{slot}", timeout=int(period) + 2) <= burst:
+        return 0.0
+    return max(0.001, (slot + 1) * period - now)
+
+
+def take(name):
+    """Wait for a token, sleeping up to NOTIFY_RATE_MAX_WAIT; returns 0.0 once granted,
+    else the remaining wait for the caller to reschedule the send."""
+    budget = float(getattr(settings, "NOTIFY_RATE_MAX_WAIT", DEFAULT_MAX_WAIT))
+    waited = 0.0
+    try:
+        while True:
+            wait = acquire(name)
+            if not wait:
+                return 0.0
+            if waited + wait > budget:
+                _incr(_stat_key(name, "deferred"))
+                return wait
+            time.sleep(wait)
+            waited += wait
+    finally:
+        if waited:
+            _incr(_stat_key(name, "throttled"))
+            _incr(_stat_key(name, "wait_ms"), int(waited * 1000))
+
+
+def _names():
+    return sorted({**DEFAULT_RATE_LIMITS, **getattr(settings, "NOTIFY_RATE_LIMITS", {})})
+
+
+def throttle_stats():
+    """{provider: {"throttled", "deferred", "wait_seconds"}}: sends that slept for a token,
+    sends rescheduled for a later refill, and total time slept."""
+    out = {}
+    for name in _names():
+        keys = {k: _stat_key(name, k) for k in ("throttled", "deferred", "wait_ms")}
+        values = cache.get_many(keys.values())
+        out[name] = {
+            "throttled": values.get(keys["throttled"], 0),
+            "deferred": values.get(keys["deferred"], 0),
+            "wait_seconds": values.get(keys["wait_ms"], 0) / 1000,
+        }
+    return out
+
+
+def reset_throttle_stats():
+    cache.delete_many([_stat_key(n, k) for n in _names() for k in ("throttled", "deferred", "wait_ms")])
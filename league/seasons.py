@@ -0,0 +1,103 @@
+# league/seasons.py
+"""Season registry: the active season and the ordered season list.
+
+Seasons change a few times a year but are read on almost every page, so they are
+kept in memory per process and memoized on the request. A generation counter in the
+shared cache is bumped whenever a Season is saved or deleted (right away and again on
+commit, so nobody keeps data read before the commit); each process compares it once per
+request and reloads when it moved, so a change made by any worker is seen by all of them.
+
+Callers get their own copies of the Season instances, so setting attributes on them
+never leaks into other requests.
+"""
+import copy
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from league.models import Season
+
+_GENERATION_KEY = "league:seasons:generation"
+_REQUEST_ATTR = "_league_seasons"
+
+_lock = threading.Lock()
+_process = {"generation": None, "seasons": ()}
+
+
+class SeasonRegistry:
+    """Seasons newest first (by year, then id) plus the active one."""
+
+    def __init__(self, seasons):
+        self.seasons = seasons
+        self.active = next((s for s in seasons if s.is_active), None)
+
+    def get(self, pk):
+        """Season by id (str or int) or None."""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return next((s for s in self.seasons if s.pk == pk), None)
+
+    @property
+    def newest(self):
+        return self.seasons[0] if self.seasons else None
+
+    @property
+    def active_or_newest(self):
+        return self.active or self.newest
+
+
+def registry_generation():
+    gen = cache.get(_GENERATION_KEY)
+    if gen is None:
+        # Seed from the clock so an evicted counter never matches a stale process copy
+        cache.add(_GENERATION_KEY, int(time.time() * 1000), timeout=None)
+        gen = cache.get(_GENERATION_KEY)
+    return gen
+
+
+def _process_seasons():
+    gen = registry_generation()
+    with _lock:
+        if gen is None or _process["generation"] != gen:
+            _process["seasons"] = tuple(Season.objects.order_by("-year", "-id"))
+            _process["generation"] = gen
+        return _process["seasons"]
+
+
+def season_registry(request=None):
+    """Registry for this request (memoized on it), or a fresh one when no request is given."""
+    if request is not None:
+        registry = getattr(request, _REQUEST_ATTR, None)
+        if registry is not None:
+            return registry
+    registry = SeasonRegistry([copy.copy(s) for s in _process_seasons()])
+    if request is not None:
+        setattr(request, _REQUEST_ATTR, registry)
+    return registry
+
+
+def active_season(request=None):
+    return season_registry(request).active
+
+
+def season_list(request=None):
+    return season_registry(request).seasons
+
+
+def invalidate_seasons():
+    """Make every process reload seasons on its next read."""
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, int(time.time() * 1000), timeout=None)
+    with _lock:
+        _process["generation"] = None
+
+
+def invalidate_seasons_now_and_on_commit():
+    invalidate_seasons()
+    transaction.on_commit(invalidate_seasons)
@@ -0,0 +1,78 @@
+# league/services/eligibility.py
+"""Playoff eligibility table.
+
+Rows come from the PlayerSeasonStats ledger (maintained with grouped queries in
+league.services.stats) joined to the season roster, and are cached per season under
+the season's cache version, so repeated page loads and exports during playoff week
+do not recompute anything until a score, lineup, sub result, roster or player write
+bumps it.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from league.cache import cached_for_season
+from league.models import PlayerSeasonStats, RosterEntry
+
+# Eligibility thresholds
+NUMBER_MIN = 3    # appearances at a number (S# + D#) to be eligible at that number
+OVERALL_MIN = 5   # total appearances to be playoff eligible
+
+EXPORT_COLUMNS = [
+    "last_name", "first_name", "S1", "S2", "S3", "D1", "D2", "D3", "total_matches",
+    "points", "wins", "losses", "win_pct", "elig1", "elig2", "elig3", "overall_eligible",
+]
+
+
+def _display_points(value):
+    # int if whole number, else 2 decimals
+    d = Decimal(value or 0)
+    if d == d.to_integral_value():
+        return int(d)
+    return d.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def compute_eligibility_rows(season):
+    """Build eligibility rows for every rostered player (two queries)."""
+    stats_by_player = {st.player_id: st for st in PlayerSeasonStats.objects.filter(season=season)}
+    empty = PlayerSeasonStats(season=season)
+    roster = (
+        RosterEntry.objects.filter(season=season)
+        .select_related("player")
+        .order_by("player__last_name", "player__first_name")
+    )
+
+    rows = []
+    for re in roster:
+        p = re.player
+        st = stats_by_player.get(p.id, empty)
+
+        # Number buckets (combined singles + doubles)
+        num1, num2, num3 = st.s1 + st.d1, st.s2 + st.d2, st.s3 + st.d3
+        total_matches = st.total_matches
+
+        # W/L (lineup + sub); ties don't affect W-L
+        wins, losses = st.wins, st.losses
+        win_pct = (wins / (wins + losses)) * 100 if (wins + losses) else 0.0
+
+        rows.append({
+            "player": {"id": p.id, "first_name": p.first_name, "last_name": p.last_name},
+            "S1": st.s1, "S2": st.s2, "S3": st.s3, "D1": st.d1, "D2": st.d2, "D3": st.d3,
+            "total_matches": total_matches,
+            "points": _display_points(st.points),
+            "wins": wins, "losses": losses, "win_pct": round(win_pct, 1),
+            "elig1": num1 >= NUMBER_MIN, "elig2": num2 >= NUMBER_MIN, "elig3": num3 >= NUMBER_MIN,
+            "overall_eligible": total_matches >= OVERALL_MIN,
+        })
+    return rows
+
+
+def eligibility_rows(season):
+    """Cached eligibility rows for a season (see league.cache for invalidation)."""
+    if not season:
+        return []
+    return cached_for_season(season.pk, "eligibility", lambda: compute_eligibility_rows(season))
+
+
+def export_row(row):
+    """Flatten a row into EXPORT_COLUMNS order."""
+    flat = dict(row, last_name=row["player"]["last_name"], first_name=row["player"]["first_name"])
+    return [flat[c] for c in EXPORT_COLUMNS]
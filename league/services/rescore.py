@@ -0,0 +1,88 @@
+# league/services/rescore.py
+"""Historical rescoring.
+
+Recomputes PlayerMatchPoints and SubResult.points_cached for batches of fixtures so a
+scoring-rule change can be applied to every past season. Used by the `rescore_league`
+management command, which fans chunks out over a process pool.
+
+Model imports are deferred to call time so this module can be imported by pool
+workers before Django is set up.
+"""
+from decimal import Decimal
+
+
+def init_worker():
+    """Process-pool initializer: make sure Django is ready and no parent DB connection is reused."""
+    import django
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+
+
+def rescore_chunk(fixture_ids, dry_run=False):
+    """Rescore one batch of fixtures.
+
+    Returns a dict of counts plus, when dry_run is set, human-readable diff lines.
+    Each chunk runs in its own transaction; FixtureResult and PlayerSeasonStats rows
+    for the chunk are refreshed afterwards so derived totals stay in step.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+
+    from league.models import Player, SubResult
+    from league.services.scoring import recompute_fixtures_player_points, refresh_fixtures
+
+    out = {
+        "fixtures": len(fixture_ids),
+        "points_created": 0,
+        "points_updated": 0,
+        "points_deleted": 0,
+        "subs_updated": 0,
+        "diff": [],
+    }
+    changes = [] if dry_run else None
+
+    with transaction.atomic():
+        created, updated, deleted = recompute_fixtures_player_points(fixture_ids, dry_run=dry_run, changes=changes)
+        out["points_created"], out["points_updated"], out["points_deleted"] = created, updated, deleted
+
+        sub_changes = []
+        now = timezone.now()
+        subs = SubResult.objects.filter(fixture_id__in=fixture_ids).only("id", "fixture_id", "player_id", "kind", "result", "points_cached")
+        for sr in subs:
+            new = Decimal(str(sr.compute_points()))
+            if sr.points_cached != new:
+                sub_changes.append((sr, sr.points_cached, new))
+                sr.points_cached = new
+                sr.updated_at = now
+        out["subs_updated"] = len(sub_changes)
+
+        if not dry_run:
+            if sub_changes:
+                # bulk_update skips save()/signals, so derived tables are refreshed explicitly below
+                SubResult.objects.bulk_update([sr for sr, _o, _n in sub_changes], ["points_cached", "updated_at"])
+            if created or updated or deleted or sub_changes:
+                refresh_fixtures({fid: set() for fid in fixture_ids})
+
+    if dry_run and (changes or sub_changes):
+        player_ids = {pid for _f, pid, _o, _n in changes} | {sr.player_id for sr, _o, _n in sub_changes}
+        names = {
+            p.pk: f"{p.first_name} {p.last_name}".strip()
+            for p in Player.objects.filter(pk__in=player_ids).only("first_name", "last_name")
+        }
+        for fid, pid, old, new in sorted(changes, key=lambda c: (c[0], c[1])):
+            out["diff"].append(
+                f"fixture {fid} · {names.get(pid, pid)}: match points {_fmt(old)} → {_fmt(new)}"
+            )
+        for sr, old, new in sub_changes:
+            out["diff"].append(
+                f"fixture {sr.fixture_id} · {names.get(sr.player_id, sr.player_id)}: sub result #{sr.pk} {_fmt(old)} → {_fmt(new)}"
+            )
+    return out
+
+
+def _fmt(value):
+    if value is None:
+        return "—"
+    f = float(value)
+    return str(int(f)) if f.is_integer() else str(f)
@@ -3,6 +3,7 @@ from contextlib import suppress
 from django.db import transaction
 from django.db.models import Sum
 
+from league.cache import bump_season_version_on_commit
 from league.models import (
     Season, Fixture, Lineup, SlotScore, SubResult, Availability, SubAvailability,
     LeagueStanding, # plus optional models if you have them:
@@ -43,6 +44,12 @@ def reset_season(season: Season, dry_run: bool = False) -> dict:
     # Standings and fixtures last
     groups.append(("Fixtures",          fixtures_qs))
     groups.append(("League standings",  LeagueStanding.objects.filter(season=season)))
+    with suppress(Exception):
+        from league.models import StandingsSnapshot
+        groups.append(("Standings snapshots", StandingsSnapshot.objects.filter(season=season)))
+    with suppress(Exception):
+        from league.models import PlayerSeasonStats
+        groups.append(("Player season stats", PlayerSeasonStats.objects.filter(season=season)))
 
     counts = {label: qs.count() for (label, qs) in groups}
 
@@ -55,5 +62,6 @@ def reset_season(season: Season, dry_run: bool = False) -> dict:
         for label, qs in groups:
             # Delete, but skip fixtures until we've removed their dependents above
             qs.delete()
+        bump_season_version_on_commit(season.pk)
 
     return counts
\ No newline at end of file
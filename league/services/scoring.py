@@ -0,0 +1,352 @@
+# league/services/scoring.py
+"""Batch match scoring.
+
+`compute_season_match_points()` loads every SlotScore and LineupSlot for a season
+in a constant number of queries and applies the same Sub (External) rules as the
+per-fixture `compute_fixture_match_points()` in views.
+
+`recompute_fixtures_player_points()` diffs per-player PlayerMatchPoints against the
+stored rows and applies only the changes.
+
+`refresh_fixture_results()` persists those totals into the denormalized FixtureResult
+table so list pages can read them back with a single indexed query; `refresh_fixtures()`
+also brings the PlayerSeasonStats ledger along.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from league.cache import bump_season_version_on_commit
+from league.models import Fixture, FixtureResult, LineupSlot, PlayerMatchPoints, SlotScore, SubResult
+from league.services.stats import refresh_stats_for_fixtures
+
+
+def _base_points(result):
+    """Return (home_base, away_base) for a SlotScore.Result."""
+    if result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF):
+        return 2.0, 0.0
+    if result in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF):
+        return 0.0, 2.0
+    if result == SlotScore.Result.TIE:
+        return 1.0, 1.0
+    return 0.0, 0.0
+
+
+def _home_share_with_sub(slot_code, sub1, sub2, base_home):
+    """Apply the Sub (External) rules to the home share of one slot.
+
+    Singles: any Sub means home gets 0 from this slot.
+    Doubles: one Sub halves the home share; two Subs give 0.
+    """
+    if base_home <= 0:
+        return 0.0
+    if not str(slot_code).startswith("D"):
+        return 0.0 if sub1 else base_home
+    if sub1 and sub2:
+        return 0.0
+    if sub1 or sub2:
+        return base_home / 2.0
+    return base_home
+
+
+def _norm(x):
+    # Normalize to int when clean (e.g., 12.0) else keep .5 etc.
+    return int(x) if float(x).is_integer() else x
+
+
+def score_rows(score_rows, slot_rows):
+    """Pure scoring core shared by the batch and single-fixture paths.
+
+    score_rows: iterable of (fixture_id, slot_code, result)
+    slot_rows:  iterable of (fixture_id, slot_code, player1_is_sub, player2_is_sub)
+    Returns {fixture_id: (home_total, away_total)} for fixtures with at least one SlotScore.
+    """
+    subs = {(fid, code): (bool(s1), bool(s2)) for fid, code, s1, s2 in slot_rows}
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for fid, code, result in score_rows:
+        base_home, base_away = _base_points(result)
+        sub1, sub2 = subs.get((fid, code), (False, False))
+        totals[fid][0] += _home_share_with_sub(code, sub1, sub2, base_home)
+        totals[fid][1] += base_away
+    return {fid: (_norm(h), _norm(a)) for fid, (h, a) in totals.items()}
+
+
+def compute_fixtures_match_points(fixtures):
+    """Return {fixture_id: (home_total, away_total)} for the given fixtures (queryset, list or ids).
+
+    Runs two queries regardless of how many fixtures are passed. Fixtures without any
+    SlotScore are omitted, so callers can use membership as the "scored" check.
+    """
+    if isinstance(fixtures, (list, tuple, set)):
+        ids = [getattr(f, "pk", f) for f in fixtures]
+        score_qs = SlotScore.objects.filter(fixture_id__in=ids)
+        slot_qs = LineupSlot.objects.filter(lineup__fixture_id__in=ids)
+    else:
+        score_qs = SlotScore.objects.filter(fixture__in=fixtures)
+        slot_qs = LineupSlot.objects.filter(lineup__fixture__in=fixtures)
+    return score_rows(
+        score_qs.values_list("fixture_id", "slot_code", "result"),
+        slot_qs.values_list("lineup__fixture_id", "slot", "player1__is_substitute", "player2__is_substitute"),
+    )
+
+
+def compute_season_match_points(season):
+    """Return {fixture_id: (home_total, away_total)} for every scored fixture in a season."""
+    if not season:
+        return {}
+    return score_rows(
+        SlotScore.objects.filter(fixture__season=season)
+        .values_list("fixture_id", "slot_code", "result"),
+        LineupSlot.objects.filter(lineup__fixture__season=season)
+        .values_list("lineup__fixture_id", "slot", "player1__is_substitute", "player2__is_substitute"),
+    )
+
+
+def season_home_total(season):
+    """Sum adjusted home match points across all scored fixtures in a season."""
+    return sum(h for h, _a in compute_season_match_points(season).values())
+
+
+# --- Per-player points (PlayerMatchPoints) ---
+
+def _player_share(slot_code, result):
+    """Points credited to each non-Sub player in a slot.
+
+    Singles: Win=2, Tie=1. Doubles: Win=1 each, Tie=0.5 each. Losses give 0.
+    """
+    doubles = str(slot_code).startswith("D")
+    if result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF):
+        return Decimal("1") if doubles else Decimal("2")
+    if result == SlotScore.Result.TIE:
+        return Decimal("0.5") if doubles else Decimal("1")
+    return Decimal("0")
+
+
+def player_point_rows(score_rows, slot_rows):
+    """Pure core for PlayerMatchPoints.
+
+    score_rows: iterable of (fixture_id, slot_code, result)
+    slot_rows:  iterable of (fixture_id, slot_code, player1_id, player1_is_sub, player2_id, player2_is_sub)
+    Returns {(fixture_id, player_id): Decimal points} with zero totals omitted. A player
+    listed in more than one slot of the same fixture is credited the sum.
+    """
+    results = {(fid, code): result for fid, code, result in score_rows}
+    target = defaultdict(Decimal)
+    for fid, code, p1, p1_sub, p2, p2_sub in slot_rows:
+        result = results.get((fid, code))
+        if result is None:
+            continue
+        share = _player_share(code, result)
+        if not share:
+            continue
+        players = [(p1, p1_sub)] if not str(code).startswith("D") else [(p1, p1_sub), (p2, p2_sub)]
+        for pid, is_sub in players:
+            if pid and not is_sub:
+                target[(fid, pid)] += share
+    return {k: v for k, v in target.items() if v}
+
+
+def recompute_fixtures_player_points(fixtures, dry_run=False, changes=None):
+    """Bring PlayerMatchPoints for the given fixtures (queryset, list or ids) in line with
+    their SlotScores and lineups.
+
+    The target set is computed in memory and only the difference is written, in one
+    transaction: new rows via bulk_create, changed points via bulk_update, stale rows
+    via a single delete. Returns (created, updated, deleted).
+
+    With dry_run=True nothing is written. If a `changes` list is passed it receives one
+    (fixture_id, player_id, old_points, new_points) tuple per difference (None = absent).
+    """
+    if isinstance(fixtures, (list, tuple, set)):
+        ids = [getattr(f, "pk", f) for f in fixtures]
+    else:
+        ids = list(fixtures.values_list("pk", flat=True))
+    if not ids:
+        return 0, 0, 0
+
+    target = player_point_rows(
+        SlotScore.objects.filter(fixture_id__in=ids).values_list("fixture_id", "slot_code", "result"),
+        LineupSlot.objects.filter(lineup__fixture_id__in=ids).values_list(
+            "lineup__fixture_id", "slot",
+            "player1_id", "player1__is_substitute",
+            "player2_id", "player2__is_substitute",
+        ),
+    )
+
+    with transaction.atomic():
+        existing_qs = PlayerMatchPoints.objects.filter(fixture_id__in=ids)
+        if not dry_run:
+            existing_qs = existing_qs.select_for_update()
+        existing = {(r.fixture_id, r.player_id): r for r in existing_qs}
+        now = timezone.now()
+        to_create, to_update = [], []
+        for key, pts in target.items():
+            row = existing.pop(key, None)
+            if row is None:
+                to_create.append(PlayerMatchPoints(fixture_id=key[0], player_id=key[1], points=pts))
+                if changes is not None:
+                    changes.append((key[0], key[1], None, pts))
+            elif row.points != pts:
+                if changes is not None:
+                    changes.append((key[0], key[1], row.points, pts))
+                row.points = pts
+                row.updated_at = now
+                to_update.append(row)
+        stale = [r.pk for r in existing.values()]
+        if changes is not None:
+            changes.extend((r.fixture_id, r.player_id, r.points, None) for r in existing.values())
+
+        if dry_run:
+            return len(to_create), len(to_update), len(stale)
+        if stale:
+            PlayerMatchPoints.objects.filter(pk__in=stale).delete()
+        if to_create:
+            PlayerMatchPoints.objects.bulk_create(to_create)
+        if to_update:
+            PlayerMatchPoints.objects.bulk_update(to_update, ["points", "updated_at"])
+    return len(to_create), len(to_update), len(stale)
+
+
+# --- Denormalized FixtureResult maintenance ---
+
+_RESULT_FIELDS = ["season", "home_total", "away_total", "outcome", "scored", "sub_points"]
+
+_state = threading.local()
+
+
+def _outcome(home, away):
+    if home > away:
+        return FixtureResult.Outcome.WIN
+    if home < away:
+        return FixtureResult.Outcome.LOSS
+    return FixtureResult.Outcome.TIE
+
+
+def refresh_fixture_results(fixture_ids):
+    """Recompute and upsert FixtureResult rows for the given fixture ids.
+
+    Ids whose fixture no longer exists are skipped. Rows are only written (and their
+    version bumped) when a value actually changed. Returns the number of rows written.
+    """
+    ids = {int(getattr(f, "pk", f)) for f in fixture_ids if f is not None}
+    if not ids:
+        return 0
+    with transaction.atomic():
+        seasons = dict(Fixture.objects.filter(pk__in=ids).values_list("pk", "season_id"))
+        if not seasons:
+            return 0
+        points = compute_fixtures_match_points(list(seasons))
+        sub_totals = dict(
+            SubResult.objects.filter(fixture_id__in=seasons)
+            .values("fixture_id")
+            .annotate(total=Sum("points_cached"))
+            .values_list("fixture_id", "total")
+        )
+        existing = {
+            r.fixture_id: r
+            for r in FixtureResult.objects.select_for_update().filter(fixture_id__in=seasons)
+        }
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for fid, season_id in seasons.items():
+            scored = fid in points
+            home, away = points.get(fid, (0, 0))
+            values = {
+                "season_id": season_id,
+                "home_total": Decimal(str(home)),
+                "away_total": Decimal(str(away)),
+                "outcome": _outcome(home, away) if scored else "",
+                "scored": scored,
+                "sub_points": sub_totals.get(fid) or Decimal("0"),
+            }
+            row = existing.get(fid)
+            if row is None:
+                to_create.append(FixtureResult(fixture_id=fid, version=1, updated_at=now, **values))
+                continue
+            if all(getattr(row, k) == v for k, v in values.items()):
+                continue
+            for k, v in values.items():
+                setattr(row, k, v)
+            row.version += 1
+            row.updated_at = now
+            to_update.append(row)
+
+        if to_create:
+            FixtureResult.objects.bulk_create(to_create)
+        if to_update:
+            FixtureResult.objects.bulk_update(to_update, _RESULT_FIELDS + ["version", "updated_at"])
+    return len(to_create) + len(to_update)
+
+
+def refresh_fixtures(dirty):
+    """Refresh every derived table for {fixture_id: {extra player ids}}: FixtureResult and
+    PlayerSeasonStats, then invalidate the affected seasons' caches."""
+    if not dirty:
+        return
+    with transaction.atomic():
+        refresh_fixture_results(dirty)
+        refresh_stats_for_fixtures(list(dirty), extra_players=dirty)
+        # Season-level caches (e.g. playoff eligibility) are stale once this commits
+        bump_season_version_on_commit(
+            *Fixture.objects.filter(pk__in=list(dirty)).values_list("season_id", flat=True).distinct()
+        )
+
+
+def _flush_pending():
+    pending = getattr(_state, "pending", None)
+    if not pending:
+        return
+    dirty, _state.pending = pending, {}
+    refresh_fixtures(dirty)
+
+
+def mark_fixture_dirty(fixture_id, player_ids=()):
+    """Schedule a refresh of the derived tables for one fixture.
+
+    `player_ids` names players who may no longer be linked to the fixture (e.g. removed
+    from a slot) but whose stats still need recomputing.
+
+    Inside `deferred_fixture_refresh()` the id is collected and refreshed once when the
+    block exits. Otherwise the refresh runs after the surrounding transaction commits,
+    so cascading deletes do not recreate rows for a fixture that is going away.
+    """
+    if fixture_id is None:
+        return
+    extra = {pid for pid in player_ids if pid}
+    block = getattr(_state, "block", None)
+    if block is not None:
+        block.setdefault(fixture_id, set()).update(extra)
+        return
+    if not hasattr(_state, "pending"):
+        _state.pending = {}
+    _state.pending.setdefault(fixture_id, set()).update(extra)
+    # One callback per mark; the first to run drains the whole set, the rest are no-ops.
+    # If the transaction rolls back the ids stay pending and are refreshed on the next commit.
+    transaction.on_commit(_flush_pending)
+
+
+@contextmanager
+def deferred_fixture_refresh():
+    """Batch derived-table refreshes for a block of score/lineup writes.
+
+    Opens a transaction; fixtures marked dirty inside are refreshed once, in the same
+    transaction, when the block exits. Nested blocks join the outermost one.
+    """
+    if getattr(_state, "block", None) is not None:
+        with transaction.atomic():
+            yield
+        return
+    _state.block = {}
+    try:
+        with transaction.atomic():
+            yield
+            dirty, _state.block = _state.block, None
+            refresh_fixtures(dirty)
+    finally:
+        _state.block = None
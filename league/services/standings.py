@@ -0,0 +1,118 @@
+# league/services/standings.py
+"""League standings: editable drafts and immutable published snapshots.
+
+LeagueStanding rows are the working draft (other teams' points are typed in by an
+admin; the Royals row is computed). Publishing copies the draft into a new
+StandingsSnapshot version, which is what players see on the dashboard. Reads never
+write: the Royals total for a draft preview is computed in memory.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from league.models import LeagueStanding, Season, StandingsSnapshot, StandingsSnapshotRow, SubResult
+from league.services.scoring import season_home_total
+
+ROYALS = "Royals"
+
+
+def royals_total(season):
+    """Royals points = adjusted home match points (batch scoring) + sub points."""
+    if not season:
+        return Decimal("0")
+    match = Decimal(str(season_home_total(season)))
+    subs = SubResult.objects.filter(fixture__season=season).aggregate(total=Sum("points_cached"))["total"]
+    return match + (subs or Decimal("0"))
+
+
+def draft_rows(season):
+    """Draft standings sorted by points, with the Royals row carrying a fresh (unsaved) total."""
+    if not season:
+        return []
+    rows = list(LeagueStanding.objects.filter(season=season))
+    royals = next((r for r in rows if r.is_royals), None)
+    if royals is None:
+        royals = LeagueStanding(season=season, team_name=ROYALS, is_royals=True)
+        rows.append(royals)
+    royals.points = royals_total(season)
+    rows.sort(key=lambda r: (-r.points, r.team_name))
+    return rows
+
+
+def parse_rows(data, prefix="standings", min_rows=None):
+    """Read (team_name, points) pairs from POSTed `<prefix>-<i>-team_name/points` fields.
+
+    Reads `<prefix>-TOTAL_FORMS` rows, and at least `min_rows` for forms that always
+    render a fixed number of rows. Blank names are skipped; invalid or negative points
+    become 0.
+    """
+    try:
+        total = int(data.get(f"{prefix}-TOTAL_FORMS", min_rows or 0))
+    except (TypeError, ValueError):
+        total = min_rows or 0
+    if min_rows is not None:
+        total = max(total, min_rows)
+    out = []
+    for i in range(total):
+        name = (data.get(f"{prefix}-{i}-team_name", "") or "").strip()
+        if not name:
+            continue
+        raw = data.get(f"{prefix}-{i}-points", "")
+        try:
+            pts = Decimal(str(raw)) if str(raw).strip() != "" else Decimal("0")
+        except InvalidOperation:
+            pts = Decimal("0")
+        out.append((name, max(pts, Decimal("0"))))
+    return out
+
+
+def save_draft(season, rows, user=None):
+    """Upsert draft rows for other teams and refresh the Royals row. Returns rows written."""
+    with transaction.atomic():
+        count = 0
+        for name, pts in rows:
+            LeagueStanding.objects.update_or_create(
+                season=season, team_name=name,
+                defaults={"points": pts, "is_royals": False, "updated_by": user},
+            )
+            count += 1
+        LeagueStanding.objects.update_or_create(
+            season=season, team_name=ROYALS,
+            defaults={"points": royals_total(season), "is_royals": True, "updated_by": user},
+        )
+        # Draft now differs from what is published
+        LeagueStanding.objects.filter(season=season).update(published=False)
+    return count
+
+
+def publish_standings(season, user=None):
+    """Freeze the current draft into a new snapshot version and return it."""
+    with transaction.atomic():
+        # Serialize concurrent publishes for the season so versions stay gapless
+        Season.objects.select_for_update().filter(pk=season.pk).first()
+        royals_pts = royals_total(season)
+        LeagueStanding.objects.update_or_create(
+            season=season, team_name=ROYALS,
+            defaults={"points": royals_pts, "is_royals": True, "updated_by": user},
+        )
+        rows = list(LeagueStanding.objects.filter(season=season).order_by("-points", "team_name"))
+        last = StandingsSnapshot.objects.filter(season=season).aggregate(v=Max("version"))["v"] or 0
+        snapshot = StandingsSnapshot.objects.create(
+            season=season, version=last + 1, royals_points=royals_pts, published_by=user,
+        )
+        StandingsSnapshotRow.objects.bulk_create([
+            StandingsSnapshotRow(snapshot=snapshot, team_name=r.team_name, points=r.points,
+                                 is_royals=r.is_royals, position=i)
+            for i, r in enumerate(rows, start=1)
+        ])
+        LeagueStanding.objects.filter(season=season).update(published=True)
+    return snapshot
+
+
+def published_rows(season):
+    """Rows of the latest published snapshot for a season (one query)."""
+    if not season:
+        return StandingsSnapshotRow.objects.none()
+    latest = StandingsSnapshot.objects.filter(season=season).order_by("-version").values("pk")[:1]
+    return StandingsSnapshotRow.objects.filter(snapshot=latest).order_by("position")
@@ -0,0 +1,194 @@
+# league/services/stats.py
+"""PlayerSeasonStats ledger maintenance.
+
+Stats are refreshed per (season, player) key from the source rows with a handful of
+GROUP BY queries, so a score or lineup edit only touches the players involved.
+`rebuild_season_stats()` recomputes a whole season and is used by the
+`rebuild_player_stats` command for consistency checks.
+
+`player_record()` reads one player's W/L/T for a season straight from the source rows.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from league.cache import bump_season_version_on_commit
+from league.models import Fixture, LineupSlot, PlayerMatchPoints, PlayerSeasonStats, SlotScore, SubResult
+
+WIN_CODES = ("W", "WF")
+LOSS_CODES = ("L", "LF")
+TIE_CODES = ("T",)
+
+SLOT_FIELDS = {"S1": "s1", "S2": "s2", "S3": "s3", "D1": "d1", "D2": "d2", "D3": "d3"}
+STAT_FIELDS = ["lineup_points", "sub_points", "wins", "losses", "ties"] + list(SLOT_FIELDS.values())
+
+
+def _record_counts(field="result"):
+    """Conditional Count() aggregates for W/L/T over a result column."""
+    return {
+        "n": Count("id"),
+        "wins": Count("id", filter=Q(**{f"{field}__in": WIN_CODES})),
+        "losses": Count("id", filter=Q(**{f"{field}__in": LOSS_CODES})),
+        "ties": Count("id", filter=Q(**{f"{field}__in": TIE_CODES})),
+    }
+
+
+def compute_season_stats(season_id, player_ids=None):
+    """Return {player_id: {field: value}} for one season from the source tables.
+
+    Limited to `player_ids` when given. Players without any activity are omitted.
+    """
+    stats = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    def _players(qs, field):
+        return qs.filter(**{f"{field}__in": player_ids}) if player_ids is not None else qs
+
+    # Lineup appearances + W/L/T: result of the SlotScore for the same fixture/slot
+    slot_result = SlotScore.objects.filter(
+        fixture_id=OuterRef("lineup__fixture_id"), slot_code=OuterRef("slot")
+    ).values("result")[:1]
+    slots = LineupSlot.objects.filter(lineup__fixture__season_id=season_id).annotate(slot_result=Subquery(slot_result))
+    for col in ("player1_id", "player2_id"):
+        rows = (
+            _players(slots.filter(**{f"{col}__isnull": False}), col)
+            .values(col, "slot")
+            .annotate(**_record_counts("slot_result"))
+            .order_by()
+        )
+        for r in rows:
+            s = stats[r[col]]
+            if r["slot"] in SLOT_FIELDS:
+                s[SLOT_FIELDS[r["slot"]]] += r["n"]
+            s["wins"] += r["wins"]
+            s["losses"] += r["losses"]
+            s["ties"] += r["ties"]
+
+    # Sub results count as appearances in their slot and toward the record
+    subs = (
+        _players(SubResult.objects.filter(fixture__season_id=season_id), "player_id")
+        .values("player_id", "slot_code")
+        .annotate(pts=Sum("points_cached"), **_record_counts())
+        .order_by()
+    )
+    for r in subs:
+        s = stats[r["player_id"]]
+        if r["slot_code"] in SLOT_FIELDS:
+            s[SLOT_FIELDS[r["slot_code"]]] += r["n"]
+        s["wins"] += r["wins"]
+        s["losses"] += r["losses"]
+        s["ties"] += r["ties"]
+        s["sub_points"] += r["pts"] or Decimal("0")
+
+    pmp = (
+        _players(PlayerMatchPoints.objects.filter(fixture__season_id=season_id), "player_id")
+        .values("player_id")
+        .annotate(total=Sum("points"))
+        .order_by()
+    )
+    for r in pmp:
+        stats[r["player_id"]]["lineup_points"] += r["total"] or Decimal("0")
+
+    return {pid: s for pid, s in stats.items() if any(s.values())}
+
+
+def player_record(player, season):
+    """Return {"wins", "losses", "ties"} for a player in a season (lineup + sub results).
+
+    Read from the player's PlayerSeasonStats ledger row: one single-row query.
+    """
+    record = {"wins": 0, "losses": 0, "ties": 0}
+    if not player or not season:
+        return record
+    row = PlayerSeasonStats.objects.filter(season=season, player=player).values(*record).first()
+    return row or record
+
+
+def _apply(season_id, target, existing, dry_run=False):
+    """Write the difference between `target` ({player_id: fields}) and `existing` rows."""
+    now = timezone.now()
+    to_create, to_update, changed = [], [], []
+    for pid, values in target.items():
+        row = existing.pop(pid, None)
+        if row is None:
+            to_create.append(PlayerSeasonStats(season_id=season_id, player_id=pid, **values))
+            changed.append(pid)
+            continue
+        if all(getattr(row, k) == v for k, v in values.items()):
+            continue
+        for k, v in values.items():
+            setattr(row, k, v)
+        row.updated_at = now
+        to_update.append(row)
+        changed.append(pid)
+    stale = list(existing.values())
+    changed.extend(r.player_id for r in stale)
+
+    if not dry_run:
+        if stale:
+            PlayerSeasonStats.objects.filter(pk__in=[r.pk for r in stale]).delete()
+        if to_create:
+            PlayerSeasonStats.objects.bulk_create(to_create)
+        if to_update:
+            PlayerSeasonStats.objects.bulk_update(to_update, STAT_FIELDS + ["updated_at"])
+    return changed
+
+
+def refresh_player_season_stats(keys):
+    """Recompute PlayerSeasonStats for an iterable of (season_id, player_id) keys."""
+    by_season = defaultdict(set)
+    for season_id, player_id in keys:
+        if season_id and player_id:
+            by_season[season_id].add(player_id)
+    written = 0
+    with transaction.atomic():
+        for season_id, player_ids in by_season.items():
+            target = compute_season_stats(season_id, player_ids)
+            existing = {
+                r.player_id: r
+                for r in PlayerSeasonStats.objects.select_for_update().filter(season_id=season_id, player_id__in=player_ids)
+            }
+            written += len(_apply(season_id, target, existing))
+    return written
+
+
+def refresh_stats_for_fixtures(fixture_ids, extra_players=None):
+    """Refresh stats for everyone involved in the given fixtures.
+
+    Involved = current lineup players, sub result players, players holding match points,
+    plus any `extra_players` ({fixture_id: {player_id}}) such as someone just removed
+    from a slot. Fixtures that no longer exist are skipped.
+    """
+    extra_players = extra_players or {}
+    seasons = dict(Fixture.objects.filter(pk__in=fixture_ids).values_list("pk", "season_id"))
+    if not seasons:
+        return 0
+    keys = set()
+    for fid, pids in extra_players.items():
+        if fid in seasons:
+            keys.update((seasons[fid], pid) for pid in pids)
+    for fid, p1, p2 in LineupSlot.objects.filter(lineup__fixture_id__in=seasons).values_list("lineup__fixture_id", "player1_id", "player2_id"):
+        keys.update((seasons[fid], pid) for pid in (p1, p2) if pid)
+    for fid, pid in SubResult.objects.filter(fixture_id__in=seasons).values_list("fixture_id", "player_id"):
+        keys.add((seasons[fid], pid))
+    for fid, pid in PlayerMatchPoints.objects.filter(fixture_id__in=seasons).values_list("fixture_id", "player_id"):
+        keys.add((seasons[fid], pid))
+    return refresh_player_season_stats(keys)
+
+
+def rebuild_season_stats(season, dry_run=False):
+    """Recompute every PlayerSeasonStats row for a season.
+
+    Returns the player ids whose row was (or, with dry_run, would be) created,
+    changed or deleted — an empty list means the ledger is consistent.
+    """
+    season_id = getattr(season, "pk", season)
+    with transaction.atomic():
+        target = compute_season_stats(season_id)
+        existing = {r.player_id: r for r in PlayerSeasonStats.objects.filter(season_id=season_id)}
+        changed = _apply(season_id, target, existing, dry_run=dry_run)
+        if changed and not dry_run:
+            bump_season_version_on_commit(season_id)
+    return changed
@@ -0,0 +1,156 @@
+# league/signals.py
+"""Signal receivers that keep denormalized tables in step with their sources.
+
+Connected from LeagueConfig.ready().
+"""
+from anymail.signals import tracking
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_season_version_on_commit, invalidate_bell
+from .delivery_status import record_email_event
+from .models import (
+    Fixture, LeagueStanding, Lineup, LineupSlot, NotificationReceipt, Player, RosterEntry, Season, SlotScore, SubResult,
+)
+from .seasons import invalidate_seasons_now_and_on_commit
+from .services.scoring import mark_fixture_dirty
+
+
+# --- FixtureResult / PlayerSeasonStats ---
+
+@receiver(post_save, sender=SlotScore)
+@receiver(post_delete, sender=SlotScore)
+def slotscore_changed(sender, instance, **kwargs):
+    mark_fixture_dirty(instance.fixture_id)
+
+
+@receiver(pre_save, sender=SubResult)
+def subresult_remember_previous(sender, instance, **kwargs):
+    # A result moved to another player/fixture must refresh the previous owner too
+    instance._previous_owner = None
+    if instance.pk:
+        instance._previous_owner = (
+            SubResult.objects.filter(pk=instance.pk).values_list("fixture_id", "player_id").first()
+        )
+
+
+@receiver(post_save, sender=SubResult)
+@receiver(post_delete, sender=SubResult)
+def subresult_changed(sender, instance, **kwargs):
+    mark_fixture_dirty(instance.fixture_id, [instance.player_id])
+    previous = getattr(instance, "_previous_owner", None)
+    if previous and previous != (instance.fixture_id, instance.player_id):
+        mark_fixture_dirty(previous[0], [previous[1]])
+
+
+@receiver(pre_save, sender=LineupSlot)
+def lineupslot_remember_previous(sender, instance, **kwargs):
+    # Players taken out of a slot are no longer linked to the fixture but their stats change
+    instance._previous_players = ()
+    if instance.pk:
+        instance._previous_players = (
+            LineupSlot.objects.filter(pk=instance.pk).values_list("player1_id", "player2_id").first() or ()
+        )
+
+
+@receiver(post_save, sender=LineupSlot)
+@receiver(post_delete, sender=LineupSlot)
+def lineupslot_changed(sender, instance, created=False, **kwargs):
+    # A freshly created empty slot cannot change totals, records or appearances.
+    if created and not (instance.player1_id or instance.player2_id):
+        return
+    fixture_id = (
+        Lineup.objects.filter(pk=instance.lineup_id).values_list("fixture_id", flat=True).first()
+    )
+    players = {instance.player1_id, instance.player2_id, *getattr(instance, "_previous_players", ())}
+    mark_fixture_dirty(fixture_id, players)
+
+
+@receiver(pre_save, sender=Player)
+def player_remember_substitute(sender, instance, update_fields=None, **kwargs):
+    # Scoring reads is_substitute (a Sub's slot gives the home side less), so a flip re-scores their fixtures
+    instance._previous_is_substitute = None
+    if instance.pk and (update_fields is None or "is_substitute" in update_fields):
+        instance._previous_is_substitute = (
+            Player.objects.filter(pk=instance.pk).values_list("is_substitute", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Player)
+def player_substitute_changed(sender, instance, created=False, **kwargs):
+    previous = getattr(instance, "_previous_is_substitute", None)
+    if created or previous is None or previous == instance.is_substitute:
+        return
+    fixture_ids = (
+        LineupSlot.objects.filter(Q(player1=instance) | Q(player2=instance))
+        .values_list("lineup__fixture_id", flat=True).distinct()
+    )
+    for fixture_id in fixture_ids:
+        mark_fixture_dirty(fixture_id)
+
+
+# --- Season cache versions ---
+# SlotScore, SubResult and LineupSlot writes bump their season through the fixture
+# refresh above (league.services.scoring.refresh_fixtures), once per batch.
+
+@receiver(pre_save, sender=Fixture)
+def fixture_remember_season(sender, instance, **kwargs):
+    instance._previous_season_id = None
+    if instance.pk:
+        instance._previous_season_id = (
+            Fixture.objects.filter(pk=instance.pk).values_list("season_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Fixture)
+@receiver(post_delete, sender=Fixture)
+def fixture_changed(sender, instance, **kwargs):
+    bump_season_version_on_commit(instance.season_id, getattr(instance, "_previous_season_id", None))
+
+
+@receiver(post_save, sender=Lineup)
+@receiver(post_delete, sender=Lineup)
+def lineup_changed(sender, instance, **kwargs):
+    bump_season_version_on_commit(
+        Fixture.objects.filter(pk=instance.fixture_id).values_list("season_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=RosterEntry)
+@receiver(post_delete, sender=RosterEntry)
+@receiver(post_save, sender=LeagueStanding)
+@receiver(post_delete, sender=LeagueStanding)
+def season_row_changed(sender, instance, **kwargs):
+    bump_season_version_on_commit(instance.season_id)
+
+
+@receiver(post_save, sender=Player)
+def player_changed(sender, instance, update_fields=None, **kwargs):
+    # Cached season rows (eligibility, schedules) show player names and captain flags
+    if update_fields is not None and not {"first_name", "last_name", "is_captain"} & set(update_fields):
+        return
+    bump_season_version_on_commit(*RosterEntry.objects.filter(player=instance).values_list("season_id", flat=True))
+
+
+# --- Season registry ---
+
+@receiver(post_save, sender=Season)
+@receiver(post_delete, sender=Season)
+def season_changed(sender, instance, **kwargs):
+    invalidate_seasons_now_and_on_commit()
+
+
+# --- Notification bell ---
+# bulk_create()/update() bypass this; those call sites invalidate explicitly.
+
+@receiver(post_save, sender=NotificationReceipt)
+def receipt_changed(sender, instance, **kwargs):
+    invalidate_bell(instance.user_id)
+
+
+# --- Email delivery status (Anymail tracking webhooks) ---
+
+@receiver(tracking)
+def email_tracking_event(sender, event, esp_name, **kwargs):
+    record_email_event(esp_name, event)
@@ -0,0 +1,113 @@
+# tests/test_cache.py
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from league.cache import cache_stats, cached_season_fixtures, cached_season_results
+from league.models import Season, Fixture, Lineup, SlotScore
+
+
+@pytest.mark.django_db
+def test_season_reads_are_cached_until_a_signal_bumps_the_version(django_assert_num_queries, django_capture_on_commit_callbacks,
+                                                                  settings):
+    cache.clear()
+    settings.SEASON_CACHE_STATS = True  # LocMem isn't counted by default
+    season = Season.objects.create(name="Fall", year=timezone.now().year, is_active=True)
+    fx = Fixture.objects.create(season=season, opponent="Sharks", date=timezone.now(), week_number=1)
+
+    assert [f.opponent for f in cached_season_fixtures(season)] == ["Sharks"]
+    with django_assert_num_queries(0):
+        cached = cached_season_fixtures(season)
+        cached[0].opponent = "mutated"  # callers get their own copies
+        assert cached_season_fixtures(season)[0].opponent == "Sharks"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Fixture.objects.create(season=season, opponent="Jets", date=timezone.now(), week_number=2)
+    assert [f.opponent for f in cached_season_fixtures(season)] == ["Sharks", "Jets"]
+
+    assert fx.pk not in cached_season_results(season)
+    with django_capture_on_commit_callbacks(execute=True):
+        Lineup.objects.create(fixture=fx)
+        SlotScore.objects.create(fixture=fx, slot_code="S1", result=SlotScore.Result.WIN, home_games=6, away_games=1)
+    assert cached_season_results(season)[fx.pk].scored
+
+    stats = cache_stats()["fixtures"]
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+    # Off (the default outside Redis/memcached): cached reads don't touch the counters
+    settings.SEASON_CACHE_STATS = False
+    cached_season_fixtures(season)
+    assert cache_stats()["fixtures"]["hits"] == 2
+
+
+@pytest.mark.django_db
+def test_season_registry_is_memoized_and_invalidated_by_season_saves(rf, django_assert_num_queries):
+    from league.seasons import season_registry
+
+    cache.clear()
+    old = Season.objects.create(name="Spring", year=2020, is_active=True)
+    new = Season.objects.create(name="Fall", year=2021)
+
+    registry = season_registry()
+    assert [s.pk for s in registry.seasons] == [new.pk, old.pk]
+    assert registry.active.pk == old.pk
+
+    request = rf.get("/")
+    with django_assert_num_queries(0):
+        assert season_registry(request).get(str(new.pk)).name == "Fall"
+        assert season_registry(request) is season_registry(request)
+
+    Season.objects.filter(pk=old.pk).update(is_active=False)
+    new.is_active = True
+    new.save(update_fields=["is_active"])
+    assert season_registry().active.pk == new.pk
+
+
+@pytest.mark.django_db
+def test_notification_bell_counts_all_unread_and_is_invalidated_on_read(django_user_model, rf, django_assert_num_queries, django_capture_on_commit_callbacks):
+    from league.context_processors import notifications_context
+    from league.models import Notification, NotificationReceipt
+    from league.utils.notifications import notify
+
+    cache.clear()
+    user = django_user_model.objects.create_user("bell", password="x")
+    request = rf.get("/")
+    request.user = user
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(12):
+            notify("test", users=[user], title=f"N{i}")
+
+    ctx = notifications_context(request)
+    assert ctx["notif_count"] == 12
+    assert len(ctx["notifications"]) == 10
+    with django_assert_num_queries(0):
+        assert notifications_context(request)["notif_count"] == 12
+
+    receipt = NotificationReceipt.objects.filter(user=user).first()
+    with django_capture_on_commit_callbacks(execute=True):
+        receipt.read_at = Notification.objects.first().created_at
+        receipt.save(update_fields=["read_at"])
+    assert notifications_context(request)["notif_count"] == 11
+
+
+@pytest.mark.django_db
+def test_schedule_csv_upload_refreshes_the_cached_schedule(django_user_model, client, settings, django_capture_on_commit_callbacks):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+
+    cache.clear()
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    season = Season.objects.create(name="Fall", year=timezone.now().year, is_active=True)
+    Fixture.objects.create(season=season, opponent="Sharks", date=timezone.now(), week_number=1)
+    admin = django_user_model.objects.create_user("staff", password="x", is_staff=True)
+    client.force_login(admin)
+    assert [f.opponent for f in cached_season_fixtures(season)] == ["Sharks"]
+
+    csv_file = SimpleUploadedFile("schedule.csv", b"week_number,date,time,opponent,home,bye\n2,2030-05-01,18:00,Jets,true,false\n")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse("admin_manage_schedule"),
+                               {"action": "bulk_upload", "season": season.pk, "csv_file": csv_file}, secure=True)
+    assert response.status_code == 302
+    assert [f.opponent for f in cached_season_fixtures(season)] == ["Sharks", "Jets"]
+    response = client.get(reverse("schedule_list"), {"season": season.pk}, secure=True)
+    assert b"Jets" in response.content
@@ -0,0 +1,70 @@
+# tests/test_conditional.py
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from league.models import Season, Player, RosterEntry, Fixture, Availability, Lineup, LineupSlot, SlotScore
+
+
+@pytest.fixture
+def player_client(client, django_user_model, settings):
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    cache.clear()
+    user = django_user_model.objects.create_user("pat", password="x")
+    season = Season.objects.create(name="Summer", year=timezone.now().year, is_active=True)
+    player = Player.objects.create(first_name="Pat", last_name="Player", user=user)
+    RosterEntry.objects.create(season=season, player=player)
+    fixture = Fixture.objects.create(season=season, opponent="Sharks", date=timezone.now(), week_number=1)
+    client.force_login(user)
+    return client, player, fixture
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["schedule_list", "my_results", "fixture_detail"])
+def test_unchanged_pages_answer_304_without_rendering(player_client, name, django_assert_max_num_queries,
+                                                     django_capture_on_commit_callbacks):
+    client, player, fixture = player_client
+    url = reverse(name, args=[fixture.pk]) if name == "fixture_detail" else reverse(name)
+
+    client.get(url, secure=True)  # sets the CSRF cookie, which is part of the validator
+    first = client.get(url, secure=True)
+    assert first.status_code == 200 and first["ETag"]
+    assert "private" in first["Cache-Control"]
+
+    # Session + user + one validator SELECT
+    with django_assert_max_num_queries(3):
+        again = client.get(url, secure=True, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert again.status_code == 304
+
+    # Any write to a source row produces a new validator
+    Availability.objects.create(player=player, fixture=fixture, status="A")
+    SlotScore.objects.create(fixture=fixture, slot_code="S1", result=SlotScore.Result.WIN, home_games=6, away_games=0)
+    changed = client.get(url, secure=True, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200 and changed["ETag"] != first["ETag"]
+
+    # Only a lineup slot changes: a Sub takes the scored S1 slot, so the team total drops
+    with django_capture_on_commit_callbacks(execute=True):
+        slot = LineupSlot.objects.create(lineup=Lineup.objects.create(fixture=fixture), slot="S1", player1=player)
+    before = client.get(url, secure=True)
+    sub = Player.objects.create(first_name="Sub", last_name="External", is_substitute=True)
+    with django_capture_on_commit_callbacks(execute=True):
+        slot.player1 = sub
+        slot.save()
+    swapped = client.get(url, secure=True, HTTP_IF_NONE_MATCH=before["ETag"])
+    assert swapped.status_code == 200 and swapped["ETag"] != before["ETag"]
+
+
+@pytest.mark.django_db
+def test_validator_covers_query_string_and_player_profile(player_client):
+    client, player, fixture = player_client
+    url = reverse("schedule_list")
+    client.get(url, secure=True)
+    etag = client.get(url, secure=True)["ETag"]
+
+    other_season = client.get(f"{url}?season={fixture.season_id + 1}", secure=True, HTTP_IF_NONE_MATCH=etag)
+    assert other_season.status_code == 200 and other_season["ETag"] != etag
+
+    Player.objects.filter(pk=player.pk).update(first_name="Patricia", is_captain=True)
+    renamed = client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag)
+    assert renamed.status_code == 200 and renamed["ETag"] != etag
@@ -0,0 +1,431 @@
+# tests/test_delivery.py
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+from league.models import DeliveryAttempt, NotificationReceipt
+from league.notifications import send_event
+
+
+@pytest.fixture
+def email_user(django_user_model, settings):
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    settings.NOTIFY_DELIVERY_CONCURRENCY = {"EMAIL": 1, "SMS": 1}  # pool threads can't see the test transaction
+    settings.NOTIFY_DELIVERY_INLINE = False  # these tests drive the worker themselves
+    user = django_user_model.objects.create_user("mail", email="mail@example.com", password="x", first_name="Mo")
+    prefs = user.notification_prefs
+    prefs.email_enabled = True
+    prefs.result_posted_email = True
+    prefs.save()
+    return user
+
+
+@pytest.mark.django_db
+def test_send_event_queues_attempts_and_the_worker_sends_them(email_user, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        notif, attempts = send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Result posted", url="/results/",
+                                    context={"slot_label": "Singles 1", "slot_name": "S1", "fixture_url": "/results/"})
+    assert attempts == 2 and len(callbacks) >= 1
+    assert NotificationReceipt.objects.filter(notification=notif, user=email_user).exists()
+    assert mail.outbox == []  # nothing goes out in the request
+
+    email = DeliveryAttempt.objects.get(notification=notif, channel="EMAIL")
+    assert (email.status, email.user_id) == ("PENDING", email_user.pk)
+    assert email.subject and email.body_text
+    assert DeliveryAttempt.objects.get(notification=notif, channel="SMS").status == "SUPPRESSED"
+
+    call_command("run_delivery_worker", "--once", stdout=open("/dev/null", "w"))
+    email.refresh_from_db()
+    assert email.status == "SENT" and email.sent_at
+    assert [m.to for m in mail.outbox] == [["mail@example.com"]]
+    assert mail.outbox[0].subject == email.subject
+
+
+@pytest.mark.django_db
+def test_inline_delivery_sends_after_commit_without_a_worker(email_user, settings, django_capture_on_commit_callbacks):
+    settings.NOTIFY_DELIVERY_INLINE = True
+    with django_capture_on_commit_callbacks(execute=True):
+        notif, _ = send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Result posted",
+                              context={"slot_label": "Singles 1", "slot_name": "S1", "fixture_url": "/results/"})
+    assert DeliveryAttempt.objects.get(notification=notif, channel="EMAIL").status == "SENT"
+    assert [m.to for m in mail.outbox] == [["mail@example.com"]]
+
+
+@pytest.mark.django_db
+def test_leases_are_exclusive_until_they_expire(email_user, monkeypatch):
+    from datetime import timedelta
+    from django.core.mail.backends import locmem
+    from django.utils import timezone
+    from league.delivery import deliver_round, lease_batch
+    from league.models import Notification
+
+    notif = Notification.objects.create(event="TEST", title="t")
+    for i in range(3):
+        DeliveryAttempt.objects.create(notification=notif, channel="EMAIL", to=f"p{i}@example.com", subject="s")
+
+    first = lease_batch("EMAIL", "worker-a", 2)
+    assert len(first) == 2
+    assert [a.to for a in lease_batch("EMAIL", "worker-b", 5)] == ["p2@example.com"]
+    assert lease_batch("EMAIL", "worker-c", 5) == []
+
+    # worker-a died: once its lease runs out the rows can be claimed again
+    DeliveryAttempt.objects.filter(lease_owner="worker-a").update(leased_until=timezone.now() - timedelta(seconds=1))
+    assert sorted(a.pk for a in lease_batch("EMAIL", "worker-c", 5)) == sorted(a.pk for a in first)
+
+    # A sender still holding a lease fills the channel's only slot
+    DeliveryAttempt.objects.update(leased_until=None, lease_owner="")
+    lease_batch("EMAIL", "worker-e", 1)
+    assert deliver_round("worker-d") == (0, 0)
+
+    # One sender, one batch, one backend connection
+    opened = []
+    monkeypatch.setattr(locmem.EmailBackend, "open", lambda self: opened.append(self), raising=False)
+    DeliveryAttempt.objects.update(leased_until=None, lease_owner="")
+    assert deliver_round("worker-d", batch_size=5) == (3, 3)
+    assert len(mail.outbox) == 3 and len(opened) == 1
+    assert DeliveryAttempt.objects.filter(status="SENT", leased_until__isnull=True).count() == 3
+
+
+@pytest.mark.django_db
+def test_transient_errors_are_retried_with_backoff_and_permanent_ones_are_not(email_user, monkeypatch):
+    import smtplib
+    from datetime import timedelta
+    from django.core.mail import EmailMultiAlternatives
+    from django.utils import timezone
+    from league.delivery import lease_batch
+    from league.models import Notification
+
+    notif = Notification.objects.create(event="TEST", title="t")
+    flaky = DeliveryAttempt.objects.create(notification=notif, channel="EMAIL", to="flaky@example.com", subject="s")
+    bounced = DeliveryAttempt.objects.create(notification=notif, channel="EMAIL", to="gone@example.com", subject="s")
+
+    def fail(msg, *args, **kwargs):
+        code = 451 if msg.to == ["flaky@example.com"] else 550
+        raise smtplib.SMTPResponseException(code, b"try later" if code == 451 else b"no such user")
+
+    monkeypatch.setattr(EmailMultiAlternatives, "send", fail)
+    call_command("run_delivery_worker", "--once", stdout=open("/dev/null", "w"))
+    flaky.refresh_from_db()
+    bounced.refresh_from_db()
+    assert (bounced.status, bounced.retry_count) == ("FAILED", 1)
+    assert (flaky.status, flaky.retry_count) == ("PENDING", 1)
+    assert flaky.next_attempt_at > timezone.now() and flaky.leased_until is None
+    assert lease_batch("EMAIL", "early", 5) == []  # not due yet
+
+    monkeypatch.undo()
+    DeliveryAttempt.objects.filter(pk=flaky.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+    call_command("retry_deliveries", stdout=open("/dev/null", "w"))
+    flaky.refresh_from_db()
+    assert flaky.status == "SENT"
+    assert [m.to for m in mail.outbox] == [["flaky@example.com"]]
+
+
+@pytest.mark.django_db
+def test_retry_deliveries_tells_quiet_hour_holds_from_throttled_sends(email_user):
+    import io
+    from datetime import timedelta
+    from django.utils import timezone
+    from league.models import Notification
+
+    notif = Notification.objects.create(event="TEST", title="t")
+    later = timezone.now() + timedelta(hours=1)
+    for error, retry_count in (("", 0), ("rate limited (email)", 0), ("brevo circuit open", 0), ("timeout", 2)):
+        DeliveryAttempt.objects.create(notification=notif, channel="EMAIL", to="x@example.com", subject="s",
+                                       next_attempt_at=later, error=error, retry_count=retry_count)
+    out = io.StringIO()
+    call_command("retry_deliveries", "--dry-run", stdout=out)
+    assert "Waiting: 1 retries, 1 held for quiet hours, 2 postponed by a rate limit or open circuit" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_sms_providers_use_shared_clients_and_5xx_is_retried(email_user, settings, monkeypatch):
+    import requests
+    from league import providers
+    from league.delivery import deliver
+    from league.models import Notification
+
+    settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN = "AC123", "secret"
+    assert providers.twilio_client() is providers.twilio_client()
+
+    settings.ENABLE_SMS, settings.SMS_PROVIDER, settings.BREVO_API_KEY = True, "brevo", "key"
+    sessions = []
+
+    def post(self, url, **kwargs):
+        sessions.append(self)
+        resp = requests.Response()
+        resp.status_code, resp._content = 503, b"busy"
+        return resp
+
+    monkeypatch.setattr(requests.Session, "post", post)
+    notif = Notification.objects.create(event="TEST", title="t")
+    attempts = [DeliveryAttempt.objects.create(notification=notif, channel="SMS", to=f"+1312555000{i}", body_text="hi")
+                for i in range(2)]
+    assert deliver(attempts) == 0
+    assert sessions[0] is sessions[1] is providers.http_session("brevo")
+    assert {(a.status, a.retry_count) for a in attempts} == {("PENDING", 1)}
+
+
+@pytest.mark.django_db
+def test_notify_writes_all_rows_in_a_constant_number_of_inserts(django_user_model, settings):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from league.notifications import notify
+
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    users = [django_user_model.objects.create_user(f"u{i}", email=f"u{i}@example.com") for i in range(8)]
+
+    def inserts(recipients):
+        with CaptureQueriesContext(connection) as ctx:
+            notif, attempts = notify("TEST", users=recipients + recipients[:1], title="Hello")
+        assert attempts == 2 * len(recipients)
+        assert notif.receipts.count() == len(recipients)
+        return sum(q["sql"].startswith("INSERT") for q in ctx.captured_queries)
+
+    assert inserts(users[:2]) == inserts(users) == 3
+
+
+@pytest.mark.django_db
+def test_notify_preloads_preferences_in_one_query(django_user_model, django_assert_num_queries):
+    from league.models import NotificationPreference
+    from league.notifications import notify
+
+    users = [django_user_model.objects.create_user(f"p{i}", email=f"p{i}@example.com") for i in range(8)]
+    NotificationPreference.objects.filter(user__in=users[4:]).delete()
+
+    # notification + receipts + attempts, prefs SELECT + INSERT of the missing ones, savepoint pair
+    with django_assert_num_queries(7):
+        notify("TEST", users=users, title="Hello")
+    assert NotificationPreference.objects.filter(user__in=users).count() == 8
+    with django_assert_num_queries(6):
+        notify("TEST", users=users[:2], title="Hello")
+
+
+@pytest.mark.django_db
+def test_sms_in_quiet_hours_is_held_until_the_recipients_window_ends(email_user, settings):
+    from datetime import datetime, timedelta, timezone as dt_timezone
+    from django.utils import timezone
+    from league.delivery import lease_batch, release_due
+    from league.notifications import _quiet_until
+
+    settings.NOTIFY_QUIET_HOURS = (21, 8)
+    prefs = email_user.notification_prefs
+    now = datetime(2026, 1, 15, 3, 0, tzinfo=dt_timezone.utc)
+    prefs.timezone = "America/New_York"  # 22:00 there
+    assert _quiet_until(prefs, now) == datetime(2026, 1, 15, 13, 0, tzinfo=dt_timezone.utc)
+    prefs.timezone = "Asia/Tokyo"  # noon there
+    assert _quiet_until(prefs, now) is None
+
+    # Quiet right now in UTC: the SMS is queued with a send time instead of being suppressed
+    hour = timezone.now().astimezone(dt_timezone.utc).hour
+    settings.NOTIFY_QUIET_HOURS = (hour, (hour + 2) % 24)
+    type(prefs).objects.filter(pk=prefs.pk).update(  # update(): saving a new phone revokes consent
+        timezone="UTC", sms_enabled=True, sms_opt_in=True, result_posted_sms=True,
+        phone_e164="+13125550100", phone_verified_at=timezone.now(),
+    )
+    notif, _ = send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Result posted",
+                          context={"slot_label": "Singles 1", "slot_name": "S1", "fixture_url": "/results/"})
+    sms = DeliveryAttempt.objects.get(notification=notif, channel="SMS")
+    assert sms.status == "PENDING" and sms.next_attempt_at > timezone.now()
+    assert lease_batch("SMS", "w", 5) == []
+
+    assert release_due(now=sms.next_attempt_at) == 1
+    assert [a.pk for a in lease_batch("SMS", "w", 5)] == [sms.pk]
+
+
+@pytest.mark.django_db
+def test_attempts_in_one_coalescing_window_go_out_as_one_digest(email_user, settings):
+    from django.utils import timezone
+    from league.delivery import deliver_round, messages_saved
+
+    settings.NOTIFY_COALESCE_SECONDS = 120
+    ctx = {"slot_label": "Singles 1", "slot_name": "S1", "fixture_url": "/results/"}
+    first, _ = send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Result posted", context=ctx)
+    second, _ = send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Sub result posted", context=ctx)
+    held = DeliveryAttempt.objects.filter(channel="EMAIL", status="PENDING").order_by("id")
+    assert held.count() == 2 and len({a.next_attempt_at for a in held}) == 1  # the second joined the open window
+    assert deliver_round("w") == (0, 0)
+
+    DeliveryAttempt.objects.filter(pk__in=[a.pk for a in held]).update(next_attempt_at=timezone.now())
+    assert deliver_round("w") == (1, 1)
+    assert len(mail.outbox) == 1 and mail.outbox[0].subject == "Royals: 2 updates"
+    assert DeliveryAttempt.objects.get(notification=second, channel="EMAIL").status == "COALESCED"
+    assert DeliveryAttempt.objects.get(notification=first, channel="EMAIL").status == "SENT"
+    assert messages_saved() == 1
+
+
+@pytest.mark.django_db
+def test_rate_limited_sends_are_rescheduled_not_dropped(email_user, settings, monkeypatch):
+    from django.core.cache import cache
+    from django.utils import timezone
+    from league import ratelimit
+    from league.delivery import deliver_round
+
+    cache.clear()
+    settings.NOTIFY_RATE_LIMITS = {"email": 1}
+    settings.NOTIFY_RATE_MAX_WAIT = 0
+    clock = [1000.5]  # stays inside one refill period unless something sleeps
+    monkeypatch.setattr(ratelimit.time, "time", lambda: clock[0])
+    ctx = {"slot_label": "Singles 1", "slot_name": "S1", "fixture_url": "/results/"}
+    for _ in range(3):
+        send_event("RESULT_POSTED_FOR_PLAYER", users=[email_user], title="Result posted", context=ctx)
+
+    assert deliver_round("w") == (3, 1)
+    deferred = DeliveryAttempt.objects.filter(channel="EMAIL", status="PENDING")
+    assert deferred.count() == 2 and all(a.next_attempt_at > timezone.now() for a in deferred)
+    assert {a.error for a in deferred} == {"rate limited (email)"} and {a.retry_count for a in deferred} == {0}
+    assert ratelimit.throttle_stats()["email"]["deferred"] == 1
+
+    settings.NOTIFY_RATE_MAX_WAIT = 1
+    monkeypatch.setattr(ratelimit.time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    deferred.update(next_attempt_at=timezone.now())
+    assert deliver_round("w") == (2, 2)  # each slept into the next refill period
+    assert len(mail.outbox) == 3
+    assert ratelimit.throttle_stats()["email"] == {"throttled": 2, "deferred": 1, "wait_seconds": 1.5}
+
+
+@pytest.mark.django_db
+def test_circuit_breaker_opens_on_failures_and_fails_over_to_twilio(email_user, settings, monkeypatch):
+    import requests
+    from types import SimpleNamespace
+    from django.core.cache import cache
+    from league import providers
+    from league.delivery import deliver
+    from league.models import Notification
+
+    cache.clear()
+    settings.ENABLE_SMS, settings.SMS_PROVIDER, settings.BREVO_API_KEY = True, "brevo", "key"
+    settings.NOTIFY_BREAKER_FAILURES, settings.NOTIFY_BREAKER_COOLDOWN = 2, 60
+    settings.NOTIFY_RATE_LIMITS = {"brevo": 0, "twilio": 0}
+    calls = []
+
+    def post(self, url, **kwargs):
+        calls.append(kwargs["timeout"])
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(requests.Session, "post", post)
+    notif = Notification.objects.create(event="TEST", title="t")
+    attempts = [DeliveryAttempt.objects.create(notification=notif, channel="SMS", to=f"+1312555000{i}", body_text="hi")
+                for i in range(4)]
+    assert deliver(attempts) == 0
+    assert len(calls) == 2 and sum(calls[0]) <= providers.latency_budget()
+    assert providers.is_open("brevo")
+    held = [a for a in attempts if a.error == "brevo circuit open"]
+    assert len(held) == 2 and {(a.status, a.retry_count) for a in held} == {("PENDING", 0)}
+
+    settings.NOTIFY_SMS_FAILOVER = "twilio"
+    settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_FROM_NUMBER = "AC1", "tok", "+13125550199"
+    monkeypatch.setattr(providers, "twilio_client", lambda: SimpleNamespace(
+        messages=SimpleNamespace(create=lambda **kw: SimpleNamespace(sid=f"SM{kw['to']}"))))
+    assert providers.sms_provider() == "twilio"
+    assert deliver(held) == 2 and {a.status for a in held} == {"QUEUED"}
+    assert len(calls) == 2  # brevo was not called while open
+
+    # After the cool-down one probe goes through and closes the circuit
+    cache.set("league:breaker:brevo:open_until", 0, timeout=None)
+    monkeypatch.setattr(requests.Session, "post", lambda self, url, **kw: SimpleNamespace(
+        status_code=201, text='{"messageId": 7}', json=lambda: {"messageId": 7}))
+    assert providers.sms_provider() == "brevo"
+    retry = DeliveryAttempt.objects.create(notification=notif, channel="SMS", to="+13125550100", body_text="hi")
+    assert deliver([retry]) == 1 and not providers.is_open("brevo")
+    assert cache.get("league:breaker:brevo:open_until") is None
+
+
+@pytest.mark.django_db
+def test_prune_notifications_archives_and_deletes_by_retention(email_user, settings, tmp_path):
+    import gzip
+    import io
+    import json
+    from datetime import timedelta
+    from django.utils import timezone
+    from league.models import Notification
+
+    settings.MEDIA_ROOT = tmp_path
+    settings.NOTIFY_RETENTION = {"deliveries": {"SUPPRESSED": 7}, "notifications": {"default": 30}}
+    old = timezone.now() - timedelta(days=40)
+    stale = Notification.objects.create(event="RESULT_POSTED_FOR_PLAYER", title="old")
+    NotificationReceipt.objects.create(notification=stale, user=email_user)
+    busy = Notification.objects.create(event="RESULT_POSTED_FOR_PLAYER", title="old, still sending")
+    fresh = Notification.objects.create(event="RESULT_POSTED_FOR_PLAYER", title="new")
+    off_enum = Notification.objects.create(event="SUBPLAN_CREATED", title="old, not in Notification.Event")
+    for n, status in ((stale, "SENT"), (busy, "PENDING"), (fresh, "SUPPRESSED"), (fresh, "SENT"), (fresh, "DELIVERED")):
+        DeliveryAttempt.objects.create(notification=n, channel="EMAIL", to="mail@example.com", status=status)
+    Notification.objects.filter(pk__in=[stale.pk, busy.pk, off_enum.pk]).update(created_at=old)
+    DeliveryAttempt.objects.filter(notification__in=[stale, busy]).update(created_at=old)
+    DeliveryAttempt.objects.filter(notification=fresh, status="SUPPRESSED").update(created_at=old)
+    DeliveryAttempt.objects.filter(status="DELIVERED").update(created_at=old - timedelta(days=60))  # default 90
+
+    out = io.StringIO()
+    call_command("prune_notifications", "--dry-run", stdout=out)
+    assert "Would delete 6 rows" in out.getvalue() and Notification.objects.count() == 4
+
+    out = io.StringIO()
+    call_command("prune_notifications", "--archive", "--batch-size", "1", stdout=out)
+    assert "Deleted 6 rows" in out.getvalue() and "rows/s" in out.getvalue()
+    assert set(Notification.objects.values_list("title", flat=True)) == {"old, still sending", "new"}
+    assert list(DeliveryAttempt.objects.filter(notification=fresh).values_list("status", flat=True)) == ["SENT"]
+    archived = {p.name.split("-")[0]: [json.loads(line) for line in gzip.open(p, "rt")]
+                for p in (tmp_path / "archive" / "notifications").iterdir()}
+    assert sorted(r["title"] for r in archived["league_notification"]) == ["old", "old, not in Notification.Event"]
+    assert len(archived["league_notificationreceipt"]) == 1 and len(archived["league_deliveryattempt"]) == 3
+
+
+@pytest.mark.django_db
+def test_status_callbacks_are_buffered_and_only_move_forward(email_user, settings, client, monkeypatch):
+    import json
+    from django.core.cache import cache
+    from django.urls import reverse
+    from league import delivery_status
+    from league.delivery_status import flush_status_updates
+    from league.models import Notification
+
+    cache.clear()
+    assert not delivery_status.buffered()  # LocMem: per process, so callbacks would be applied one by one
+    monkeypatch.setattr(delivery_status, "buffered", lambda: True)
+    settings.NOTIFY_STATUS_BATCH, settings.NOTIFY_STATUS_FLUSH_SECONDS = 3, 3600
+    cache.set("league:status:flushed_at", 10**12, timeout=None)  # only a full batch triggers a flush
+    notif = Notification.objects.create(event="TEST", title="t")
+    sms = DeliveryAttempt.objects.create(notification=notif, channel="SMS", to="+13125550100", status="QUEUED",
+                                         provider="twilio", provider_message_id="SM1")
+    brevo = DeliveryAttempt.objects.create(notification=notif, channel="SMS", to="+13125550101", status="SENT",
+                                           provider="brevo", provider_message_id="42")
+    url = reverse("twilio_sms_status")
+
+    assert client.post(url, {"MessageSid": "SM1", "MessageStatus": "delivered"}).status_code == 200
+    assert client.post(url, {"MessageSid": "SM1", "MessageStatus": "sent"}).status_code == 200  # late, out of order
+    sms.refresh_from_db()
+    assert sms.status == "QUEUED"  # still buffered
+
+    body = json.dumps({"messageId": 42, "msg_status": "hard_bounce", "reason": "invalid number"})
+    brevo_url = reverse("brevo_sms_status")
+    assert client.post(brevo_url, body, content_type="application/json").status_code == 403  # no token configured
+    settings.BREVO_WEBHOOK_TOKEN = "s3cret"
+    assert client.post(f"{brevo_url}?token=nope", body, content_type="application/json").status_code == 403
+    assert client.post(f"{brevo_url}?token=s3cret", body, content_type="application/json").status_code == 200
+    sms.refresh_from_db()
+    brevo.refresh_from_db()
+    assert sms.status == "DELIVERED" and (brevo.status, brevo.error) == ("FAILED", "invalid number")
+
+    client.post(url, {"MessageSid": "SM1", "MessageStatus": "sent"})
+    client.post(url, {"MessageSid": "SM9", "MessageStatus": "sent"})  # not saved yet: kept for the next flush
+    assert flush_status_updates() == 0
+    sms.refresh_from_db()
+    assert sms.status == "DELIVERED"
+    later = DeliveryAttempt.objects.create(notification=notif, channel="SMS", to="+13125550102", status="QUEUED",
+                                           provider="twilio", provider_message_id="SM9")
+    assert flush_status_updates() == 1
+    later.refresh_from_db()
+    assert later.status == "SENT"
+
+
+@pytest.mark.django_db
+def test_status_callbacks_apply_right_away_without_a_shared_cache(email_user, client):
+    from django.urls import reverse
+    from league.models import Notification
+
+    notif = Notification.objects.create(event="TEST", title="t")
+    sms = DeliveryAttempt.objects.create(notification=notif, channel="SMS", to="+13125550100", status="QUEUED",
+                                         provider="twilio", provider_message_id="SM1")
+    client.post(reverse("twilio_sms_status"), {"MessageSid": "SM1", "MessageStatus": "delivered"})
+    client.post(reverse("twilio_sms_status"), {"MessageSid": "SM1", "MessageStatus": "sent"})
+    sms.refresh_from_db()
+    assert sms.status == "DELIVERED"
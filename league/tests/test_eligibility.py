@@ -0,0 +1,73 @@
+# tests/test_eligibility.py
+import csv
+import io
+import json
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from league.models import Season, Player, RosterEntry, Fixture, Lineup, LineupSlot, SlotScore
+from league.services.eligibility import eligibility_rows
+from league.services.stats import rebuild_season_stats
+
+
+@pytest.fixture
+def season_with_results(django_user_model):
+    cache.clear()
+    season = Season.objects.create(name="Spring", year=timezone.now().year, is_active=True)
+    p1 = Player.objects.create(first_name="Al", last_name="Alpha")
+    p2 = Player.objects.create(first_name="Bea", last_name="Beta")
+    RosterEntry.objects.create(season=season, player=p1)
+    RosterEntry.objects.create(season=season, player=p2)
+    for week in range(1, 4):
+        fx = Fixture.objects.create(season=season, opponent=f"Team {week}", date=timezone.now(), week_number=week)
+        ln = Lineup.objects.create(fixture=fx, published=True)
+        LineupSlot.objects.create(lineup=ln, slot="S1", player1=p1)
+        LineupSlot.objects.create(lineup=ln, slot="D1", player1=p1, player2=p2)
+        SlotScore.objects.create(fixture=fx, slot_code="S1", result=SlotScore.Result.WIN, home_games=6, away_games=2)
+    rebuild_season_stats(season)
+    return season, p1, p2
+
+
+@pytest.mark.django_db
+def test_eligibility_rows_are_cached_until_a_write(season_with_results, django_assert_num_queries, django_capture_on_commit_callbacks):
+    season, p1, _ = season_with_results
+    rows = eligibility_rows(season)
+    al = next(r for r in rows if r["player"]["id"] == p1.id)
+    assert (al["S1"], al["D1"], al["total_matches"], al["wins"]) == (3, 3, 6, 3)
+    assert al["elig1"] and al["overall_eligible"]
+
+    # Served from cache: no queries at all
+    with django_assert_num_queries(0):
+        assert eligibility_rows(season) == rows
+
+    # A score write bumps the season version once it commits
+    with django_capture_on_commit_callbacks(execute=True):
+        SlotScore.objects.filter(fixture__season=season, slot_code="S1").first().delete()
+    al = next(r for r in eligibility_rows(season) if r["player"]["id"] == p1.id)
+    assert al["wins"] == 2
+
+    # So does renaming a rostered player
+    p1.first_name = "Alan"
+    with django_capture_on_commit_callbacks(execute=True):
+        p1.save()
+    al = next(r for r in eligibility_rows(season) if r["player"]["id"] == p1.id)
+    assert al["player"]["first_name"] == "Alan"
+
+
+@pytest.mark.django_db
+def test_eligibility_export_streams_csv_and_json(season_with_results, admin_client):
+    season, *_ = season_with_results
+    url = reverse("playoff_eligibility_export", args=["csv"])
+    resp = admin_client.get(url, {"season": season.pk}, secure=True)
+    assert resp.status_code == 200 and resp.streaming
+    lines = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode())))
+    assert lines[0][:2] == ["last_name", "first_name"]
+    assert [l[0] for l in lines[1:]] == ["Alpha", "Beta"]
+
+    resp = admin_client.get(reverse("playoff_eligibility_export", args=["json"]), {"season": season.pk}, secure=True)
+    payload = json.loads(b"".join(resp.streaming_content))
+    assert payload["season"]["id"] == season.pk
+    assert [r["last_name"] for r in payload["rows"]] == ["Alpha", "Beta"]
@@ -0,0 +1,231 @@
+# tests/test_scoring.py
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from league.models import Season, Player, Fixture, FixtureResult, Lineup, LineupSlot, SlotScore
+from league.services.scoring import compute_season_match_points, deferred_fixture_refresh, refresh_fixture_results
+from league.views import compute_fixture_match_points
+
+
+@pytest.fixture
+def scored_season():
+    season = Season.objects.create(name="Fall", year=timezone.now().year, is_active=True)
+    p1 = Player.objects.create(first_name="Al", last_name="Alpha")
+    p2 = Player.objects.create(first_name="Bea", last_name="Beta")
+    sub = Player.objects.create(first_name="Sub", last_name="External", is_substitute=True)
+
+    fixtures = []
+    for week in range(1, 4):
+        fx = Fixture.objects.create(season=season, opponent=f"Team {week}",
+                                    date=timezone.now() - timedelta(days=7 * week), week_number=week)
+        ln = Lineup.objects.create(fixture=fx, published=True)
+        LineupSlot.objects.create(lineup=ln, slot="S1", player1=sub if week == 1 else p1)
+        LineupSlot.objects.create(lineup=ln, slot="D1", player1=p1, player2=sub if week == 2 else p2)
+        LineupSlot.objects.create(lineup=ln, slot="D2", player1=sub, player2=sub)
+        SlotScore.objects.create(fixture=fx, slot_code="S1", result=SlotScore.Result.WIN, home_games=6, away_games=2)
+        SlotScore.objects.create(fixture=fx, slot_code="D1", result=SlotScore.Result.TIE, home_games=6, away_games=6)
+        SlotScore.objects.create(fixture=fx, slot_code="D2", result=SlotScore.Result.WIN_FF)
+        fixtures.append(fx)
+
+    # Unscored fixture should be absent from the batch result
+    Fixture.objects.create(season=season, opponent="Later", date=timezone.now() + timedelta(days=7), week_number=4)
+    return season, fixtures
+
+
+@pytest.mark.django_db
+def test_season_batch_matches_per_fixture(scored_season):
+    season, fixtures = scored_season
+    batch = compute_season_match_points(season)
+
+    assert set(batch) == {fx.id for fx in fixtures}
+    for fx in fixtures:
+        assert batch[fx.id] == compute_fixture_match_points(fx)
+
+    # Week 1: singles Sub → 0; D1 tie → 1; D2 two Subs → 0
+    assert batch[fixtures[0].id] == (1, 1)
+    # Week 2: S1 win → 2; D1 tie with one Sub → 0.5
+    assert batch[fixtures[1].id] == (2.5, 1)
+    # Week 3: no Subs outside D2
+    assert batch[fixtures[2].id] == (3, 1)
+
+
+@pytest.mark.django_db
+def test_season_batch_query_count_is_constant(scored_season, django_assert_num_queries):
+    season, _ = scored_season
+    with django_assert_num_queries(2):
+        compute_season_match_points(season)
+
+
+@pytest.mark.django_db
+def test_fixture_result_tracks_score_writes(scored_season):
+    season, fixtures = scored_season
+    fx = fixtures[2]
+    refresh_fixture_results([f.id for f in fixtures])
+
+    res = FixtureResult.objects.get(fixture=fx)
+    assert (res.home_points, res.away_points, res.outcome) == (3, 1, "W")
+    assert res.result_text == "Win (3-1)"
+    version = res.version
+
+    # Flipping S1 to a loss inside a deferred block refreshes the row once, on exit
+    with deferred_fixture_refresh():
+        s1 = SlotScore.objects.get(fixture=fx, slot_code="S1")
+        s1.result = SlotScore.Result.LOSS
+        s1.save()
+        assert FixtureResult.objects.get(fixture=fx).version == version
+
+    res.refresh_from_db()
+    assert (res.home_points, res.away_points, res.outcome) == (1, 3, "L")
+    assert res.version == version + 1
+
+    # A no-op refresh does not bump the version
+    refresh_fixture_results([fx.id])
+    res.refresh_from_db()
+    assert res.version == version + 1
+
+
+@pytest.mark.django_db
+def test_marking_a_player_substitute_rescores_their_fixtures(scored_season, django_capture_on_commit_callbacks):
+    season, fixtures = scored_season
+    fx = fixtures[2]
+    refresh_fixture_results([f.id for f in fixtures])
+    assert FixtureResult.objects.get(fixture=fx).home_points == 3
+
+    # Al plays S1 (win) and D1 (tie) in week 3: as a Sub that is 0 + half a point
+    al = Player.objects.get(first_name="Al")
+    al.is_substitute = True
+    with django_capture_on_commit_callbacks(execute=True):
+        al.save()
+    res = FixtureResult.objects.get(fixture=fx)
+    assert (res.home_points, res.away_points, res.outcome) == (0.5, 1, "L")
+    assert (res.home_points, res.away_points) == compute_fixture_match_points(fx)
+
+
+@pytest.mark.django_db
+def test_player_points_diff_only_touches_changed_rows(scored_season, django_assert_num_queries):
+    from decimal import Decimal
+    from league.models import PlayerMatchPoints
+    from league.services.scoring import recompute_fixtures_player_points
+
+    season, fixtures = scored_season
+    assert recompute_fixtures_player_points(fixtures) == (5, 0, 0)
+    fx = fixtures[2]
+    # Week 3: Al singles win (2) + doubles tie (0.5) → 2.5; Bea doubles tie → 0.5
+    points = dict(PlayerMatchPoints.objects.filter(fixture=fx).values_list("player__first_name", "points"))
+    assert points == {"Al": Decimal("2.5"), "Bea": Decimal("0.5")}
+    ids_before = set(PlayerMatchPoints.objects.values_list("pk", flat=True))
+
+    # Nothing changed: no writes, rows keep their ids
+    assert recompute_fixtures_player_points(fixtures) == (0, 0, 0)
+    assert set(PlayerMatchPoints.objects.values_list("pk", flat=True)) == ids_before
+
+    # D1 becomes a loss: Al is updated, Bea's row is removed
+    SlotScore.objects.filter(fixture=fx, slot_code="D1").update(result=SlotScore.Result.LOSS)
+    assert recompute_fixtures_player_points([fx]) == (0, 1, 1)
+    assert PlayerMatchPoints.objects.get(fixture=fx, player__first_name="Al").points == Decimal("2")
+
+    # Bulk variant stays at a constant query count
+    # (ids, scores, slots, locked existing rows + savepoint/release)
+    with django_assert_num_queries(6):
+        recompute_fixtures_player_points(season.fixtures.all())
+
+
+@pytest.mark.django_db
+def test_rescore_league_dry_run_then_apply(scored_season):
+    from decimal import Decimal
+    from io import StringIO
+    from django.core.management import call_command
+    from league.models import PlayerMatchPoints, SubResult
+    from league.services.scoring import recompute_fixtures_player_points
+
+    season, fixtures = scored_season
+    recompute_fixtures_player_points(fixtures)
+    fx = fixtures[2]
+    al = Player.objects.get(first_name="Al")
+    sr = SubResult.objects.create(
+        fixture=fx, player=al, timeslot="1000", kind=SubResult.Kind.SINGLES, slot_code="S2",
+        target_type="OTHER_TEAM", target_team_name="Other", result=SubResult.Result.WIN,
+    )
+    # Simulate stale history from an older scoring rule
+    PlayerMatchPoints.objects.filter(fixture=fx, player=al).update(points=Decimal("9"))
+    SubResult.objects.filter(pk=sr.pk).update(points_cached=Decimal("0"))
+
+    out = StringIO()
+    call_command("rescore_league", "--dry-run", "--season-id", str(season.pk), stdout=out)
+    assert "Al Alpha: match points 9 → 2.5" in out.getvalue()
+    assert f"sub result #{sr.pk} 0 → 2" in out.getvalue()
+    assert PlayerMatchPoints.objects.get(fixture=fx, player=al).points == Decimal("9")
+
+    call_command("rescore_league", "--chunk-size", "2", stdout=StringIO())
+    assert PlayerMatchPoints.objects.get(fixture=fx, player=al).points == Decimal("2.5")
+    sr.refresh_from_db()
+    assert sr.points_cached == Decimal("2")
+
+
+@pytest.mark.django_db
+def test_player_season_stats_follow_score_and_lineup_writes(scored_season, django_capture_on_commit_callbacks):
+    from decimal import Decimal
+    from league.models import PlayerSeasonStats
+    from league.services.scoring import recompute_fixtures_player_points
+    from league.services.stats import rebuild_season_stats
+
+    season, fixtures = scored_season
+    recompute_fixtures_player_points(fixtures)
+    rebuild_season_stats(season)
+    al = Player.objects.get(first_name="Al")
+    bea = Player.objects.get(first_name="Bea")
+
+    st = PlayerSeasonStats.objects.get(season=season, player=al)
+    # S1 in weeks 2-3 (wins), D1 in all three weeks (ties)
+    assert (st.wins, st.losses, st.ties) == (2, 0, 3)
+    assert (st.s1, st.d1, st.total_matches) == (2, 3, 5)
+    assert st.points == Decimal("5.5")  # 0.5 + 2.5 + 2.5
+
+    # Replace Bea in week 3's D1 outside a deferred block: refreshed on commit
+    slot = LineupSlot.objects.get(lineup__fixture=fixtures[2], slot="D1")
+    with django_capture_on_commit_callbacks(execute=True):
+        slot.player2 = None
+        slot.save()
+    st_bea = PlayerSeasonStats.objects.get(season=season, player=bea)
+    assert (st_bea.d1, st_bea.ties) == (1, 1)
+
+    # The incremental path agrees with a full rebuild
+    assert rebuild_season_stats(season, dry_run=True) == []
+
+
+@pytest.mark.django_db
+def test_player_record_reads_the_ledger_row(scored_season, django_assert_num_queries):
+    from league.services.stats import player_record, rebuild_season_stats
+
+    season, _ = scored_season
+    rebuild_season_stats(season)
+    al = Player.objects.get(first_name="Al")
+    with django_assert_num_queries(1):
+        record = player_record(al, season)
+    assert record == {"wins": 2, "losses": 0, "ties": 3}
+    assert player_record(Player.objects.get(first_name="Bea"), None) == {"wins": 0, "losses": 0, "ties": 0}
+
+
+@pytest.mark.django_db
+def test_dashboard_record_season_ignores_unplayed_fixtures(client, django_user_model, settings):
+    from league.models import PlayerSeasonStats
+
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    user = django_user_model.objects.create_user("al", password="x")
+    al = Player.objects.create(first_name="Al", last_name="Alpha", user=user)
+    now = timezone.now()
+    for name, played_days_ago, wins in (("Spring", 60, 1), ("Summer", 10, 4)):
+        season = Season.objects.create(name=name, year=now.year)
+        played = Fixture.objects.create(season=season, opponent="Past", date=now - timedelta(days=played_days_ago),
+                                        week_number=1)
+        FixtureResult.objects.create(fixture=played, season=season, scored=True)
+        PlayerSeasonStats.objects.create(season=season, player=al, wins=wins)
+    # Spring has a future fixture, with no result yet, that is later than anything played in Summer
+    spring = Season.objects.get(name="Spring")
+    Fixture.objects.create(season=spring, opponent="Rain date", date=now + timedelta(days=30), week_number=9)
+
+    client.force_login(user)
+    resp = client.get("/", secure=True)
+    assert resp.status_code == 200
+    assert (resp.context["record_wins"], resp.context["record_losses"]) == (4, 0)
@@ -0,0 +1,37 @@
+# tests/test_standings.py
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from league.models import Season, LeagueStanding, StandingsSnapshot
+from league.services.standings import published_rows
+
+
+@pytest.mark.django_db
+def test_standings_get_is_read_only_and_publish_creates_versions(admin_client, django_assert_max_num_queries, settings):
+    settings.STORAGES = {**settings.STORAGES, "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+    season = Season.objects.create(name="Spring", year=timezone.now().year, is_active=True)
+    url = reverse("admin_league_standings")
+
+    assert admin_client.get(url, secure=True).status_code == 200
+    assert not LeagueStanding.objects.exists()
+
+    post = {"action": "publish", "standings-0-team_name": "Sharks", "standings-0-points": "12.5"}
+    admin_client.post(url, post, secure=True)
+    admin_client.post(url, dict(post, **{"standings-0-points": "14"}), secure=True)
+
+    snapshots = list(StandingsSnapshot.objects.filter(season=season).order_by("version"))
+    assert [s.version for s in snapshots] == [1, 2]
+    with pytest.raises(ValueError):
+        snapshots[0].save()
+
+    with django_assert_max_num_queries(1):
+        rows = [(r.team_name, r.points, r.is_royals) for r in published_rows(season)]
+    assert rows == [("Sharks", Decimal("14.00"), False), ("Royals", Decimal("0.00"), True)]
+
+    # Saving a draft does not change what players see
+    admin_client.post(url, dict(post, action="save", **{"standings-0-points": "20"}), secure=True)
+    assert StandingsSnapshot.objects.filter(season=season).count() == 2
+    assert published_rows(season)[0].points == Decimal("14.00")
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
 urlpatterns = [
@@ -44,7 +44,11 @@ urlpatterns = [
     path("api/sms/consent/", views.sms_consent, name="sms_consent"),
     path("my-team/", views.my_team_view, name="my_team"),
     path("admin-panel/playoff-eligibility/", views.admin_playoff_eligibility, name="admin_playoff_eligibility"),
+    path("admin-panel/playoff-eligibility/export.<str:fmt>", views.playoff_eligibility_export, name="playoff_eligibility_export"),
     path("admin-panel/standings/", views.admin_league_standings, name="admin_league_standings"),
     path("admin-panel/schedule/export-csv/", views.admin_schedule_export_csv, name="admin_schedule_export_csv"),
     path("webhooks/twilio/sms-status/", views.twilio_sms_status, name="twilio_sms_status"),
+    path("webhooks/brevo/sms-status/", views.brevo_sms_status, name="brevo_sms_status"),
+    # Anymail tracking webhooks (Brevo email delivery events): webhooks/anymail/brevo/tracking/
+    path("webhooks/anymail/", include("anymail.urls")),
 ]
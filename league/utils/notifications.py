@@ -14,6 +14,7 @@ SUPPORTED_EVENTS = {
     LINEUP_PUBLISHED_FOR_PLAYER,
 }
 
+from ..cache import invalidate_bell
 from ..models import Notification, NotificationReceipt
 
 def notify(event, *, season=None, fixture=None, players=None, users=None, title="", body="", url=""):
@@ -47,4 +48,5 @@ def notify(event, *, season=None, fixture=None, players=None, users=None, title=
         return n
     receipts = [NotificationReceipt(notification=n, user=u) for u in audience_users]
     NotificationReceipt.objects.bulk_create(receipts)
+    invalidate_bell(*(u.pk for u in audience_users))
     return n
\ No newline at end of file
@@ -3,11 +3,11 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponse
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponse, HttpResponseForbidden
 import json
 import csv
 from datetime import datetime, date, time
-from django.db.models import Sum, Q
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Sum, Value, When
 from django.core.paginator import Paginator
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
@@ -19,11 +19,10 @@ from django.contrib.auth.views import PasswordResetConfirmView, PasswordResetVie
 from django.conf import settings
 from django_ratelimit.decorators import ratelimit as _ratelimit
 from django.utils.decorators import method_decorator
+from django.utils.crypto import constant_time_compare
 import logging
-import requests
-from collections import defaultdict, Counter
 from decimal import Decimal
-from decimal import ROUND_HALF_UP, InvalidOperation
+from decimal import InvalidOperation
 from django.forms import modelformset_factory
 from .forms import LeagueStandingForm
 from league.notifications import notify
@@ -31,7 +30,6 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.db import transaction
 from django.contrib import messages
 from .models import LeagueStanding, Season, DeliveryAttempt
-from .forms import LeagueStandingFormSet
 import uuid
 import logging
 from league.notifications import send_event
@@ -73,7 +71,7 @@ def _normalize_phone(phone: str) -> str:
 def get_active_season_or_none():
     """Return the single active Season or None."""
     try:
-        return Season.objects.filter(is_active=True).first()
+        return active_season()
     except Exception:
         return None
 
@@ -82,17 +80,10 @@ def get_team_match_points_for_season(season):
     """Sum adjusted home match points across all scored fixtures in a season."""
     if not season:
         return 0
-    total = 0
     try:
-        for fx in Fixture.objects.filter(season=season):
-            h, _ = compute_fixture_match_points(fx)
-            try:
-                total += h
-            except Exception:
-                total = float(total) + float(h)
+        return season_home_total(season)
     except Exception:
-        pass
-    return total
+        return 0
 
 
 def get_team_sub_points_for_season(season):
@@ -106,7 +97,16 @@ def get_team_sub_points_for_season(season):
         return 0
 
 
-from .models import Player, Season, RosterEntry, Fixture, Availability, Lineup, LineupSlot, SlotScore, PlayerMatchPoints, SubPlan, SubResult, SubAvailability, NotificationReceipt
+from .models import Player, Season, RosterEntry, Fixture, FixtureResult, PlayerSeasonStats, StandingsSnapshot, Availability, Lineup, LineupSlot, SlotScore, PlayerMatchPoints, SubPlan, SubResult, SubAvailability, NotificationReceipt
+from .cache import bump_season_version_on_commit, cached_season_fixtures, cached_season_results, invalidate_bell
+from .delivery_status import record_brevo_sms, record_twilio
+from .providers import ProviderUnavailable, brevo_send_sms, sms_provider, twilio_send_sms
+from .seasons import active_season, season_registry
+from .conditional import conditional_page, fixture_sources, results_sources, schedule_sources
+from .services.standings import draft_rows as standings_draft_rows, parse_rows as parse_standings_rows, publish_standings, published_rows, save_draft as save_standings_draft
+from .services.stats import player_record
+from .services.eligibility import eligibility_rows, export_row as eligibility_export_row, EXPORT_COLUMNS as ELIGIBILITY_EXPORT_COLUMNS
+from .services.scoring import compute_fixtures_match_points, season_home_total, deferred_fixture_refresh, recompute_fixtures_player_points
 from .forms import AvailabilityForm, LineupForm, LineupSlotFormSet, PlayerForm, FixtureForm, SubPlanForm, SubResultForm, NotificationPreferenceForm, UsernameForm, StyledPasswordChangeForm, InvitePlayerForm, ShareContactPrefsForm
 
 # Notifications helper + constants (authoritative from utils.notifications)
@@ -122,78 +122,6 @@ from .utils.notifications import (
 # league/views.py
 
 
-def compute_royals_points(season: "Season") -> "Decimal":
-    # Reuse existing aggregators for team match + sub points
-    team_match_pts = Decimal(get_team_match_points_for_season(season))
-    team_sub_pts = Decimal(get_team_sub_points_for_season(season))
-    return team_match_pts + team_sub_pts
-
-@staff_member_required
-def admin_league_standings(request):
-    season = get_active_season_or_none()  # reuse your existing helper; else fetch from request if needed
-    if not season:
-        messages.warning(request, "No active season selected.")
-        return redirect("admin_dashboard")
-
-    # Ensure we have a Royals row
-    royals, _ = LeagueStanding.objects.get_or_create(
-        season=season, team_name="Royals", defaults={"is_royals": True}
-    )
-
-    if request.method == "POST":
-        action = request.POST.get("action")
-        # Always recompute Royals
-        royals.points = compute_royals_points(season)
-        royals.updated_by = request.user
-        royals.save()
-
-        # Other teams editable
-        qs = LeagueStanding.objects.filter(season=season, is_royals=False)
-        formset = LeagueStandingFormSet(request.POST, queryset=qs)
-
-        if formset.is_valid():
-            with transaction.atomic():
-                instances = formset.save(commit=False)
-                existing_ids = set()
-                for inst in instances:
-                    inst.season = season
-                    inst.updated_by = request.user
-                    inst.save()
-                    existing_ids.add(inst.id)
-
-                # Create any missing rows for blank slots (optional: not needed if you only use existing)
-                # No deletes (can_delete=False)
-
-                if action == "publish":
-                    # Publish the season set: mark all rows (including Royals) as published
-                    LeagueStanding.objects.filter(season=season).update(published=True)
-                    messages.success(request, "Standings published.")
-                elif action == "save":
-                    # Keep as draft
-                    LeagueStanding.objects.filter(season=season).update(published=False)
-                    messages.success(request, "Standings saved as draft.")
-        else:
-            messages.error(request, "Please correct the errors below.")
-    else:
-        # GET: recompute & show
-        royals.points = compute_royals_points(season)
-        royals.updated_by = request.user
-        royals.save()
-
-        qs = LeagueStanding.objects.filter(season=season, is_royals=False)
-        formset = LeagueStandingFormSet(queryset=qs)
-
-    # Provide data for the widget
-    rows = list(LeagueStanding.objects.filter(season=season).order_by("-points", "team_name"))
-    context = {
-        "season": season,
-        "royals": royals,
-        "formset": formset,
-        "standings_rows": rows,
-        "standings_published": any(r.published for r in rows),
-    }
-    return render(request, "league/admin_panel/standings_widget.html", context)
-
 # define rate limit request response type and message
 def ratelimit_429(request, exception):
     # You can return HTML instead if you prefer
@@ -268,8 +196,9 @@ def admin_manage_players(request):
     )
 
 
-def _send_invite_email(player, request):
-    """Send the branded invite email to a Player using HTML + text templates and custom subject."""
+def _send_invite_email(player, request, connection=None):
+    """Send the branded invite email to a Player using HTML + text templates and custom subject.
+    Pass an open mail `connection` (django.core.mail.get_connection) to send many invites over one session."""
 
     # Build absolute accept URL
     accept_path = reverse("accept_invite", args=[str(player.invite_token)])
@@ -297,7 +226,7 @@ def _send_invite_email(player, request):
     if not to:
         return  # no valid email
 
-    msg = EmailMultiAlternatives(subject=subject, body=text_body, from_email=from_email, to=to)
+    msg = EmailMultiAlternatives(subject=subject, body=text_body, from_email=from_email, to=to, connection=connection)
     msg.attach_alternative(html_body, "text/html")
     try:
         msg.send(fail_silently=True)
@@ -537,56 +466,10 @@ def compute_fixture_match_points(fixture):
       • Singles: if the home slot uses a Sub, the home team receives 0 for that slot regardless of result.
       • Doubles: if exactly one home player is a Sub, the home team receives half of the slot's home share (Win=1, Tie=0.5). If both are Subs, the home team receives 0.
       • The away team always receives the full away share implied by the slot result.
-    """
-    def _base_points(result):
-        # Returns (home_base, away_base) from a SlotScore.Result
-        if result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF):
-            return 2.0, 0.0
-        if result in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF):
-            return 0.0, 2.0
-        if result == SlotScore.Result.TIE:
-            return 1.0, 1.0
-        return 0.0, 0.0
-
-    def _home_share_with_sub(slot_code, p1, p2, base_home):
-        if base_home <= 0:
-            return 0.0
-        is_doubles = str(slot_code).startswith("D")
-        sub1 = bool(getattr(p1, "is_substitute", False))
-        sub2 = bool(getattr(p2, "is_substitute", False)) if is_doubles else False
-        if not is_doubles:
-            # Singles: any Sub means home gets 0 from this slot
-            return 0.0 if sub1 else base_home
-        # Doubles:
-        if sub1 and sub2:
-            return 0.0
-        if sub1 or sub2:
-            return base_home / 2.0
-        return base_home
 
-    lineup = getattr(fixture, "lineup", None)
-    home_total = 0.0
-    away_total = 0.0
-
-    # Iterate through scored slots
-    for sc in SlotScore.objects.filter(fixture=fixture):
-        base_home, base_away = _base_points(sc.result)
-        p1 = p2 = None
-        if lineup:
-            try:
-                ls = lineup.slots.get(slot=sc.slot_code)
-                p1, p2 = ls.player1, ls.player2
-            except LineupSlot.DoesNotExist:
-                p1 = p2 = None
-        adj_home = _home_share_with_sub(sc.slot_code, p1, p2, base_home)
-        home_total += adj_home
-        away_total += base_away
-
-    # Normalize to int when clean (e.g., 12.0) else keep .5 etc.
-    def _norm(x):
-        return int(x) if float(x).is_integer() else x
-
-    return _norm(home_total), _norm(away_total)
+    For many fixtures at once use league.services.scoring.compute_season_match_points().
+    """
+    return compute_fixtures_match_points([fixture]).get(fixture.pk, (0, 0))
 
 
 
@@ -596,42 +479,11 @@ def recompute_fixture_player_points(fixture):
     Rules:
       • Singles: Win=2 to the player, Tie=1, Loss=0. If the player is a Sub, award 0.
       • Doubles: split between two players (Win=1 each, Tie=0.5 each, Loss=0). Subs get 0.
-    """
-    PlayerMatchPoints.objects.filter(fixture=fixture).delete()
 
-    lineup = getattr(fixture, "lineup", None)
-    if not lineup:
-        return
-
-    scores = {s.slot_code: s for s in SlotScore.objects.filter(fixture=fixture)}
-
-    def credit(player, pts):
-        if not player or getattr(player, "is_substitute", False):
-            return
-        # Only persist non-zero points (optional: create zeros for auditing by removing this guard)
-        if pts and pts != 0:
-            PlayerMatchPoints.objects.create(fixture=fixture, player=player, points=pts)
-
-    for ls in lineup.slots.all():
-        sc = scores.get(ls.slot)
-        if not sc:
-            continue
-        # Determine per-player allocation from the result
-        if sc.result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF):
-            if ls.slot.startswith("D"):
-                credit(ls.player1, 1)
-                credit(ls.player2, 1)
-            else:
-                credit(ls.player1, 2)
-        elif sc.result == SlotScore.Result.TIE:
-            if ls.slot.startswith("D"):
-                credit(ls.player1, 0.5)
-                credit(ls.player2, 0.5)
-            else:
-                credit(ls.player1, 1)
-        else:
-            # Loss or loss by forfeit → 0 each
-            pass
+    Only changed rows are written (see league.services.scoring.recompute_fixtures_player_points,
+    which also handles many fixtures in one pass).
+    """
+    return recompute_fixtures_player_points([fixture])
 
 # --- Notifications: lineup published ---
 def _notify_lineup_published(fixture):
@@ -717,7 +569,7 @@ def _notify_lineup_published(fixture):
         title = f"Lineup posted — vs {getattr(fixture, 'opponent', '') or 'Opponent'}"
         body  = f"Match on {when_text}."
 
-        # Use unified inline-sending helper
+        # Use unified helper (attempts go out from the delivery worker)
         notif, attempts = send_event("LINEUP_PUBLISHED_FOR_PLAYER", players=players, season=fixture.season,
                                      fixture=fixture, title=title, body=body, url=detail_url, context=base_ctx,
                                      per_user_ctx=per_user_ctx, user_player_map=user_player_map)
@@ -747,7 +599,8 @@ def is_staff_user(user):
 @user_passes_test(is_staff_user)
 def admin_manage_schedule(request):
     from .models import Season, Fixture
-    seasons = Season.objects.all().order_by("-start_date") if hasattr(Season, "start_date") else Season.objects.all()
+    registry = season_registry(request)
+    seasons = registry.seasons
 
     # Accept both 'season' and 'season_id' from GET/POST to be resilient to template naming
     selected_id = (
@@ -756,7 +609,7 @@ def admin_manage_schedule(request):
         or request.POST.get("season")
         or request.POST.get("season_id")
     )
-    selected = seasons.filter(pk=selected_id).first() if selected_id else seasons.first()
+    selected = registry.get(selected_id) if selected_id else registry.active_or_newest
 
     # Defaults for context
     add_form = FixtureForm(season=selected)
@@ -909,6 +762,7 @@ def admin_manage_schedule(request):
 
                             if not bulk_errors and to_create:
                                 Fixture.objects.bulk_create(to_create)
+                                bump_season_version_on_commit(selected.pk)  # bulk_create skips the post_save bump
                                 messages.success(request, f"Uploaded {len(to_create)} matches.")
                                 return redirect(f"{reverse('admin_manage_schedule')}?season={selected.pk}")
                 except UnicodeDecodeError:
@@ -926,7 +780,7 @@ def admin_manage_schedule(request):
                 "edit_form": edit_form,
                 "edit_fixture_id": edit_fixture_id,
                 "bulk_errors": bulk_errors,
-                "current_active": Season.objects.filter(is_active=True).first(),
+                "current_active": registry.active,
             })
 
         elif action == "delete":
@@ -954,7 +808,7 @@ def admin_manage_schedule(request):
 
     fixtures = Fixture.objects.filter(season=selected).order_by("week_number") if selected else []
 
-    current_active = Season.objects.filter(is_active=True).first()
+    current_active = registry.active
 
     return render(request, "league/admin_panel/manage_schedule.html", {
         "seasons": seasons,
@@ -983,8 +837,7 @@ def admin_schedule_export_csv(request):
         if sid:
             season = Season.objects.get(pk=sid)
         else:
-            season = (Season.objects.filter(is_active=True).first()
-                      or Season.objects.order_by("-year" if hasattr(Season, "year") else "-id").first())
+            season = season_registry(request).active_or_newest
     except Season.DoesNotExist:
         season = None
 
@@ -1039,14 +892,15 @@ def admin_schedule_export_csv(request):
 @login_required
 @user_passes_test(is_staff_user)
 def admin_manage_roster(request):
-    seasons = Season.objects.all().order_by("-start_date") if hasattr(Season, "start_date") else Season.objects.all()
+    registry = season_registry(request)
+    seasons = registry.seasons
     selected_id = (
         request.GET.get("season")
         or request.GET.get("season_id")
         or request.POST.get("season")
         or request.POST.get("season_id")
     )
-    selected = seasons.filter(pk=selected_id).first() if selected_id else seasons.first()
+    selected = registry.get(selected_id) if selected_id else registry.active_or_newest
 
     # Ensure a default roster limit
     if selected and not getattr(selected, "roster_limit", None):
@@ -1164,6 +1018,7 @@ def admin_manage_roster(request):
                                 ) for e in chosen
                             ]
                             RosterEntry.objects.bulk_create(objs, ignore_conflicts=True)
+                            bump_season_version_on_commit(selected.pk)  # bulk_create skips the post_save bump
                             added = len(objs)
                             skipped_dup = len(to_copy) - len(chosen)
                             if skipped_dup > 0:
@@ -1216,37 +1071,26 @@ def admin_manage_roster(request):
 @user_passes_test(is_staff_user)
 def admin_manage_scores(request):
     # Seasons list for admin: all seasons, newest first
-    seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
+    registry = season_registry(request)
+    seasons = registry.seasons
 
     sel_id = request.GET.get("season")
-    selected = seasons.filter(pk=sel_id).first() if sel_id else None
-    if not selected and hasattr(Season, "is_active"):
-        selected = seasons.filter(is_active=True).first()
-    if not selected:
-        selected = seasons.first()
+    selected = (registry.get(sel_id) if sel_id else None) or registry.active_or_newest
 
-    fixtures = Fixture.objects.filter(season=selected).order_by("week_number") if selected else []
+    # Fixtures and their denormalized results come from the season cache
+    fixtures = cached_season_fixtures(selected)
+    results = cached_season_results(selected)
 
     # Annotate fixtures with scoring state and sub points
     now = timezone.now()
-    fixtures = list(fixtures)  # materialize for reuse
-
-    # Precompute sub points per fixture in one query
-    sub_totals = (
-        SubResult.objects
-        .filter(fixture__in=fixtures)
-        .values('fixture_id')
-        .annotate(total=Sum('points_cached'))
-    )
-    sub_map = {row['fixture_id']: (row['total'] or 0) for row in sub_totals}
 
     for f in fixtures:
         f.can_score = (not getattr(f, "is_bye", False)) and (f.date <= now)
+        res = results.get(f.id)
         # Calculate match score display like "12-0" if any SlotScores exist
-        h, a = compute_fixture_match_points(f)
-        f.match_score_display = f"{h}-{a}" if SlotScore.objects.filter(fixture=f).exists() else ""
+        f.match_score_display = res.score_display if res else ""
         # Attach sub points for this week (do not affect match total)
-        f.sub_points = sub_map.get(f.id, 0)
+        f.sub_points = FixtureResult._num(res.sub_points) if res else 0
 
     return render(request, "league/admin_panel/manage_scores.html", {
         "seasons": seasons,
@@ -1324,11 +1168,12 @@ def admin_enter_scores(request, fixture_id):
             for e in errors:
                 messages.error(request, e)
         else:
-            # Save all slot scores
-            for obj in to_save:
-                obj.save()
-            # Recompute per-player points
-            recompute_fixture_player_points(fixture)
+            # Save all slot scores and recompute per-player points in one transaction;
+            # the fixture's FixtureResult row is refreshed once when the block exits.
+            with deferred_fixture_refresh():
+                for obj in to_save:
+                    obj.save()
+                recompute_fixture_player_points(fixture)
 
             # Notify lineup participants and sub-result players
             # (consolidated notify ensures DeliveryAttempts + rich in-app content)
@@ -1529,9 +1374,12 @@ def dashboard(request):
     now = timezone.now()
 
     # Prefer the active season if the player is rostered on it; otherwise fall back
-    active_season = Season.objects.filter(is_active=True).first()
+    active_season = season_registry(request).active
+    on_active_roster = bool(
+        player and active_season and RosterEntry.objects.filter(season=active_season, player=player).exists()
+    )
     season_for_cards = None
-    if player and active_season and RosterEntry.objects.filter(season=active_season, player=player).exists():
+    if on_active_roster:
         season_for_cards = active_season
     elif player:
         # Fall back to the most recent season this player is rostered on
@@ -1567,8 +1415,9 @@ def dashboard(request):
     previous_result_text = ""
     previous_result_class = ""
     previous_sub_points = None
-    if previous and SlotScore.objects.filter(fixture=previous).exists():
-        h, a = compute_fixture_match_points(previous)
+    previous_res = FixtureResult.objects.filter(fixture=previous).first() if previous else None
+    if previous_res and previous_res.scored:
+        h, a = previous_res.home_points, previous_res.away_points
         if h > a:
             previous_result_text = f"Win ({h}-{a})"
             previous_result_class = "text-success fw-bold"
@@ -1580,8 +1429,7 @@ def dashboard(request):
             previous_result_class = "text-warning"  # per request, show tie in orange
     # Compute previous_sub_points for the previous fixture
     if previous:
-        agg = SubResult.objects.filter(fixture=previous).aggregate(total=Sum('points_cached'))
-        previous_sub_points = agg['total'] or 0
+        previous_sub_points = previous_res.sub_points if previous_res else 0
         try:
             previous_sub_points = int(previous_sub_points) if float(previous_sub_points).is_integer() else previous_sub_points
         except Exception:
@@ -1606,31 +1454,20 @@ def dashboard(request):
     my_points_total = 0  # display value
     team_points_total = 0  # display value
 
-    if player and active_season and RosterEntry.objects.filter(season=active_season, player=player).exists():
+    if on_active_roster:
         show_points_tiles = True
 
-        # Player lineup points (Decimal)
-        pmp_agg = PlayerMatchPoints.objects.filter(
-            fixture__season=active_season, player=player
-        ).aggregate(total=Sum("points"))
-        my_points_dec = _D(pmp_agg["total"] or 0)
-
-        # Add sub points earned by this player in this season (Decimal)
-        sub_me_agg = SubResult.objects.filter(
-            fixture__season=active_season, player=player
-        ).aggregate(total=Sum("points_cached"))
-        my_points_dec += _D(sub_me_agg["total"] or 0)
-
-        # Team match points from fixture results (sum home totals as Decimal)
-        team_match_dec = Decimal("0")
-        fixtures_as_list = list(Fixture.objects.filter(season=active_season))
-        for fx in fixtures_as_list:
-            h, _a = compute_fixture_match_points(fx)  # h can be int/float
-            team_match_dec += _D(h)
-
-        # Team sub points (Decimal)
-        sub_agg = SubResult.objects.filter(fixture__season=active_season).aggregate(total=Sum("points_cached"))
-        team_sub_dec = _D(sub_agg["total"] or 0)
+        # Player lineup + sub points from the season stats ledger (Decimal)
+        my_stats = PlayerSeasonStats.objects.filter(season=active_season, player=player).first()
+        my_points_dec = _D(my_stats.points) if my_stats else Decimal("0")
+
+        # Team match + sub points from the denormalized fixture results (one query)
+        team_agg = FixtureResult.objects.filter(season=active_season).aggregate(
+            match=Sum("home_total", filter=Q(scored=True)),
+            subs=Sum("sub_points"),
+        )
+        team_match_dec = _D(team_agg["match"] or 0)
+        team_sub_dec = _D(team_agg["subs"] or 0)
 
         # Final display-friendly numbers
         my_points_total = _norm_display(my_points_dec)
@@ -1639,89 +1476,29 @@ def dashboard(request):
     # --- My Record doughnut counts ---
     record_wins = record_losses = record_ties = 0
     if player:
-        season_for_record = None
-
-        # Helper: does this season have any recorded results for this player?
-        def season_has_results(season):
-            if not season:
-                return False
-            has_lineup_scores = SlotScore.objects.filter(
-                fixture__season=season,
-                fixture__lineup__slots__in=LineupSlot.objects.filter(
-                    lineup__fixture__season=season
-                ).filter(Q(player1=player) | Q(player2=player))
-            ).exists()
-            has_sub_results = SubResult.objects.filter(
-                fixture__season=season, player=player
-            ).exists()
-            return has_lineup_scores or has_sub_results
-
-        # Prefer active season if rostered AND it has results
-        if active_season and RosterEntry.objects.filter(season=active_season, player=player).exists() and season_has_results(active_season):
-            season_for_record = active_season
-        else:
-            # Fall back: pick the most recent season (by fixture date) where the player has results
-            from django.db.models import Max
-            latest_lineup = (
-                SlotScore.objects
-                .filter(
-                    fixture__lineup__slots__in=LineupSlot.objects.filter(Q(player1=player) | Q(player2=player))
-                )
-                .aggregate(latest=Max('fixture__date'))['latest']
-            )
-            latest_sub = (
-                SubResult.objects
-                .filter(player=player)
-                .aggregate(latest=Max('fixture__date'))['latest']
+        # Season with results for this player: the active season when rostered on it,
+        # otherwise the one with the latest played fixture (scored, or with this player's
+        # sub result). Single query over the stats ledger.
+        has_results = Q(player_stats__wins__gt=0) | Q(player_stats__losses__gt=0) | Q(player_stats__ties__gt=0)
+        played = Q(fixtures__result__scored=True) | Q(fixtures__sub_results__player=player)
+        season_for_record = (
+            Season.objects
+            .filter(has_results, player_stats__player=player)
+            .annotate(
+                preferred=Case(
+                    When(pk=active_season.pk if on_active_roster else None, then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                last_played=Max("fixtures__date", filter=played),
             )
-
-            # Decide which timestamp is newer
-            chosen_dt = None
-            if latest_lineup and latest_sub:
-                chosen_dt = latest_lineup if latest_lineup >= latest_sub else latest_sub
-            else:
-                chosen_dt = latest_lineup or latest_sub
-
-            if chosen_dt:
-                # Fetch that fixture and its season
-                fx = Fixture.objects.filter(date=chosen_dt).order_by('-id').first()
-                if fx:
-                    season_for_record = fx.season
+            .order_by("-preferred", F("last_played").desc(nulls_last=True), "-id")
+            .first()
+        )
 
         if season_for_record:
-            # Build a lookup of SlotScore by fixture_id -> slot_code
-            scores_by_fixture = {}
-            for s in SlotScore.objects.filter(fixture__season=season_for_record):
-                bucket = scores_by_fixture.setdefault(s.fixture_id, {})
-                bucket[s.slot_code] = s
-
-            # Count lineup results for this player in that season
-            player_slots_qs = (
-                LineupSlot.objects
-                .filter(lineup__fixture__season=season_for_record)
-                .filter(Q(player1=player) | Q(player2=player))
-                .select_related('lineup__fixture')
-            )
-            for ls in player_slots_qs:
-                sc = scores_by_fixture.get(ls.lineup.fixture_id, {}).get(ls.slot)
-                if not sc:
-                    continue
-                if sc.result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF, 'W', 'WF'):
-                    record_wins += 1
-                elif sc.result in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF, 'L', 'LF'):
-                    record_losses += 1
-                elif sc.result in (SlotScore.Result.TIE, 'T'):
-                    record_ties += 1
-
-            # Count sub results for this player in that season
-            sub_qs = SubResult.objects.filter(fixture__season=season_for_record, player=player)
-            for sr in sub_qs:
-                if sr.result in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF, 'W', 'WF'):
-                    record_wins += 1
-                elif sr.result in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF, 'L', 'LF'):
-                    record_losses += 1
-                elif sr.result in (SlotScore.Result.TIE, 'T'):
-                    record_ties += 1
+            record = player_record(player, season_for_record)
+            record_wins, record_losses, record_ties = record["wins"], record["losses"], record["ties"]
 
     # Add to context
     extra_record_ctx = {
@@ -1746,17 +1523,8 @@ def dashboard(request):
     except Exception:
         prefs = None
 
-    # --- League standings (published) ---
-    standings = []
-    if active_season:
-        try:
-            from .models import LeagueStanding
-            standings = LeagueStanding.objects.filter(
-                season=active_season,
-                published=True
-            ).order_by("-points", "team_name")
-        except Exception:
-            standings = []
+    # --- League standings (latest published snapshot) ---
+    standings = list(published_rows(active_season)) if active_season else []
 
     return render(request, "league/dashboard.html", {
         "player": player,
@@ -1776,40 +1544,34 @@ def dashboard(request):
     })
 
 @login_required
+@conditional_page(schedule_sources)
 def schedule_list(request):
     player = getattr(request.user, "player_profile", None)
 
     # Captains/staff can view all seasons; players see only seasons they're rostered on
-    if is_captain(request.user) or is_staff_user(request.user):
-        seasons_qs = Season.objects.all()
-    else:
-        seasons_qs = (
-            Season.objects.filter(roster_entries__player=player).distinct()
-            if player else Season.objects.none()
-        )
+    seasons = season_registry(request).seasons
+    if not (is_captain(request.user) or is_staff_user(request.user)):
+        rostered = set(RosterEntry.objects.filter(player=player).values_list("season_id", flat=True)) if player else set()
+        seasons = [s for s in seasons if s.pk in rostered]
 
     # Determine selected season: URL param > active season (if on roster) > most recent rostered season
     sel_id = request.GET.get("season")
     selected = None
     if sel_id:
-        selected = seasons_qs.filter(pk=sel_id).first()
+        selected = next((s for s in seasons if str(s.pk) == sel_id), None)
     if not selected and player:
-        selected = seasons_qs.filter(is_active=True).first()
-    if not selected:
+        selected = next((s for s in seasons if s.is_active), None)
+    if not selected and seasons:
         # Fall back to most recently created/defined
-        order_field = "-year" if hasattr(Season, "year") else "-id"
-        selected = seasons_qs.order_by(order_field).first()
+        selected = seasons[0]
 
-    if not selected:
-        fixtures = Fixture.objects.none()
     # Fixtures limited to selected season
-    else:
-        fixtures = Fixture.objects.filter(season=selected).order_by("date")
+    fixtures = sorted(cached_season_fixtures(selected), key=lambda f: f.date)
 
     # Build a map of availability for the current user
     avail_map = {}
     if player and selected:
-        qs = Availability.objects.filter(player=player, fixture__in=fixtures).values_list("fixture_id", "status")
+        qs = Availability.objects.filter(player=player, fixture__season=selected).values_list("fixture_id", "status")
         avail_map = {fid: status for fid, status in qs}
 
     # Attach user_status to each fixture (None if no response)
@@ -1818,28 +1580,15 @@ def schedule_list(request):
 
     # Attach result text like "Win (7-5)" / "Loss (5-7)" / "Tie (6-6)"
     if fixtures:
-        from django.db.models import Count
-        score_counts = dict(
-            SlotScore.objects.filter(fixture__in=fixtures)
-            .values_list("fixture_id")
-            .annotate(n=Count("id"))
-        )
+        results = cached_season_results(selected)
         for f in fixtures:
-            if score_counts.get(f.id):
-                h, a = compute_fixture_match_points(f)
-                if h > a:
-                    f.result_text = f"Win ({h}-{a})"
-                elif h < a:
-                    f.result_text = f"Loss ({h}-{a})"
-                else:
-                    f.result_text = f"Tie ({h}-{a})"
-            else:
-                f.result_text = ""
+            res = results.get(f.id)
+            f.result_text = res.result_text if res else ""
 
     # Attach per-timeslot sub availability for the current player (set of codes per fixture)
     if player and selected and fixtures:
         rows = SubAvailability.objects.filter(
-            player=player, fixture__in=fixtures
+            player=player, fixture__season=selected
         ).values_list("fixture_id", "timeslot")
 
         from collections import defaultdict
@@ -1852,13 +1601,14 @@ def schedule_list(request):
 
     return render(request, "league/schedule_list.html", {
         "fixtures": fixtures,
-        "seasons": seasons_qs.order_by("-year" if hasattr(Season, "year") else "-id"),
+        "seasons": seasons,
         "selected": selected,
     })
 
 
 # --- My Results View ---
 @login_required
+@conditional_page(results_sources)
 def my_results(request):
     player = getattr(request.user, "player_profile", None)
     if not player:
@@ -1884,7 +1634,7 @@ def my_results(request):
         selected = seasons_qs.filter(pk=sel_id).first()
 
     if not selected:
-        active = Season.objects.filter(is_active=True).first()
+        active = season_registry(request).active
         if active and RosterEntry.objects.filter(season=active, player=player).exists():
             selected = active
 
@@ -2006,16 +1756,8 @@ def my_results(request):
     # Aggregate total points for the selected season (player only + sub points)
     total_points = 0
     if selected:
-        agg = PlayerMatchPoints.objects.filter(
-            fixture__season=selected,
-            player=player
-        ).aggregate(total=Sum('points'))
-        total_points = agg['total'] or 0
-        sub_agg = SubResult.objects.filter(
-            fixture__season=selected,
-            player=player
-        ).aggregate(total=Sum('points_cached'))
-        total_points += sub_agg['total'] or 0
+        stats = PlayerSeasonStats.objects.filter(season=selected, player=player).first()
+        total_points = stats.points if stats else 0
 
     context = {
         "seasons": seasons_qs,
@@ -2027,6 +1769,7 @@ def my_results(request):
     return render(request, "league/my_results.html", context)
 
 @login_required
+@conditional_page(fixture_sources)
 def fixture_detail(request, pk):
     fixture = (
         Fixture.objects
@@ -2268,8 +2011,9 @@ def admin_lineup_builder(request, fixture_id):
                     # Save lineup meta and slots
                     lineup_obj = form.save(commit=False)
                     lineup_obj.published = True
-                    lineup_obj.save()
-                    formset.save()
+                    with deferred_fixture_refresh():
+                        lineup_obj.save()
+                        formset.save()
 
                     # Notify players in the lineup (single consolidated call)
                     # Notify players in the lineup (single consolidated call)
@@ -2293,8 +2037,9 @@ def admin_lineup_builder(request, fixture_id):
             else:
                 # Not publishing: just save lineup meta and slots
                 lineup_obj = form.save(commit=False)
-                lineup_obj.save()
-                formset.save()
+                with deferred_fixture_refresh():
+                    lineup_obj.save()
+                    formset.save()
                 messages.success(request, "Lineup saved.")
                 return redirect("admin_lineup_builder", fixture_id=fixture.id)
 
@@ -2326,14 +2071,11 @@ def admin_lineup_builder(request, fixture_id):
 @user_passes_test(is_captain)
 def captain_dashboard(request):
     # All seasons for captain; default to active, else most recent
-    seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
+    registry = season_registry(request)
+    seasons = registry.seasons
 
     sel_id = request.GET.get("season")
-    selected = seasons.filter(pk=sel_id).first() if sel_id else None
-    if not selected and hasattr(Season, "is_active"):
-        selected = seasons.filter(is_active=True).first()
-    if not selected:
-        selected = seasons.first()  # most recent by ordering above
+    selected = (registry.get(sel_id) if sel_id else None) or registry.active_or_newest
 
     if selected:
         fixtures = Fixture.objects.filter(season=selected).order_by("date")
@@ -2706,7 +2448,7 @@ def subplan_create(request, fixture_id):
                         getattr(getattr(plan, "player", None), "user_id", None),
                     )
 
-                    # Use the unified inline-sending helper (creates receipts + attempts + sends)
+                    # Use the unified helper (creates receipts + queues attempts for the delivery worker)
                     from league.notifications import send_event
 
                     notif, attempts = send_event("SUBPLAN_CREATED", players=[plan.player], season=fx.season, fixture=fx,
@@ -2934,7 +2676,7 @@ def subplan_toggle(request, plan_id):
                 }
                 user_player_map = {u.id: plan.player}
 
-                # Send inline (creates receipts + attempts + sends)
+                # Creates receipts + queues attempts for the delivery worker
                 notif, attempts = send_event("SUBPLAN_CREATED", players=[plan.player], season=fixture.season,
                                              fixture=fixture, title=title, body=body, url=detail_url, context={
                         "opponent": getattr(fixture, "opponent", ""),
@@ -3266,11 +3008,10 @@ def subresult_delete(request, sr_id):
 @login_required
 @user_passes_test(is_staff_user)
 def admin_dashboard(request):
-    # Seasons (newest first by year if present)
-    seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
-
-    # Active season (or fallback to newest)
-    active = seasons.filter(is_active=True).first() or seasons.first()
+    # Seasons (newest first) and the active season (or fallback to newest)
+    registry = season_registry(request)
+    seasons = registry.seasons
+    active = registry.active_or_newest
 
     # Allow switching active season from the dashboard
     action = request.POST.get("action") if request.method == "POST" else None
@@ -3362,11 +3103,17 @@ def admin_dashboard(request):
                 # --- Finally, delete fixtures (the schedule) ---
                 fixtures_qs.delete()
 
-                # Clear league standings for this season
+                # Clear league standings and the per-player stats ledger for this season
                 try:
                     LeagueStanding.objects.filter(season=season).delete()
+                    StandingsSnapshot.objects.filter(season=season).delete()
+                except Exception:
+                    pass
+                try:
+                    PlayerSeasonStats.objects.filter(season=season).delete()
                 except Exception:
                     pass
+                bump_season_version_on_commit(season.pk)
 
             messages.success(
                 request,
@@ -3409,126 +3156,46 @@ def admin_dashboard(request):
     team_sub_points = 0
     wins = losses = ties = 0
     if active:
-        season_fixtures = list(Fixture.objects.filter(season=active).order_by("week_number"))
-        sub_totals = (
-            SubResult.objects
-            .filter(fixture__in=season_fixtures)
-            .values("fixture_id")
-            .annotate(total=Sum("points_cached"))
+        # W/L/T counts and totals straight from the denormalized fixture results (one query)
+        summary = FixtureResult.objects.filter(season=active).aggregate(
+            wins=Count("id", filter=Q(scored=True, outcome=FixtureResult.Outcome.WIN)),
+            losses=Count("id", filter=Q(scored=True, outcome=FixtureResult.Outcome.LOSS)),
+            ties=Count("id", filter=Q(scored=True, outcome=FixtureResult.Outcome.TIE)),
+            match=Sum("home_total", filter=Q(scored=True)),
+            subs=Sum("sub_points"),
         )
-        sub_map = {row["fixture_id"]: (row["total"] or 0) for row in sub_totals}
-
-        for fx in season_fixtures:
-            h, a = compute_fixture_match_points(fx)
-            if SlotScore.objects.filter(fixture=fx).exists():
-                if h > a:
-                    wins += 1
-                elif h < a:
-                    losses += 1
-                else:
-                    ties += 1
-            team_match_points += h
-            team_sub_points += sub_map.get(fx.id, 0)
+        wins, losses, ties = summary["wins"], summary["losses"], summary["ties"]
+        team_match_points = FixtureResult._num(summary["match"] or 0)
+        team_sub_points = summary["subs"] or 0
 
     # --- League Standings widget (admin-only, embedded) ---
+    # Reads never write: the Royals row is previewed with a fresh total in memory.
     royals = None
     formset = None
     standings_rows = []
     standings_published = False
 
     try:
-        # Ensure the Royals row exists for the active season
         if active:
-            royals, _ = LeagueStanding.objects.get_or_create(
-                season=active,
-                team_name="Royals",
-                defaults={"is_royals": True}
-            )
-
-            # Compute Royals total from the summary above
-            try:
-                royals_total = Decimal(team_match_points) + Decimal(team_sub_points)
-            except Exception:
-                royals_total = Decimal(str(team_match_points)) + Decimal(str(team_sub_points))
-
-            # Non-Royals queryset
+            FormSetCls = modelformset_factory(LeagueStanding, form=LeagueStandingForm, extra=6, can_delete=False)
             qs = LeagueStanding.objects.filter(season=active, is_royals=False).order_by("team_name")
 
             if request.method == "POST" and action in {"save", "publish"}:
-                mgmt_key = "standings-TOTAL_FORMS"
-                has_mgmt = mgmt_key in request.POST
-                FormSetCls = modelformset_factory(LeagueStanding, form=LeagueStandingForm, extra=6, can_delete=False)
-
-                # Persist Royals auto points first
-                try:
-                    royals.points = royals_total
-                    royals.updated_by = request.user
-                    royals.save()
-                except Exception:
-                    pass
-
-                created_or_updated = 0
-                if has_mgmt:
-                    # Manually read posted rows (works even if formset binding is quirky)
-                    try:
-                        total_forms = int(request.POST.get("standings-TOTAL_FORMS", "0"))
-                    except ValueError:
-                        total_forms = 0
-
-                    with transaction.atomic():
-                        for i in range(total_forms):
-                            name = (request.POST.get(f"standings-{i}-team_name", "") or "").strip()
-                            if not name:
-                                continue
-                            raw_pts = request.POST.get(f"standings-{i}-points", "")
-                            try:
-                                points_val = Decimal(str(raw_pts)) if str(raw_pts).strip() != "" else Decimal("0")
-                                if points_val < 0:
-                                    points_val = Decimal("0")
-                            except InvalidOperation:
-                                points_val = Decimal("0")
-
-                            inst, _ = LeagueStanding.objects.get_or_create(
-                                season=active,
-                                team_name=name,
-                                defaults={"is_royals": False}
-                            )
-                            inst.points = points_val
-                            inst.is_royals = False
-                            inst.updated_by = request.user
-                            inst.save()
-                            created_or_updated += 1
-
+                if "standings-TOTAL_FORMS" in request.POST:
+                    rows = parse_standings_rows(request.POST)
+                    saved = save_standings_draft(active, rows, request.user)
                     if action == "publish":
-                        LeagueStanding.objects.filter(season=active).update(published=True)
-                        messages.success(request, f"Standings published. ({created_or_updated} row(s) saved)\n")
+                        snapshot = publish_standings(active, request.user)
+                        messages.success(request, f"Standings published (v{snapshot.version}). ({saved} row(s) saved)\n")
                     else:
-                        LeagueStanding.objects.filter(season=active).update(published=False)
-                        messages.success(request, f"Standings saved as draft. ({created_or_updated} row(s) saved)")
-
-                    # Rebuild unbound formset for display
-                    formset = FormSetCls(queryset=qs, prefix="standings")
+                        messages.success(request, f"Standings saved as draft. ({saved} row(s) saved)")
                 else:
                     # Wrong <form> submitted
-                    formset = FormSetCls(queryset=qs, prefix="standings")
                     messages.error(request, "Standings form was not submitted. Please use the Save/Publish buttons inside the Standings card.")
-            else:
-                # GET (or non-standings POST): refresh Royals auto points and build formset with six blanks
-                try:
-                    royals.points = royals_total
-                    royals.updated_by = request.user
-                    if hasattr(royals, "updated_at"):
-                        royals.save(update_fields=["points", "updated_by", "updated_at"])
-                    else:
-                        royals.save()
-                except Exception:
-                    pass
-                # Only build a fresh (unbound) formset if we don't already have one from the POST path
-                if formset is None:
-                    FormSetCls = modelformset_factory(LeagueStanding, form=LeagueStandingForm, extra=6, can_delete=False)
-                    formset = FormSetCls(queryset=qs, prefix="standings")
 
-            standings_rows = list(LeagueStanding.objects.filter(season=active).order_by("-points", "team_name"))
+            formset = FormSetCls(queryset=qs, prefix="standings")
+            standings_rows = standings_draft_rows(active)
+            royals = next((r for r in standings_rows if r.is_royals), None)
             standings_published = any(getattr(r, "published", False) for r in standings_rows)
     except Exception as e:
         # Do not break the dashboard if standings fail; just log and continue
@@ -3562,83 +3229,20 @@ def admin_league_standings(request):
     """Standalone page to edit & publish league standings without dashboard form conflicts."""
 
     # Seasons (newest first)
-    seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
-    active = seasons.filter(is_active=True).first() or seasons.first()
-
-    # Compute Royals auto points (match + sub points) for active season
-    team_match_points = 0
-    team_sub_points = 0
-    if active:
-        season_fixtures = list(Fixture.objects.filter(season=active).order_by("week_number"))
-        sub_totals = (
-            SubResult.objects
-            .filter(fixture__in=season_fixtures)
-            .values("fixture_id")
-            .annotate(total=Sum("points_cached"))
-        )
-        sub_map = {row["fixture_id"]: (row["total"] or 0) for row in sub_totals}
-        for fx in season_fixtures:
-            h, _ = compute_fixture_match_points(fx)
-            team_match_points += h
-            team_sub_points += sub_map.get(fx.id, 0)
-    try:
-        royals_total = Decimal(team_match_points) + Decimal(team_sub_points)
-    except Exception:
-        royals_total = Decimal(str(team_match_points)) + Decimal(str(team_sub_points))
-
-    # Ensure Royals row exists and is up-to-date
-    royals = None
-    if active:
-        royals, _ = LeagueStanding.objects.get_or_create(
-            season=active, team_name="Royals", defaults={"is_royals": True}
-        )
-        try:
-            royals.points = royals_total
-            royals.updated_by = request.user
-            if hasattr(royals, "updated_at"):
-                royals.save(update_fields=["points", "updated_by", "updated_at"])
-            else:
-                royals.save()
-        except Exception:
-            pass
+    registry = season_registry(request)
+    seasons = registry.seasons
+    active = registry.active_or_newest
 
     action = request.POST.get("action") if request.method == "POST" else None
 
     if request.method == "POST" and action in {"save", "publish"} and active:
-        # Manual parse of six rows (standings-0..5)
-        created_or_updated = 0
-        with transaction.atomic():
-            for i in range(6):
-                name = (request.POST.get(f"standings-{i}-team_name", "") or "").strip()
-                if not name:
-                    continue
-                raw_pts = request.POST.get(f"standings-{i}-points", "")
-                try:
-                    points_val = Decimal(str(raw_pts)) if str(raw_pts).strip() != "" else Decimal("0")
-                    if points_val < 0:
-                        points_val = Decimal("0")
-                except InvalidOperation:
-                    points_val = Decimal("0")
-
-                inst, _ = LeagueStanding.objects.get_or_create(
-                    season=active,
-                    team_name=name,
-                    defaults={"is_royals": False}
-                )
-                inst.points = points_val
-                inst.is_royals = False
-                inst.updated_by = request.user
-                inst.save()
-                created_or_updated += 1
-
-            # Flip publish state across the season standings
-            if action == "publish":
-                LeagueStanding.objects.filter(season=active).update(published=True)
-                messages.success(request, f"Standings published. ({created_or_updated} row(s) saved)")
-            else:
-                LeagueStanding.objects.filter(season=active).update(published=False)
-                messages.success(request, f"Standings saved as draft. ({created_or_updated} row(s) saved)")
-
+        # Six input rows (standings-0..5); Royals points are always computed
+        saved = save_standings_draft(active, parse_standings_rows(request.POST, min_rows=6), request.user)
+        if action == "publish":
+            snapshot = publish_standings(active, request.user)
+            messages.success(request, f"Standings published (v{snapshot.version}). ({saved} row(s) saved)")
+        else:
+            messages.success(request, f"Standings saved as draft. ({saved} row(s) saved)")
         return redirect("admin_league_standings")
 
     # Prefill six input rows from existing non-Royals rows (sorted by team name)
@@ -3653,8 +3257,9 @@ def admin_league_standings(request):
         else:
             initial_rows.append({"name": "", "points": ""})
 
-    # Preview standings for the right-hand card
-    standings_rows = list(LeagueStanding.objects.filter(season=active).order_by("-points", "team_name")) if active else []
+    # Preview standings for the right-hand card (draft, with a live Royals total)
+    standings_rows = standings_draft_rows(active)
+    royals = next((r for r in standings_rows if r.is_royals), None)
     standings_published = any(getattr(r, "published", False) for r in standings_rows)
 
     context = {
@@ -3671,6 +3276,7 @@ def admin_league_standings(request):
 @rl_deco(key='ip', rate='60/m', method='POST', block=True)
 def notifications_mark_all_read(request):
     NotificationReceipt.objects.filter(user=request.user, read_at__isnull=True).update(read_at=timezone.now())
+    invalidate_bell(request.user.pk)
     messages.success(request, "All notifications marked as read.")
     return redirect(request.META.get("HTTP_REFERER", "schedule_list"))
 
@@ -3718,6 +3324,7 @@ def notifications_list(request):
             elif action == "mark_unread":
                 recs.update(read_at=None)
                 messages.success(request, "Marked selected as unread.")
+            invalidate_bell(request.user.pk)
             return redirect(f"{reverse('notifications_list')}?status={status}")
 
     paginator = Paginator(qs, 10)  # 10 per page
@@ -3949,36 +3556,29 @@ def sms_start(request):
     # 4) Render SMS body from template
     sms_text = render_to_string("sms/otp_verify.txt", {"code": code}).strip()
 
-    # 5) Send via Brevo directly
-    api_key = getattr(settings, "BREVO_API_KEY", "") or getattr(settings, "BREVO_SMS_API_KEY", "")
-    sender = getattr(settings, "BREVO_SMS_SENDER", "ROYALS")
-    if not api_key:
-        logger.error("sms_start: missing BREVO API key in settings")
-        return JsonResponse({"error": "SMS provider is not configured"}, status=500)
-
-    headers = {
-        "api-key": api_key,
-        "accept": "application/json",
-        "content-type": "application/json",
-    }
-    payload = {
-        "sender": sender,
-        "recipient": phone,
-        "content": sms_text,
-        "type": "transactional",
-    }
+    # 5) Send via Brevo (pooled keep-alive session), or Twilio when failing over from an open Brevo circuit.
+    # Calls are bounded by the provider latency budget, and fail at once while the circuit is open.
     try:
-        resp = requests.post(
-            "https://api.brevo.com/v3/transactionalSMS/send",
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=10,
-        )
-        if resp.status_code // 100 != 2:
-            logger.warning("sms_start: Brevo send failed status=%s body=%s", resp.status_code, resp.text[:500])
-            return JsonResponse({"error": "Failed to send code"}, status=502)
+        if sms_provider("brevo") == "twilio":
+            twilio_send_sms(to=phone, body=sms_text)
+        else:
+            api_key = getattr(settings, "BREVO_API_KEY", "") or getattr(settings, "BREVO_SMS_API_KEY", "")
+            sender = getattr(settings, "BREVO_SMS_SENDER", "ROYALS")
+            if not api_key:
+                logger.error("sms_start: missing BREVO API key in settings")
+                return JsonResponse({"error": "SMS provider is not configured"}, status=500)
+            resp = brevo_send_sms(api_key, sender=sender, recipient=phone, content=sms_text)
+            if resp.status_code // 100 != 2:
+                logger.warning("sms_start: Brevo send failed status=%s body=%s", resp.status_code, resp.text[:500])
+                return JsonResponse({"error": "Failed to send code"}, status=502)
+    except ProviderUnavailable as e:
+        logger.warning("sms_start: %s, retry in %.0fs", e, e.retry_after)
+        response = JsonResponse({"error": "Text messages are delayed right now. Please try again in a minute."},
+                                status=503)
+        response["Retry-After"] = str(max(1, int(e.retry_after)))
+        return response
     except Exception as e:
-        logger.exception("sms_start: exception during Brevo send: %s", e)
+        logger.exception("sms_start: exception during SMS send: %s", e)
         return JsonResponse({"error": "Failed to send code"}, status=502)
 
     logger.info("sms_start: success for %s", phone)
@@ -4228,169 +3828,69 @@ def my_team_view(request):
 @user_passes_test(is_staff_user)
 def admin_playoff_eligibility(request):
     # Seasons list (newest first)
-    seasons = Season.objects.all().order_by("-year" if hasattr(Season, "year") else "-id")
+    registry = season_registry(request)
+    seasons = registry.seasons
     sel_id = request.GET.get("season")
-    selected = seasons.filter(pk=sel_id).first() if sel_id else seasons.filter(is_active=True).first() or seasons.first()
-
-    # Roster for selected season
-    roster_entries = RosterEntry.objects.filter(season=selected).select_related("player", "player__user").order_by("player__last_name", "player__first_name") if selected else []
+    selected = registry.get(sel_id) if sel_id else registry.active_or_newest
 
-    # Early out
-    if not selected:
-        return render(request, "league/admin_panel/playoff_eligibility.html", {
-            "seasons": seasons,
-            "selected": None,
-            "rows": [],
-        })
-
-    # ---- Gather all needed season data in bulk ----
-
-    # 1) Lineup appearances by player & slot (S1..D3)
-    # Map: fixture_id -> {slot_code -> SlotScore} for W/L calc
-    scores_by_fixture_slot = defaultdict(dict)
-    for s in SlotScore.objects.filter(fixture__season=selected).only("fixture_id", "slot_code", "result", "home_games", "away_games"):
-        scores_by_fixture_slot[s.fixture_id][s.slot_code] = s
-
-    # Map: player_id -> Counter({slot_code: count})
-    lineup_counts = defaultdict(Counter)
-    # Map: player_id -> {'wins': x, 'losses': y}
-    lineup_wl = defaultdict(lambda: {"wins": 0, "losses": 0})
+    # Per-player counts, record and points (cached per season; see league.services.eligibility)
+    return render(request, "league/admin_panel/playoff_eligibility.html", {
+        "seasons": seasons,
+        "selected": selected,
+        "rows": eligibility_rows(selected),
+    })
 
-    # Grab all lineup slots for this season (with players assigned)
-    slots_qs = (
-        LineupSlot.objects
-        .filter(lineup__fixture__season=selected)
-        .select_related("lineup__fixture", "player1", "player2")
-    )
 
-    for ls in slots_qs:
-        slot_code = ls.slot  # e.g., 'S1', 'D2'
-        sc = scores_by_fixture_slot.get(ls.lineup.fixture_id, {}).get(ls.slot)
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() returns the line so it can be streamed."""
+    def write(self, value):
+        return value
 
-        for p in (ls.player1, ls.player2):
-            if not p:
-                continue
-            lineup_counts[p.id][slot_code] += 1
-            # W/L from slot score (if present)
-            if sc:
-                r = sc.result
-                if r in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF, 'W', 'WF'):
-                    lineup_wl[p.id]["wins"] += 1
-                elif r in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF, 'L', 'LF'):
-                    lineup_wl[p.id]["losses"] += 1
-                elif r in (SlotScore.Result.TIE, 'T'):
-                    # ties don't affect W-L, but you could track if desired
-                    pass
 
-    # 2) Sub results by player (counts per slot, W/L, sub points)
-    sub_counts = defaultdict(Counter)
-    sub_wl = defaultdict(lambda: {"wins": 0, "losses": 0})
-    sub_points = defaultdict(lambda: Decimal("0"))
-
-    sub_qs = SubResult.objects.filter(fixture__season=selected).select_related("player", "fixture")
-    for sr in sub_qs:
-        p = sr.player
-        if not p:
-            continue
-        # slot_code resolution (defensive)
-        slot_code = getattr(sr, "slot_code", None)
-        if not slot_code:
-            # Try reading a display like "S2" from get_slot_code_display(); else infer from kind (fallback)
-            try:
-                slot_code = sr.get_slot_code_display() or ""
-            except Exception:
-                slot_code = ""
-            if slot_code and " " in slot_code:
-                slot_code = slot_code.split()[0]  # e.g., "S2 — ..." -> "S2"
-            if not slot_code:
-                # crude fallback from kind: Singles -> S?, Doubles -> D?
-                slot_code = "S?" if str(getattr(sr, "kind", "")).upper().startswith("S") else "D?"
-        sub_counts[p.id][slot_code] += 1
-
-        r = sr.result
-        if r in (SlotScore.Result.WIN, SlotScore.Result.WIN_FF, 'W', 'WF'):
-            sub_wl[p.id]["wins"] += 1
-        elif r in (SlotScore.Result.LOSS, SlotScore.Result.LOSS_FF, 'L', 'LF'):
-            sub_wl[p.id]["losses"] += 1
-
-        sub_points[p.id] += (sr.points_cached if sr.points_cached is not None else Decimal("0"))
-
-    # 3) Lineup points (PlayerMatchPoints) + add sub points
-    player_points = defaultdict(lambda: Decimal("0"))
-    pmp = PlayerMatchPoints.objects.filter(fixture__season=selected).values("player_id").annotate(total=Sum("points"))
-    for row in pmp:
-        player_points[row["player_id"]] += (row["total"] if row["total"] is not None else Decimal("0"))
-    for pid, sp in sub_points.items():
-        player_points[pid] += sp
-
-    # ---- Build rows ----
-    def number_bucket_counts(counter: Counter, prefix: str) -> dict:
-        # returns counts for S1..S3 (if prefix='S') or D1..D3 (if 'D'), ignoring unknowns like 'S?'
-        out = {"1": 0, "2": 0, "3": 0}
-        for k, v in counter.items():
-            if isinstance(k, str) and k.startswith(prefix) and len(k) >= 2 and k[1] in ("1", "2", "3"):
-                out[k[1]] += v
-        return out
+@login_required
+@user_passes_test(is_captain)
+def playoff_eligibility_export(request, fmt):
+    """Stream the playoff eligibility table as CSV or JSON (?season=<id>, default active)."""
+    import csv
+    import json
+    from django.http import StreamingHttpResponse, Http404
+    from django.core.serializers.json import DjangoJSONEncoder
 
-    rows = []
-    for re in roster_entries:
-        p = re.player
-        pid = p.id
-
-        # Per-slot counts (lineup + sub)
-        lineup_c = lineup_counts[pid]
-        sub_c = sub_counts[pid]
-        def total_slot(slot):
-            return lineup_c.get(slot, 0) + sub_c.get(slot, 0)
-
-        s1 = total_slot("S1"); s2 = total_slot("S2"); s3 = total_slot("S3")
-        d1 = total_slot("D1"); d2 = total_slot("D2"); d3 = total_slot("D3")
-
-        # Number buckets (combined singles + doubles)
-        singles_by_num = number_bucket_counts(lineup_c + sub_c, "S")
-        doubles_by_num = number_bucket_counts(lineup_c + sub_c, "D")
-        num1 = singles_by_num["1"] + doubles_by_num["1"]
-        num2 = singles_by_num["2"] + doubles_by_num["2"]
-        num3 = singles_by_num["3"] + doubles_by_num["3"]
-
-        # Eligibility by number
-        elig1 = num1 >= 3
-        elig2 = num2 >= 3
-        elig3 = num3 >= 3
-
-        # Overall totals
-        total_matches = s1 + s2 + s3 + d1 + d2 + d3
-        overall_eligible = total_matches >= 5
-
-        # W/L (lineup + sub)
-        wins = lineup_wl[pid]["wins"] + sub_wl[pid]["wins"]
-        losses = lineup_wl[pid]["losses"] + sub_wl[pid]["losses"]
-        win_pct = (wins / (wins + losses)) * 100 if (wins + losses) else 0.0
-
-        # Prepare points for display: int if whole number, else 2 decimals
-        _pts = player_points[pid]
-        try:
-            points_val = int(_pts) if _pts == _pts.to_integral_value() else _pts.quantize(Decimal("0.01"),
-                                                                                          rounding=ROUND_HALF_UP)
-        except Exception:
-            points_val = float(_pts)
+    sid = request.GET.get("season")
+    registry = season_registry(request)
+    season = registry.get(sid) if sid else registry.active_or_newest
+    if not season:
+        raise Http404("No season to export.")
+
+    rows = eligibility_rows(season)
+    safe_name = (getattr(season, "name", "") or "").strip().replace(" ", "_")
+    filename = f"playoff_eligibility_{getattr(season, 'year', '')}_{safe_name or 'season'}"
+
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+
+        def stream():
+            yield writer.writerow(ELIGIBILITY_EXPORT_COLUMNS)
+            for r in rows:
+                yield writer.writerow(eligibility_export_row(r))
+
+        response = StreamingHttpResponse(stream(), content_type="text/csv; charset=utf-8")
+    elif fmt == "json":
+        def stream():
+            yield '{"season": %s, "rows": [' % json.dumps({"id": season.pk, "name": str(season)})
+            for i, r in enumerate(rows):
+                item = dict(zip(ELIGIBILITY_EXPORT_COLUMNS, eligibility_export_row(r)), player_id=r["player"]["id"])
+                yield ("," if i else "") + json.dumps(item, cls=DjangoJSONEncoder)
+            yield "]}"
+
+        response = StreamingHttpResponse(stream(), content_type="application/json")
+    else:
+        raise Http404("Unknown export format.")
 
-        rows.append({
-            "player": p,
-            "S1": s1, "S2": s2, "S3": s3, "D1": d1, "D2": d2, "D3": d3,
-            "total_matches": total_matches,
-            "points": points_val,
-            "wins": wins, "losses": losses, "win_pct": round(win_pct, 1),
-            "elig1": elig1, "elig2": elig2, "elig3": elig3,
-            "overall_eligible": overall_eligible,
-        })
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
 
-    return render(request, "league/admin_panel/playoff_eligibility.html", {
-        "seasons": seasons,
-        "selected": selected,
-        "rows": rows,
-    })
-# Twilio Status Callbacks
+# Provider status callbacks: buffered and applied in batches (league.delivery_status)
 @csrf_exempt
 def twilio_sms_status(request):
     # Optionally verify X-Twilio-Signature
@@ -4398,19 +3898,22 @@ def twilio_sms_status(request):
     status = request.POST.get("MessageStatus")  # queued, sent, delivered, undelivered, failed
     if not sid or not status:
         return HttpResponseBadRequest("missing fields")
+    record_twilio(request.POST)
+    return HttpResponse("ok")
+
+
+@csrf_exempt
+@require_POST
+def brevo_sms_status(request):
+    # Brevo doesn't sign webhooks, so the URL must carry ?token=<BREVO_WEBHOOK_TOKEN>; closed until one is set
+    token = getattr(settings, "BREVO_WEBHOOK_TOKEN", "")
+    if not token or not constant_time_compare(request.GET.get("token", ""), token):
+        return HttpResponseForbidden("bad token")
     try:
-        attempt = DeliveryAttempt.objects.get(provider_message_id=sid, provider="twilio")
-        mapping = {
-            "queued": "QUEUED",
-            "accepted": "QUEUED",
-            "sending": "SENDING",
-            "sent": "SENT",
-            "delivered": "DELIVERED",
-            "undelivered": "FAILED",
-            "failed": "FAILED",
-        }
-        attempt.status = mapping.get(status, attempt.status)
-        attempt.save(update_fields=["status"])
-    except DeliveryAttempt.DoesNotExist:
-        pass
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return HttpResponseBadRequest("invalid json")
+    for event in payload if isinstance(payload, list) else [payload]:
+        if isinstance(event, dict):
+            record_brevo_sms(event)
     return HttpResponse("ok")
\ No newline at end of file
@@ -81,6 +81,22 @@ DATABASES = {
     )
 }
 
+# Cache: league.cache keeps per-season versions here, so every worker must share it.
+# REDIS_URL -> Redis; CACHE_DIR -> file-based (shared by workers on one host);
+# otherwise per-process LocMem (dev/tests). prod.py defaults CACHE_DIR.
+def cache_config(redis_url=None, cache_dir=None):
+    if redis_url:
+        return {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": redis_url}}
+    if cache_dir:
+        return {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir}}
+    return {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "royals-default"}}
+
+
+CACHES = cache_config(os.getenv("REDIS_URL"), os.getenv("CACHE_DIR"))
+# Season cache hit/miss counters (manage.py season_cache_stats). Always kept on Redis; elsewhere
+# each counted read is a non-atomic read-modify-write, so only when turned on here
+SEASON_CACHE_STATS = (os.getenv("SEASON_CACHE_STATS", "0").lower() in ("1", "true", "yes"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -135,10 +151,47 @@ LOGOUT_REDIRECT_URL = '/login/'     # after logout
 
 BREVO_SMS_API_KEY = os.getenv("BREVO_SMS_API_KEY", "")
 BREVO_SMS_SENDER = os.getenv("BREVO_SMS_SENDER", "ROYALS")
+# SMS falling in these hours of the recipient's own timezone is held until the window ends
 NOTIFY_QUIET_HOURS = (
     int(os.getenv("NOTIFY_QUIET_HOURS_START", "21")),
     int(os.getenv("NOTIFY_QUIET_HOURS_END", "8")),
 )
+# Off: email/SMS are sent by `manage.py run_delivery_worker` (Procfile, render.yaml, docker-compose), so request
+# latency never depends on recipient count. On: also sent right after commit by the process that queued them
+# (local.py turns it on for development without a worker)
+NOTIFY_DELIVERY_INLINE = (os.getenv("NOTIFY_DELIVERY_INLINE", "0").lower() in ("1", "true", "yes"))
+# Senders per channel at once across all delivery workers (a thread with one connection each), and lease length
+NOTIFY_DELIVERY_CONCURRENCY = {
+    "EMAIL": int(os.getenv("NOTIFY_EMAIL_CONCURRENCY", "4")),
+    "SMS": int(os.getenv("NOTIFY_SMS_CONCURRENCY", "2")),
+}
+NOTIFY_DELIVERY_LEASE_SECONDS = int(os.getenv("NOTIFY_DELIVERY_LEASE_SECONDS", "300"))
+# Transient send errors are retried with exponential backoff (jittered) up to this many tries in total
+NOTIFY_RETRY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_RETRY_MAX_ATTEMPTS", "6"))
+NOTIFY_RETRY_BASE_SECONDS = int(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "30"))
+NOTIFY_RETRY_MAX_SECONDS = int(os.getenv("NOTIFY_RETRY_MAX_SECONDS", "3600"))
+# Hold email/SMS this long and send what piles up for one user and channel as a single digest (0: off)
+NOTIFY_COALESCE_SECONDS = int(os.getenv("NOTIFY_COALESCE_SECONDS", "0"))
+# Sends per second per provider, drawn from the cache (0: unlimited; shared by every process only on Redis). Waits up to
+# NOTIFY_RATE_MAX_WAIT seconds are slept off; longer ones reschedule the attempt
+NOTIFY_RATE_LIMITS = {
+    "email": float(os.getenv("NOTIFY_RATE_EMAIL", "14")),
+    "brevo": float(os.getenv("NOTIFY_RATE_BREVO", "10")),
+    "twilio": float(os.getenv("NOTIFY_RATE_TWILIO", "1")),  # one message per second per long code
+}
+NOTIFY_RATE_MAX_WAIT = float(os.getenv("NOTIFY_RATE_MAX_WAIT", "2"))
+# Longest a provider call may block a worker (connect tries + response), and the per-provider circuit breaker:
+# this many consecutive failed or slow calls open it for the cool-down. Optional SMS provider to use meanwhile
+NOTIFY_PROVIDER_LATENCY_BUDGET = float(os.getenv("NOTIFY_PROVIDER_LATENCY_BUDGET", "5"))
+NOTIFY_BREAKER_FAILURES = int(os.getenv("NOTIFY_BREAKER_FAILURES", "5"))
+NOTIFY_BREAKER_SLOW_SECONDS = float(os.getenv("NOTIFY_BREAKER_SLOW_SECONDS", "3"))
+NOTIFY_BREAKER_COOLDOWN = int(os.getenv("NOTIFY_BREAKER_COOLDOWN", "60"))
+NOTIFY_SMS_FAILOVER = (os.getenv("NOTIFY_SMS_FAILOVER") or "").lower()
+# Provider status callbacks are buffered in the cache and applied this many at a time, or this often
+NOTIFY_STATUS_BATCH = int(os.getenv("NOTIFY_STATUS_BATCH", "50"))
+NOTIFY_STATUS_FLUSH_SECONDS = float(os.getenv("NOTIFY_STATUS_FLUSH_SECONDS", "5"))
+# Brevo SMS webhook URL must carry ?token=<this> (Brevo doesn't sign webhooks); the endpoint answers 403 while unset
+BREVO_WEBHOOK_TOKEN = os.getenv("BREVO_WEBHOOK_TOKEN", "")
 
 # --- SMS feature flag (single source of truth) ---
 ENABLE_SMS = (os.getenv("ENABLE_SMS", "0").lower() in ("1", "true", "yes"))
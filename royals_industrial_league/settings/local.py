@@ -63,6 +63,8 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "Royals Local <captain-local@royalsleague.com>"
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 EMAIL_SUBJECT_PREFIX = "[LOCAL] "
+# No delivery worker locally: send queued email/SMS right after commit
+NOTIFY_DELIVERY_INLINE = (os.getenv("NOTIFY_DELIVERY_INLINE", "1").lower() in ("1", "true", "yes"))
 
 # --- Logging ---
 LOGGING = {
@@ -37,6 +37,11 @@ if os.getenv("LOCAL_NO_SSL", "0") == "1":
     SESSION_COOKIE_SECURE = False
     CSRF_COOKIE_SECURE = False
 
+# Shared cache across gunicorn workers (season cache versions, rate limits).
+# Without REDIS_URL the NOTIFY_RATE_LIMITS budgets are per host and best-effort: the
+# file cache's incr() isn't atomic, and the delivery worker service has its own /tmp.
+CACHES = cache_config(os.getenv("REDIS_URL"), os.getenv("CACHE_DIR", "/tmp/royals_cache"))
+
 # Where collectstatic will place the built assets
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
@@ -134,6 +139,7 @@ LOGIN_URL = reverse_lazy("league_login")
 EMAIL_BACKEND = "anymail.backends.brevo.EmailBackend"  # for older Anymail versions, use: anymail.backends.sendinblue.EmailBackend
 ANYMAIL = {
     "BREVO_API_KEY": os.getenv("BREVO_API_KEY"),
+    "WEBHOOK_SECRET": os.getenv("ANYMAIL_WEBHOOK_SECRET"),  # "user:password" for the tracking webhook URL
 }
 DEFAULT_FROM_EMAIL = "Royals Industrial League <captain@royalsleague.com>"  # must be a verified sender/domain in Brevo
 SERVER_EMAIL = "Royals Industrial League <captain@royalsleague.com>"
@@ -153,4 +159,7 @@ SMS_DEFAULT_COUNTRY = os.getenv("SMS_DEFAULT_COUNTRY", "US")
 
 # Quiet hours (override via env in prod if needed)
 NOTIFY_QUIET_HOURS_START = int(os.getenv("NOTIFY_QUIET_HOURS_START", "21"))  # 9pm local
-NOTIFY_QUIET_HOURS_END = int(os.getenv("NOTIFY_QUIET_HOURS_END", "8"))       # 8am local
\ No newline at end of file
+NOTIFY_QUIET_HOURS_END = int(os.getenv("NOTIFY_QUIET_HOURS_END", "8"))       # 8am local
+
+# Match nights post lineups, scores and sub results back to back: send them as one digest
+NOTIFY_COALESCE_SECONDS = int(os.getenv("NOTIFY_COALESCE_SECONDS", "120"))